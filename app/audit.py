@@ -1,13 +1,83 @@
 from __future__ import annotations
 
+import atexit
+import gzip
+import hashlib
+import hmac
 import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts keep a single writing process
+    fcntl = None
 
 AUDIT_LOG_PATH = Path(__file__).resolve().parent.parent / "data" / "audit_log.jsonl"
 _TMP_AUDIT_LOG_PATH = Path("/tmp") / "maman-emploi" / "data" / "audit_log.jsonl"
 
+FSYNC_POLICIES = ("always", "interval", "shutdown")
+# Events written in one go at most; the rest waits for the next batch.
+_MAX_BATCH = 1000
+# Events per index block: the unit of the sparse index and of compression.
+INDEX_BLOCK_EVENTS = 128
+# Running hash before the first chained event.
+GENESIS_HASH = "0" * 64
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AuditSettings:
+    # always: write_audit_event returns once its event is on disk.
+    # interval: events are written in batches and fsynced every fsync_interval_ms.
+    # shutdown: fsync only on flush_audit/shutdown_audit.
+    fsync_policy: str
+    fsync_interval_ms: int
+    queue_size: int
+    # A segment holds one UTC day at most and is rotated earlier past this size.
+    segment_max_bytes: int = 8 * 1024 * 1024
+    # A signed checkpoint (running hash, position) every N events, and on
+    # segment rotation and shutdown.
+    checkpoint_every: int = 1000
+
+
+def load_audit_settings() -> AuditSettings:
+    policy = os.getenv("AUDIT_FSYNC_POLICY", "interval").lower()
+    if policy not in FSYNC_POLICIES:
+        policy = "interval"
+    try:
+        interval = max(1, int(os.getenv("AUDIT_FSYNC_INTERVAL_MS", "200")))
+    except ValueError:
+        interval = 200
+    try:
+        queue_size = max(1, int(os.getenv("AUDIT_QUEUE_SIZE", "10000")))
+    except ValueError:
+        queue_size = 10000
+    try:
+        segment_max_bytes = max(4096, int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024))))
+    except ValueError:
+        segment_max_bytes = 8 * 1024 * 1024
+    try:
+        checkpoint_every = max(1, int(os.getenv("AUDIT_CHECKPOINT_EVERY", "1000")))
+    except ValueError:
+        checkpoint_every = 1000
+    return AuditSettings(
+        fsync_policy=policy,
+        fsync_interval_ms=interval,
+        queue_size=queue_size,
+        segment_max_bytes=segment_max_bytes,
+        checkpoint_every=checkpoint_every,
+    )
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
@@ -33,26 +103,829 @@ def _ensure(path: Path) -> Path:
     return target
 
 
-def write_audit_event(action: str, payload: Dict[str, object], path: Path = AUDIT_LOG_PATH) -> None:
-    target = _ensure(path)
-    event = {"ts": _now_iso(), "action": action, "payload": payload}
+# Storage layout, next to the original audit_log.jsonl (kept as the oldest,
+# read-only segment):
+#   audit_log_segments/20260219-0000.jsonl.gz      closed segment, one gzip member per block
+#   audit_log_segments/20260219-0000.jsonl.gz.idx  its sparse index
+#   audit_log_segments/20260220-0000.jsonl         segment being written
+#   audit_log_segments/20260220-0000.jsonl.idx     index of its completed blocks
+# An index line describes one block of INDEX_BLOCK_EVENTS events: byte range
+# (raw, and compressed once gzipped), timestamp range, actions and entry ids.
+
+
+def _segments_dir(target: Path) -> Path:
+    return target.with_name(f"{target.stem}_segments")
+
+
+def _index_path(segment: Path) -> Path:
+    return segment.with_name(segment.name + ".idx")
+
+
+def _segment_key(segment: Path) -> str:
+    return segment.name.split(".")[0]
+
+
+def _is_segment(path: Path) -> bool:
+    return path.name[:1].isdigit() and path.name.endswith((".jsonl", ".jsonl.gz"))
+
+
+def _list_segments(target: Path) -> List[Path]:
+    """Every segment of the log, oldest first."""
+    out: List[Path] = []
     try:
-        with target.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if target.exists() and target.stat().st_size > 0:
+            out.append(target)
     except OSError:
-        return
+        pass
+    seg_dir = _segments_dir(target)
+    if seg_dir.is_dir():
+        found = [p for p in seg_dir.iterdir() if _is_segment(p)]
+        out.extend(sorted(found, key=_segment_key))
+    return out
 
 
-def read_recent_audit_events(limit: int = 100, path: Path = AUDIT_LOG_PATH) -> List[Dict[str, object]]:
-    target = _ensure(path)
+@dataclass
+class _Block:
+    offset: int
+    end: int = 0
+    count: int = 0
+    first_ts: str = ""
+    last_ts: str = ""
+    actions: Set[str] = field(default_factory=set)
+    entry_ids: Set[str] = field(default_factory=set)
+    coffset: Optional[int] = None
+    cend: Optional[int] = None
+
+    def add(self, event: Dict[str, object], end: int) -> None:
+        ts = str(event.get("ts", ""))
+        if not self.count:
+            self.first_ts = ts
+        self.last_ts = max(self.last_ts, ts)
+        self.first_ts = min(self.first_ts, ts)
+        self.count += 1
+        self.end = end
+        self.actions.add(str(event.get("action", "")))
+        payload = event.get("payload")
+        if isinstance(payload, dict) and payload.get("entry_id") is not None:
+            self.entry_ids.add(str(payload["entry_id"]))
+
+    def to_json(self) -> str:
+        data: Dict[str, object] = {
+            "offset": self.offset,
+            "end": self.end,
+            "count": self.count,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "actions": sorted(self.actions),
+            "entry_ids": sorted(self.entry_ids),
+        }
+        if self.coffset is not None:
+            data["coffset"] = self.coffset
+            data["cend"] = self.cend
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "_Block":
+        data = json.loads(line)
+        return cls(
+            offset=int(data["offset"]),
+            end=int(data["end"]),
+            count=int(data["count"]),
+            first_ts=data.get("first_ts", ""),
+            last_ts=data.get("last_ts", ""),
+            actions=set(data.get("actions", [])),
+            entry_ids=set(data.get("entry_ids", [])),
+            coffset=data.get("coffset"),
+            cend=data.get("cend"),
+        )
+
+
+def _scan_blocks(raw: bytes, start: int) -> List[_Block]:
+    """Index events of `raw` (which begins at byte `start` of its file)."""
+    blocks: List[_Block] = []
+    current: Optional[_Block] = None
+    pos = start
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break
+        end = pos + len(line)
+        try:
+            event = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            event = None
+        if current is None:
+            current = _Block(offset=pos)
+        if isinstance(event, dict):
+            current.add(event, end)
+        else:
+            current.end = end
+        if current.count >= INDEX_BLOCK_EVENTS:
+            blocks.append(current)
+            current = None
+        pos = end
+    if current is not None:
+        blocks.append(current)
+    return blocks
+
+
+def _read_index(segment: Path) -> List[_Block]:
     try:
-        lines = target.read_text(encoding="utf-8").splitlines()
+        lines = _index_path(segment).read_text(encoding="utf-8").splitlines()
     except OSError:
         return []
-    out: List[Dict[str, object]] = []
-    for line in lines[-max(1, limit):]:
+    blocks = []
+    for line in lines:
+        try:
+            blocks.append(_Block.from_json(line))
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            break
+    return blocks
+
+
+def _segment_blocks(segment: Path) -> List[_Block]:
+    """Indexed blocks plus the not yet indexed tail of a raw segment."""
+    blocks = _read_index(segment)
+    if segment.name.endswith(".gz"):
+        return blocks
+    indexed_end = blocks[-1].end if blocks else 0
+    try:
+        size = segment.stat().st_size
+    except OSError:
+        return blocks
+    if size <= indexed_end:
+        return blocks
+    with segment.open("rb") as f:
+        f.seek(indexed_end)
+        tail = _scan_blocks(f.read(size - indexed_end), indexed_end)
+    if not _is_segment(segment) and tail:
+        # The original audit_log.jsonl is no longer written to: index it once.
+        # The open segment is indexed by its writer only, block by block.
+        try:
+            with _index_path(segment).open("a", encoding="utf-8") as idx:
+                idx.write("".join(block.to_json() + "\n" for block in tail))
+        except OSError:
+            pass
+    return blocks + tail
+
+
+def _read_block_raw(segment: Path, block: _Block) -> bytes:
+    with segment.open("rb") as f:
+        if block.coffset is not None:
+            f.seek(block.coffset)
+            return gzip.decompress(f.read(int(block.cend) - block.coffset))
+        f.seek(block.offset)
+        return f.read(block.end - block.offset)
+
+
+def _read_block(segment: Path, block: _Block) -> List[bytes]:
+    return [line for line in _read_block_raw(segment, block).splitlines() if line.strip()]
+
+
+# -- hash chain --
+#   audit_log_segments/checkpoints.jsonl  {"seq", "hash", "segment", "offset", "ts", "sig"} per line
+#   audit_log_segments/verified.json      last position checked by verify_audit_chain, signed
+# Every event carries "seq" and "hash" = sha256(previous hash + canonical event);
+# checkpoints are HMAC-signed with AUDIT_CHECKPOINT_KEY. The key never lives
+# next to the log: whoever can rewrite the segments could re-sign them.
+
+
+def _chain_hash(prev: str, event: Dict[str, object]) -> str:
+    body = {k: event.get(k) for k in ("seq", "ts", "action", "payload")}
+    canonical = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256((prev + "\n" + canonical).encode("utf-8")).hexdigest()
+
+
+_KEY_WARNED = False
+
+
+def _checkpoint_key() -> Optional[bytes]:
+    """AUDIT_CHECKPOINT_KEY, or None (checkpoints unsigned, warned once per process)."""
+    global _KEY_WARNED
+    env = os.getenv("AUDIT_CHECKPOINT_KEY")
+    if env:
+        return env.encode("utf-8")
+    if not _KEY_WARNED:
+        _KEY_WARNED = True
+        logger.warning(
+            "audit: AUDIT_CHECKPOINT_KEY is not set; checkpoints are not signed and "
+            "verify_audit_chain rechecks the whole chain every time"
+        )
+    return None
+
+
+@contextmanager
+def _writer_lock(seg_dir: Path) -> Iterator[None]:
+    """Exclusive hold on the log in `seg_dir`, across threads and processes."""
+    seg_dir.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    # Opened per call: a descriptor inherited across fork would share the lock.
+    with (seg_dir / ".writer.lock").open("a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _sign(key: bytes, record: Dict[str, object]) -> str:
+    body = {k: v for k, v in record.items() if k != "sig"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hmac.new(key, canonical.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _signed(key: bytes, record: Dict[str, object]) -> bool:
+    return hmac.compare_digest(str(record.get("sig", "")), _sign(key, record))
+
+
+def _last_chained_event(seg_dir: Path) -> Optional[Dict[str, object]]:
+    if not seg_dir.is_dir():
+        return None
+    segments = sorted((p for p in seg_dir.iterdir() if _is_segment(p)), key=_segment_key)
+    for segment in reversed(segments):
+        for block in reversed(_segment_blocks(segment)):
+            for event in reversed(_parse(_read_block(segment, block))):
+                if "hash" in event:
+                    return event
+    return None
+
+
+def _last_checkpoint_seq(seg_dir: Path) -> Optional[int]:
+    try:
+        with (seg_dir / "checkpoints.jsonl").open("rb") as f:
+            f.seek(max(0, f.seek(0, os.SEEK_END) - 4096))
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
         try:
-            out.append(json.loads(line))
-        except json.JSONDecodeError:
+            return int(json.loads(line)["seq"])
+        except (ValueError, KeyError, TypeError):
             continue
+    return None
+
+
+def _compress_segment(segment: Path, blocks: List[_Block]) -> None:
+    """Replace a closed raw segment by its gzip form, one member per block."""
+    gz_path = segment.with_name(segment.name + ".gz")
+    tmp_gz = gz_path.with_name(gz_path.name + ".tmp")
+    tmp_idx = _index_path(gz_path).with_name(_index_path(gz_path).name + ".tmp")
+    with segment.open("rb") as src, tmp_gz.open("wb") as dst:
+        for block in blocks:
+            src.seek(block.offset)
+            member = gzip.compress(src.read(block.end - block.offset), mtime=0)
+            block.coffset = dst.tell()
+            dst.write(member)
+            block.cend = dst.tell()
+        dst.flush()
+        os.fsync(dst.fileno())
+    tmp_idx.write_text("".join(b.to_json() + "\n" for b in blocks), encoding="utf-8")
+    os.replace(tmp_idx, _index_path(gz_path))
+    os.replace(tmp_gz, gz_path)
+    for path in (segment, _index_path(segment)):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+# Queue items: (event, done). event is None for a flush request; done is set
+# once the item is written (and fsynced when the policy or a flush asks for it).
+# A queue item holds the events of one call; None asks for a flush.
+_Item = Tuple[Optional[List[Dict[str, object]]], Optional[Event]]
+_STOP: List[Dict[str, object]] = []
+
+
+class _AuditWriter:
+    """Background thread appending queued events to the current segment of one log.
+
+    Several processes may write the same log: each batch is written under an
+    exclusive flock on the segments directory, after re-reading the chain
+    head and the open segment whenever another process moved them.
+    """
+
+    def __init__(self, target: Path, settings: AuditSettings) -> None:
+        self.target = target
+        self.settings = settings
+        self.seg_dir = _segments_dir(target)
+        self.queue: "Queue[_Item]" = Queue(maxsize=settings.queue_size)
+        self._segment: Optional[Path] = None
+        self._handle = None
+        self._size = 0
+        self._block: Optional[_Block] = None
+        self._seq = 0
+        self._hash = GENESIS_HASH
+        self._checkpoint_seq = 0
+        self._key: Optional[bytes] = None
+        # (open segment, size) as this writer left it; None before the first batch.
+        self._tail: Optional[Tuple[Optional[str], int]] = None
+        self._thread = Thread(target=self._run, name=f"audit-writer:{target.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, events: List[Dict[str, object]]) -> None:
+        done = Event() if self.settings.fsync_policy == "always" else None
+        # A full queue blocks the caller: backpressure instead of unbounded memory.
+        self.queue.put((events, done))
+        if done is not None:
+            done.wait()
+
+    def flush(self) -> None:
+        done = Event()
+        self.queue.put((None, done))
+        done.wait()
+
+    def close(self) -> None:
+        done = Event()
+        self.queue.put((_STOP, done))
+        done.wait()
+        self._thread.join()
+
+    # -- segment handling (writer thread only) --
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive hold on the log across processes, in sync with what they wrote."""
+        with _writer_lock(self.seg_dir):
+            try:
+                if self._tail is None or self._disk_tail() != self._tail:
+                    self._reopen()
+                yield
+            finally:
+                self._tail = (self._segment.name if self._segment else None, self._size)
+
+    def _disk_tail(self) -> Tuple[Optional[str], int]:
+        raw = sorted((p for p in self.seg_dir.glob("*.jsonl") if _is_segment(p)), key=_segment_key)
+        if not raw:
+            return None, 0
+        return raw[-1].name, raw[-1].stat().st_size
+
+    def _reopen(self) -> None:
+        """Drop the in-memory head and resume from the files."""
+        if self._handle is not None:
+            self._handle.close()
+        self._handle = None
+        self._segment = None
+        self._block = None
+        self._size = 0
+        self._seq = 0
+        self._hash = GENESIS_HASH
+        self._open_latest()
+
+    def _open_latest(self) -> None:
+        self.seg_dir.mkdir(parents=True, exist_ok=True)
+        self._key = _checkpoint_key()
+        last = _last_chained_event(self.seg_dir)
+        if last is not None:
+            self._seq = int(last.get("seq", 0))
+            self._hash = str(last["hash"])
+        # Count from the last checkpoint any process wrote, so that writers
+        # taking turns still checkpoint every `checkpoint_every` events.
+        last_checkpoint = _last_checkpoint_seq(self.seg_dir)
+        self._checkpoint_seq = min(self._seq, last_checkpoint or 0)
+        raw = sorted((p for p in self.seg_dir.glob("*.jsonl") if _is_segment(p)), key=_segment_key)
+        if not raw:
+            return
+        segment = raw[-1]
+        blocks = _segment_blocks(segment)
+        indexed = _read_index(segment)
+        self._segment = segment
+        self._size = segment.stat().st_size
+        self._handle = segment.open("ab")
+        # The last block may be partial: keep filling it.
+        if len(blocks) > len(indexed):
+            self._block = blocks[-1]
+            if len(blocks) > len(indexed) + 1:
+                with _index_path(segment).open("a", encoding="utf-8") as idx:
+                    for block in blocks[len(indexed):-1]:
+                        idx.write(block.to_json() + "\n")
+        else:
+            self._block = None
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        segment = self._segment
+        if self._block is not None and self._block.count:
+            self._append_index(self._block)
+        self._block = None
+        self._checkpoint()
+        self._handle.close()
+        self._handle = None
+        self._segment = None
+        _compress_segment(segment, _read_index(segment))
+
+    def _start_segment(self, ts: str) -> None:
+        day = ts[:10].replace("-", "") or "00000000"
+        existing = [p for p in self.seg_dir.iterdir() if _is_segment(p) and p.name.startswith(day + "-")]
+        seq = max((int(_segment_key(p).split("-")[1]) for p in existing), default=-1) + 1
+        self._segment = self.seg_dir / f"{day}-{seq:04d}.jsonl"
+        self._handle = self._segment.open("ab")
+        self._size = 0
+        self._block = None
+
+    def _checkpoint(self) -> None:
+        """Make everything written durable, then record a signed checkpoint of it."""
+        if self._handle is None:
+            return
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        if self._seq == self._checkpoint_seq or self._key is None:
+            return
+        record: Dict[str, object] = {
+            "seq": self._seq,
+            "hash": self._hash,
+            "segment": _segment_key(self._segment),
+            "offset": self._size,
+            "ts": _now_iso(),
+        }
+        record["sig"] = _sign(self._key, record)
+        with (self.seg_dir / "checkpoints.jsonl").open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._checkpoint_seq = self._seq
+
+    def _append_index(self, block: _Block) -> None:
+        with _index_path(self._segment).open("a", encoding="utf-8") as idx:
+            idx.write(block.to_json() + "\n")
+
+    def _write(self, events: List[Dict[str, object]]) -> None:
+        chunk: List[bytes] = []
+
+        def _flush_chunk() -> None:
+            if chunk:
+                self._handle.write(b"".join(chunk))
+                chunk.clear()
+
+        # Chain and serialise everything first: a failure here leaves the
+        # chain head and the files untouched.
+        prepared: List[Tuple[Dict[str, object], bytes]] = []
+        seq, prev = self._seq, self._hash
+        for event in events:
+            seq += 1
+            event = {**event, "seq": seq}
+            event["hash"] = prev = _chain_hash(prev, event)
+            prepared.append((event, (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")))
+
+        for event, line in prepared:
+            ts = str(event.get("ts", ""))
+            if self._segment is not None and (
+                _segment_key(self._segment)[:8] != ts[:10].replace("-", "")
+                or self._size + len(line) > self.settings.segment_max_bytes
+            ) and self._size > 0:
+                _flush_chunk()
+                self._close_segment()
+            if self._segment is None:
+                self._start_segment(ts)
+            if self._block is None:
+                self._block = _Block(offset=self._size)
+            # The head moves with the line: a checkpoint taken on rotation
+            # above covers only what the closed segment holds.
+            self._seq, self._hash = int(event["seq"]), str(event["hash"])
+            chunk.append(line)
+            self._size += len(line)
+            self._block.add(event, self._size)
+            if self._block.count >= INDEX_BLOCK_EVENTS:
+                # Data first, then the index entry pointing at it.
+                _flush_chunk()
+                self._handle.flush()
+                self._append_index(self._block)
+                self._block = None
+        _flush_chunk()
+        self._handle.flush()
+
+    def _run(self) -> None:
+        interval = self.settings.fsync_interval_ms / 1000
+        policy = self.settings.fsync_policy
+        dirty = False
+        last_sync = time.monotonic()
+        while True:
+            timeout = None
+            if dirty and policy == "interval":
+                timeout = max(0.0, last_sync + interval - time.monotonic())
+            try:
+                batch = [self.queue.get(timeout=timeout)]
+            except Empty:
+                batch = []
+            while batch and len(batch) < _MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            events = [event for item, _ in batch if item for event in item]
+            stop = any(event is _STOP for event, _ in batch)
+            sync = (
+                policy == "always"
+                or stop
+                or any(event is None for event, _ in batch)
+                or (policy == "interval" and time.monotonic() - last_sync >= interval)
+            )
+            try:
+                if events:
+                    with self._locked():
+                        self._write(events)
+                        dirty = True
+                        if self._seq - self._checkpoint_seq >= self.settings.checkpoint_every:
+                            self._checkpoint()
+                if sync and dirty and self._handle is not None:
+                    os.fsync(self._handle.fileno())
+                    dirty = False
+                    last_sync = time.monotonic()
+            except Exception:
+                # Never block callers on a broken disk (or anything else): the
+                # batch is lost, the thread keeps serving the queue.
+                logger.exception("audit: %d event(s) could not be written", len(events))
+                dirty = False
+            for _, done in batch:
+                if done is not None:
+                    done.set()
+            if stop:
+                break
+        # Events that raced with close(): write them rather than leave callers waiting.
+        leftover: List[_Item] = []
+        while True:
+            try:
+                leftover.append(self.queue.get_nowait())
+            except Empty:
+                break
+        try:
+            tail = [event for item, _ in leftover if item for event in item]
+            if tail or self._handle is not None:
+                with self._locked():
+                    if tail:
+                        self._write(tail)
+                    self._checkpoint()
+            if self._handle is not None:
+                self._handle.close()
+        except Exception:
+            logger.exception("audit: could not write the events queued at shutdown")
+        for _, done in leftover:
+            if done is not None:
+                done.set()
+
+
+_SETTINGS = load_audit_settings()
+_WRITERS_LOCK = Lock()
+_WRITERS: Dict[Path, _AuditWriter] = {}
+
+
+def _writer(path: Path) -> _AuditWriter:
+    writer = _WRITERS.get(path)
+    if writer is None:
+        with _WRITERS_LOCK:
+            writer = _WRITERS.get(path)
+            if writer is None:
+                writer = _WRITERS[path] = _AuditWriter(_ensure(path), _SETTINGS)
+    return writer
+
+
+def _json_payload(payload: Dict[str, object]) -> Dict[str, object]:
+    """A JSON-only copy of `payload`, made on the caller's thread.
+
+    Raises TypeError/ValueError for values JSON cannot hold, so bad input
+    fails where it comes from instead of in the writer thread; the copy also
+    keeps later changes to the caller's dict out of the log.
+    """
+    return json.loads(json.dumps(payload, ensure_ascii=False))
+
+
+def write_audit_event(action: str, payload: Dict[str, object], path: Path = AUDIT_LOG_PATH) -> None:
+    event = {"ts": _now_iso(), "action": action, "payload": _json_payload(payload)}
+    _writer(path).submit([event])
+
+
+def write_audit_events(events: List[Tuple[str, Dict[str, object]]], path: Path = AUDIT_LOG_PATH) -> None:
+    """Queue several (action, payload) events at once; they are written together, in order."""
+    if not events:
+        return
+    ts = _now_iso()
+    batch = [{"ts": ts, "action": action, "payload": _json_payload(payload)} for action, payload in events]
+    _writer(path).submit(batch)
+
+
+def flush_audit(path: Path | None = None) -> None:
+    """Write and fsync everything queued so far (for one log, or all of them)."""
+    writers = [_WRITERS[path]] if path is not None and path in _WRITERS else []
+    if path is None:
+        writers = list(_WRITERS.values())
+    for writer in writers:
+        writer.flush()
+
+
+def shutdown_audit() -> None:
+    """Flush, fsync and stop every writer thread; later events start new ones."""
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(shutdown_audit)
+
+
+def _parse(lines: List[bytes]) -> List[Dict[str, object]]:
+    out = []
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(event, dict):
+            out.append(event)
     return out
+
+
+def read_recent_audit_events(limit: int = 100, path: Path = AUDIT_LOG_PATH) -> List[Dict[str, object]]:
+    """Last `limit` events, oldest first, reading blocks backwards from the newest segment."""
+    flush_audit(path)
+    limit = max(1, limit)
+    target = _ensure(path)
+    collected: List[List[Dict[str, object]]] = []
+    found = 0
+    try:
+        for segment in reversed(_list_segments(target)):
+            for block in reversed(_segment_blocks(segment)):
+                events = _parse(_read_block(segment, block))
+                collected.append(events)
+                found += len(events)
+                if found >= limit:
+                    break
+            if found >= limit:
+                break
+    except OSError:
+        pass
+    out = [event for events in reversed(collected) for event in events]
+    return out[-limit:]
+
+
+def _day_bound(value: Optional[str], upper: bool) -> Optional[str]:
+    # A bare date as upper bound covers the whole day.
+    if value and upper and len(value) == 10:
+        return value + "T\uffff"
+    return value
+
+
+def iter_audit_events(
+    action: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    entry_id: Optional[str] = None,
+    path: Path = AUDIT_LOG_PATH,
+) -> Iterator[Dict[str, object]]:
+    """Matching events, oldest first; blocks the index rules out are never read."""
+    flush_audit(path)
+    target = _ensure(path)
+    end = _day_bound(end, True)
+    for segment in _list_segments(target):
+        for block in _segment_blocks(segment):
+            if start and block.last_ts and block.last_ts < start:
+                continue
+            if end and block.first_ts and block.first_ts > end:
+                continue
+            if action and action not in block.actions:
+                continue
+            if entry_id and entry_id not in block.entry_ids:
+                continue
+            try:
+                lines = _read_block(segment, block)
+            except OSError:
+                continue
+            for event in _parse(lines):
+                ts = str(event.get("ts", ""))
+                if action and event.get("action") != action:
+                    continue
+                if start and ts < start:
+                    continue
+                if end and ts > end:
+                    continue
+                if entry_id:
+                    payload = event.get("payload")
+                    if not isinstance(payload, dict) or str(payload.get("entry_id")) != entry_id:
+                        continue
+                yield event
+
+
+def _iter_chain(
+    seg_dir: Path,
+    start_segment: Optional[str],
+    start_offset: int,
+) -> Iterator[Tuple[str, int, bytes]]:
+    """(segment, end offset, raw line) of every event after the given position."""
+    segments = sorted((p for p in seg_dir.iterdir() if _is_segment(p)), key=_segment_key)
+    for segment in segments:
+        key = _segment_key(segment)
+        if start_segment and key < start_segment:
+            continue
+        skip_until = start_offset if key == start_segment else 0
+        for block in _segment_blocks(segment):
+            if block.end <= skip_until:
+                continue
+            pos = block.offset
+            for line in _read_block_raw(segment, block).splitlines(keepends=True):
+                pos += len(line)
+                if pos > skip_until and line.strip():
+                    yield key, pos, line
+
+
+def verify_audit_chain(full: bool = False, path: Path = AUDIT_LOG_PATH) -> Dict[str, object]:
+    """Check the hash chain and checkpoints written since the last verified position.
+
+    The position reached is saved, signed, so the next call only reads newer
+    events; `full` rechecks the log from its first chained event. Without
+    AUDIT_CHECKPOINT_KEY nothing can be trusted as signed: every call is full
+    and checkpoints are not checked. The original audit_log.jsonl predates the
+    chain and is not covered.
+    """
+    flush_audit(path)
+    seg_dir = _segments_dir(_ensure(path))
+    # Writers hold the same lock while they append, rotate and compress.
+    with _writer_lock(seg_dir):
+        return _verify_chain(seg_dir, full)
+
+
+def _verify_chain(seg_dir: Path, full: bool) -> Dict[str, object]:
+    key = _checkpoint_key()
+    state_path = seg_dir / "verified.json"
+
+    start: Dict[str, object] = {"seq": 0, "hash": GENESIS_HASH, "segment": None, "offset": 0}
+    resumed = False
+    if not full and key is not None:
+        try:
+            saved = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            saved = None
+        if isinstance(saved, dict) and _signed(key, saved):
+            start, resumed = saved, True
+
+    checkpoints: Dict[int, Dict[str, object]] = {}
+    if key is not None:
+        try:
+            with (seg_dir / "checkpoints.jsonl").open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if int(record.get("seq", 0)) > int(start["seq"]):
+                        checkpoints[int(record["seq"])] = record
+        except OSError:
+            pass
+
+    seq, running = int(start["seq"]), str(start["hash"])
+    segment_key, offset = start.get("segment"), int(start.get("offset", 0))
+    checked = unchained = checkpoints_ok = 0
+    errors: List[str] = []
+    for segment_key, offset, line in _iter_chain(seg_dir, start.get("segment"), int(start.get("offset", 0))):
+        try:
+            event = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            errors.append(f"{segment_key}@{offset}: ligne illisible")
+            break
+        if "hash" not in event:
+            if seq == 0:
+                # Written before the chain existed.
+                unchained += 1
+                continue
+            errors.append(f"{segment_key}@{offset}: evenement sans hash")
+            break
+        if int(event.get("seq", -1)) != seq + 1:
+            errors.append(f"{segment_key}@{offset}: sequence {event.get('seq')} au lieu de {seq + 1}")
+            break
+        expected = _chain_hash(running, event)
+        if event["hash"] != expected:
+            errors.append(f"{segment_key}@{offset}: hash invalide (seq {seq + 1})")
+            break
+        seq, running = seq + 1, expected
+        checked += 1
+        record = checkpoints.pop(seq, None)
+        if record is not None:
+            if not _signed(key, record):
+                errors.append(f"checkpoint seq {seq}: signature invalide")
+                break
+            if record.get("hash") != running or record.get("segment") != segment_key or int(record.get("offset", -1)) != offset:
+                errors.append(f"checkpoint seq {seq}: ne correspond pas au journal")
+                break
+            checkpoints_ok += 1
+    if not errors and checkpoints:
+        errors.append(f"checkpoint seq {min(checkpoints)}: evenements manquants")
+
+    ok = not errors
+    if ok and checked and key is not None:
+        state: Dict[str, object] = {"seq": seq, "hash": running, "segment": segment_key, "offset": offset, "ts": _now_iso()}
+        state["sig"] = _sign(key, state)
+        tmp = state_path.with_name(state_path.name + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, state_path)
+    return {
+        "ok": ok,
+        "resumed_from_seq": int(start["seq"]) if resumed else None,
+        "events_checked": checked,
+        "checkpoints_checked": checkpoints_ok,
+        "unchained_events": unchained,
+        "checkpoints_signed": key is not None,
+        "last_seq": seq,
+        "last_hash": running,
+        "errors": errors,
+    }
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .models import AgentBoundaryState, ShiftAssignment
+from .tracker import TRACKER_DB_PATH, load_boundary_states, save_boundary_states
+
+# Rolling windows span 7 days, so 6 trailing days cover every window that
+# straddles the start of the next period.
+TRAILING_DAYS = 6
+
+
+def compute_boundary_states(
+    assignments: Iterable[ShiftAssignment],
+    agent_ids: Iterable[str],
+    start_date: str,
+    end_date: str,
+    previous: Optional[Dict[str, AgentBoundaryState]] = None,
+) -> Dict[str, AgentBoundaryState]:
+    """End-of-period state of each agent for the plan running start_date..end_date.
+
+    Inside the plan a day without assignment is a day off. Days before
+    start_date are taken from `previous` when it ends the day before;
+    otherwise they are unknown and left out, so `last_shifts` is shorter.
+    """
+    by_agent: Dict[str, Dict[str, str]] = {}
+    for a in assignments:
+        by_agent.setdefault(a.agent_id, {})[a.date] = a.shift
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    plan = [(end - timedelta(days=k)).isoformat() for k in range((end - start).days, -1, -1)]
+    adjoining = previous_end_date(start_date)
+    states: Dict[str, AgentBoundaryState] = {}
+    for agent_id in agent_ids:
+        worked = by_agent.get(agent_id, {})
+        seq = [worked.get(day) for day in plan]
+        prior = (previous or {}).get(agent_id)
+        if prior is not None and prior.end_date != adjoining:
+            prior = None
+        last_shifts = seq[-TRAILING_DAYS:]
+        missing = TRAILING_DAYS - len(last_shifts)
+        if missing > 0 and prior is not None:
+            last_shifts = list(prior.last_shifts[-missing:]) + last_shifts
+        streak = 0
+        for s in reversed(seq):
+            if s != "JOUR_12H":
+                break
+            streak += 1
+        if streak == len(seq) and prior is not None:
+            streak += prior.streak_12h
+        states[agent_id] = AgentBoundaryState(end_date=end_date, last_shifts=last_shifts, streak_12h=streak)
+    return states
+
+
+def previous_end_date(start_date: str) -> str:
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    return (start - timedelta(days=1)).isoformat()
+
+
+def save_states(
+    service_unit: str,
+    end_date: str,
+    states: Dict[str, AgentBoundaryState],
+    path: Path = TRACKER_DB_PATH,
+) -> None:
+    save_boundary_states(service_unit, end_date, {k: v.model_dump() for k, v in states.items()}, path)
+
+
+def load_states_before(service_unit: str, start_date: str, path: Path = TRACKER_DB_PATH) -> Dict[str, AgentBoundaryState]:
+    """States saved for the period of `service_unit` that ended the day before start_date."""
+    raw = load_boundary_states(service_unit, previous_end_date(start_date), path)
+    return {agent_id: AgentBoundaryState(**state) for agent_id, state in raw.items()}
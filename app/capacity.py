@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from .models import Agent, CapacityMixResult, CapacityRequest, GenerateRequest, RegimeMix
+from .scheduler import (
+    DAY_MINUTES,
+    ShiftInfo,
+    _date_range,
+    coverage_for_day,
+    global_allowed_shifts,
+    parse_shifts,
+    regime_allowed_shifts,
+    solve_planning,
+)
+
+
+def _max_days_per_window(
+    req: CapacityRequest,
+    shifts: Dict[str, ShiftInfo],
+    allowed: set[str],
+    window: int,
+) -> int:
+    """Upper bound on the days one agent of a regime can work in `window` days."""
+    rules = req.params.ruleset_defaults
+    shortest = min(shifts[s].duration for s in allowed)
+    days = min(window, rules.max_minutes_rolling_7d // shortest)
+    if rules.cycle_mode_enabled:
+        days = min(days, rules.max_minutes_per_week_excluding_overtime // shortest)
+    if window >= 7:
+        # A single day off only counts as weekly rest when the shifts around it
+        # leave enough hours; otherwise two consecutive days off are needed.
+        single_off = any(
+            (DAY_MINUTES - shifts[s1].end_min) + DAY_MINUTES + shifts[s2].start_min >= rules.weekly_rest_min_minutes
+            for s1 in allowed
+            for s2 in allowed
+        )
+        days = min(days, 6 if single_off else 5)
+    return days
+
+
+def _capacity(
+    req: CapacityRequest,
+    shifts: Dict[str, ShiftInfo],
+    allowed: set[str],
+    subset: Tuple[str, ...],
+    window: int,
+) -> Tuple[int, int]:
+    """(days, minutes) one agent can give to the shifts of `subset` per window."""
+    usable = allowed.intersection(subset)
+    if not usable:
+        return 0, 0
+    days = _max_days_per_window(req, shifts, usable, window)
+    rules = req.params.ruleset_defaults
+    minutes = min(rules.max_minutes_rolling_7d, days * max(shifts[s].duration for s in usable))
+    if rules.cycle_mode_enabled:
+        minutes = min(minutes, rules.max_minutes_per_week_excluding_overtime)
+    return days, minutes
+
+
+def _window_demand(req: CapacityRequest, window_days: List[str]) -> Dict[str, int]:
+    """Shift-days to cover per shift over one window."""
+    demand: Dict[str, int] = {}
+    for d in window_days:
+        for s, c in coverage_for_day(req.params, d).items():
+            if c > 0:
+                demand[s] = demand.get(s, 0) + c
+    return demand
+
+
+def _analytic_bounds(
+    req: CapacityRequest,
+    shifts: Dict[str, ShiftInfo],
+    allowed_by_regime: Dict[str, set[str]],
+    window_days: List[str],
+) -> Dict[str, int]:
+    """Mix-wide lower bounds on headcount, reported alongside the result."""
+    window = len(window_days)
+    demand = _window_demand(req, window_days)
+    demand_days = sum(demand.values())
+    demand_minutes = sum(c * shifts[s].duration for s, c in demand.items())
+    best_days = max(_max_days_per_window(req, shifts, a, window) for a in allowed_by_regime.values() if a)
+    rules = req.params.ruleset_defaults
+    best_minutes = rules.max_minutes_rolling_7d
+    if rules.cycle_mode_enabled:
+        best_minutes = min(best_minutes, rules.max_minutes_per_week_excluding_overtime)
+    return {
+        "coverage": max(sum(coverage_for_day(req.params, d).values()) for d in window_days),
+        "rolling_7d_minutes": math.ceil(demand_minutes / max(1, best_minutes)),
+        "weekly_rest_days": math.ceil(demand_days / max(1, best_days)),
+    }
+
+
+def _min_headcount(
+    req: CapacityRequest,
+    shifts: Dict[str, ShiftInfo],
+    allowed_by_regime: Dict[str, set[str]],
+    window_days: List[str],
+    min_total: int = 0,
+) -> Optional[Dict[str, int]]:
+    """Smallest regime counts whose combined capacity covers every subset of shifts."""
+    window = len(window_days)
+    demand = _window_demand(req, window_days)
+    regimes = sorted(allowed_by_regime)
+    model = cp_model.CpModel()
+    upper = sum(demand.values()) + min_total + 1
+    counts = {r: model.NewIntVar(0, upper, f"n_{r}") for r in regimes}
+    needed = sorted(demand)
+    for size in range(1, len(needed) + 1):
+        for subset in combinations(needed, size):
+            days_terms = []
+            minutes_terms = []
+            for r in regimes:
+                days, minutes = _capacity(req, shifts, allowed_by_regime[r], subset, window)
+                if days:
+                    days_terms.append(counts[r] * days)
+                    minutes_terms.append(counts[r] * minutes)
+            if not days_terms:
+                return None
+            model.Add(sum(days_terms) >= sum(demand[s] for s in subset))
+            model.Add(sum(minutes_terms) >= sum(demand[s] * shifts[s].duration for s in subset))
+    total = sum(counts.values())
+    model.Add(total >= min_total)
+    # Ties go to the most flexible regimes (those allowed on more shifts). The
+    # weight on total exceeds the largest possible tie-break sum, so one fewer
+    # agent always wins over any flexibility gain.
+    flexibility = sum(counts[r] * len(allowed_by_regime[r]) for r in regimes)
+    weight = upper * sum(len(allowed_by_regime[r]) for r in regimes) + 1
+    model.Minimize(total * weight - flexibility)
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 5
+    if solver.Solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return {r: int(solver.Value(counts[r])) for r in regimes}
+
+
+def _confirm(req: CapacityRequest, counts: Dict[str, int]) -> Tuple[bool, int]:
+    """Check a headcount on a synthetic planning; returns (feasible, solves)."""
+    params = req.params.model_copy(deep=True)
+    start = datetime.strptime(params.start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(params.end_date, "%Y-%m-%d").date()
+    params.end_date = min(end, start + timedelta(days=max(1, req.confirm_horizon_days) - 1)).isoformat()
+    params.use_tracker = False
+    params.record_tracker_on_generate = False
+    params.auto_add_agents_if_needed = False
+    params.draft_only = True
+    params.solver_time_limit_seconds = req.confirm_time_limit_seconds
+    agents = [
+        Agent(id=f"C{regime}_{i}", first_name=str(i), last_name=regime, regime=regime)
+        for regime, n in sorted(counts.items())
+        for i in range(1, n + 1)
+    ]
+    generate = GenerateRequest(params=params, agents=agents)
+    # The greedy draft settles most cases in milliseconds; CP-SAT only runs
+    # (bounded by confirm_time_limit_seconds) when the greedy pass fails.
+    result = solve_planning(generate)
+    return result.status == "ok", 0 if result.source == "heuristic" else 1
+
+
+def _evaluate_mix(req: CapacityRequest, mix: RegimeMix, index: int) -> CapacityMixResult:
+    started = time.monotonic()
+    name = mix.name or "+".join(mix.regimes) or f"mix_{index + 1}"
+    params = req.params
+
+    def _result(status: str, counts: Dict[str, int], lower: int, bounds: Dict[str, int], solves: int, explanation: str | None = None) -> CapacityMixResult:
+        return CapacityMixResult(
+            name=name,
+            regimes=list(mix.regimes),
+            status=status,
+            headcount_by_regime=counts,
+            total_headcount=sum(counts.values()),
+            lower_bound_total=lower,
+            bounds=bounds,
+            solves=solves,
+            solve_time_seconds=round(time.monotonic() - started, 3),
+            explanation=explanation,
+        )
+
+    unknown = [r for r in mix.regimes if r not in params.agent_regimes]
+    if unknown:
+        return _result("infeasible", {}, 0, {}, 0, f"Regimes inconnus: {', '.join(unknown)}")
+    days = _date_range(params.start_date, params.end_date)
+    if not days:
+        return _result("infeasible", {}, 0, {}, 0, "Période invalide")
+    shifts = parse_shifts(params)
+    global_allowed = global_allowed_shifts(params)
+    allowed_by_regime = {r: regime_allowed_shifts(params, r, global_allowed) for r in set(mix.regimes)}
+    allowed_by_regime = {r: a for r, a in allowed_by_regime.items() if a}
+    if not allowed_by_regime:
+        return _result("infeasible", {}, 0, {}, 0, f"Aucun shift autorise en mode {params.mode}")
+
+    # Any 7 consecutive days hold exactly one weekend, so the first week is representative.
+    window_days = days[:7]
+    counts = _min_headcount(req, shifts, allowed_by_regime, window_days)
+    if counts is None:
+        return _result("infeasible", {}, 0, {}, 0, "Couverture impossible avec ces regimes")
+    bounds = _analytic_bounds(req, shifts, allowed_by_regime, window_days)
+    lower = sum(counts.values())
+    if not req.confirm:
+        return _result("lower_bound", counts, lower, bounds, 0)
+
+    solves = 0
+    for _ in range(max(0, req.max_confirm_steps) + 1):
+        feasible, used = _confirm(req, counts)
+        solves += used
+        if feasible:
+            return _result("confirmed", counts, lower, bounds, solves)
+        next_counts = _min_headcount(req, shifts, allowed_by_regime, window_days, min_total=sum(counts.values()) + 1)
+        if next_counts is None:
+            break
+        counts = next_counts
+    return _result("lower_bound", counts, lower, bounds, solves, "Effectif non confirme par le solveur")
+
+
+def plan_capacity(req: CapacityRequest) -> List[CapacityMixResult]:
+    """Minimum headcount per regime for each candidate mix, evaluated in parallel."""
+    if not req.regime_mixes:
+        return []
+    workers = max(1, min(len(req.regime_mixes), os.cpu_count() or 1, req.max_parallel))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda item: _evaluate_mix(req, item[1], item[0]), enumerate(req.regime_mixes)))
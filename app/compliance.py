@@ -1,16 +1,30 @@
 from __future__ import annotations
 
+import json
 import os
 import re
 from dataclasses import dataclass
-from typing import Dict, List
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 
-EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.IGNORECASE)
+# Patterns are matched from the start of a token only (see SensitiveScanner),
+# so they carry no leading word boundary.
+EMAIL_PATTERN = r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b"
 # Broad FR phone detector (accepts spaces/dots/dashes).
-PHONE_RE = re.compile(r"\b(?:\+33|0)[ .-]?[1-9](?:[ .-]?\d{2}){4}\b")
-# NIR pattern (accept compact or separated form, 13-15 digits).
-NIR_RE = re.compile(r"\b[12](?:[ .-]?\d){12,14}\b")
+PHONE_PATTERN = r"(?:\+33|0)[ .-]?[1-9](?:[ .-]?\d{2}){4}\b"
+# NIR: sex, year, month, department (2A/2B for Corsica), commune, order and
+# an optional key; compact or grouped. When the key is there it must check out.
+NIR_PATTERN = r"[12][ .-]?\d{2}[ .-]?(?:0[1-9]|1[0-2]|[2-9]\d)[ .-]?(?:\d{2}|2[AB])[ .-]?\d{3}[ .-]?\d{3}(?:[ .-]?\d{2})?\b"
+# Hospital patient identifiers, only when labelled: a bare 8-digit number is
+# as likely a lot or room number. Wards can replace these (PATIENT_ID_PATTERNS).
+DEFAULT_PATIENT_ID_PATTERNS: Tuple[Tuple[str, str], ...] = (
+    ("ipp", r"(?:IPP|NIP)\s*(?:n[°o]\s*)?[:#]?\s*\d{6,10}\b"),
+    ("nda", r"(?:NDA|IEP)\s*(?:n[°o]\s*)?[:#]?\s*\d{6,12}\b"),
+)
+# A token starts where neither a word character nor the "+" of "+33" precedes.
+_TOKEN_START = r"(?<![\w+])"
+_NIR_SEPARATORS = str.maketrans("", "", " .-")
 
 
 @dataclass(frozen=True)
@@ -18,6 +32,22 @@ class ComplianceSettings:
     french_health_mode: bool
     block_patient_identifiers: bool
     live_task_retention_days: int
+    live_purge_interval_seconds: int = 3600
+    patient_id_patterns: Tuple[Tuple[str, str], ...] = DEFAULT_PATIENT_ID_PATTERNS
+    scan_workers: int = 1
+
+
+def _load_patient_id_patterns(raw: str) -> Tuple[Tuple[str, str], ...]:
+    """`{"ipp": "regex", ...}` from PATIENT_ID_PATTERNS; the defaults when unset or invalid."""
+    if not raw.strip():
+        return DEFAULT_PATIENT_ID_PATTERNS
+    try:
+        loaded = json.loads(raw)
+        patterns = tuple((str(kind), str(pattern)) for kind, pattern in loaded.items())
+        scanner_for(patterns)
+    except (ValueError, AttributeError, re.error):
+        return DEFAULT_PATIENT_ID_PATTERNS
+    return patterns
 
 
 def load_compliance_settings() -> ComplianceSettings:
@@ -28,29 +58,140 @@ def load_compliance_settings() -> ComplianceSettings:
         retention = max(1, int(retention_raw))
     except ValueError:
         retention = 90
+    try:
+        purge_interval = max(10, int(os.getenv("LIVE_PURGE_INTERVAL_SECONDS", "3600")))
+    except ValueError:
+        purge_interval = 3600
+    try:
+        scan_workers = max(1, int(os.getenv("COMPLIANCE_SCAN_WORKERS", "") or os.cpu_count() or 1))
+    except ValueError:
+        scan_workers = os.cpu_count() or 1
     return ComplianceSettings(
         french_health_mode=mode,
         block_patient_identifiers=block,
         live_task_retention_days=retention,
+        live_purge_interval_seconds=purge_interval,
+        patient_id_patterns=_load_patient_id_patterns(os.getenv("PATIENT_ID_PATTERNS", "")),
+        scan_workers=scan_workers,
     )
 
 
-def detect_sensitive_patterns(text: str) -> List[str]:
-    content = text or ""
-    hits: List[str] = []
-    if EMAIL_RE.search(content):
-        hits.append("email")
-    if PHONE_RE.search(content):
-        hits.append("phone")
-    if NIR_RE.search(content):
-        hits.append("nir")
-    return hits
+def nir_key_is_valid(candidate: str) -> bool:
+    """Whether the last two digits of a NIR are 97 - (first 13 digits mod 97)."""
+    digits = candidate.translate(_NIR_SEPARATORS).upper()
+    if len(digits) != 15:
+        return False
+    body = digits[:5] + {"2A": "19", "2B": "18"}.get(digits[5:7], digits[5:7]) + digits[7:13]
+    if not body.isdigit() or not digits[13:].isdigit():
+        return False
+    return int(digits[13:]) == 97 - int(body) % 97
+
+
+def _nir_has_key(candidate: str) -> bool:
+    return len(candidate.translate(_NIR_SEPARATORS)) == 15
+
+
+@dataclass(frozen=True)
+class SensitiveMatch:
+    kind: str
+    start: int
+    end: int
+
+
+class SensitiveScanner:
+    """Every sensitive pattern compiled into one alternation and found in a single pass.
+
+    The alternation sits behind a single token-start check, so the engine
+    tries the branches only where a word begins instead of running one search
+    per pattern over the whole text. Each branch is a named group ("k0",
+    "k1", ...) mapped back to its kind; NIR candidates whose key is present
+    but wrong are dropped and the scan resumes one character further.
+    """
+
+    def __init__(self, patient_id_patterns: Tuple[Tuple[str, str], ...]) -> None:
+        for _, pattern in patient_id_patterns:
+            re.compile(pattern)  # a stray ")" would otherwise leak out of its group
+        branches = [("email", EMAIL_PATTERN), ("phone", PHONE_PATTERN), ("nir", NIR_PATTERN), *patient_id_patterns]
+        self.kinds: List[str] = list(dict.fromkeys(kind for kind, _ in branches))
+        self._group_kind = {f"k{i}": kind for i, (kind, _) in enumerate(branches)}
+        self.regex = self._compile(branches)
+        # An email needs an "@": texts without one skip that branch, the
+        # costliest to try since it can start on any word character.
+        self._regex_without_email = self._compile(branches, skip="email")
+
+    @staticmethod
+    def _compile(branches: List[Tuple[str, str]], skip: str = "") -> "re.Pattern[str]":
+        alternation = "|".join(f"(?P<k{i}>{pattern})" for i, (kind, pattern) in enumerate(branches) if kind != skip)
+        return re.compile(f"{_TOKEN_START}(?:{alternation})", re.IGNORECASE)
+
+    def _next(self, search: Callable[[str, int], Optional["re.Match[str]"]], text: str, pos: int) -> Optional["re.Match[str]"]:
+        """First match at or after `pos`, skipping NIR candidates whose key is wrong."""
+        while True:
+            match = search(text, pos)
+            if match is None or self._group_kind[match.lastgroup] != "nir":
+                return match
+            candidate = match.group()
+            if not _nir_has_key(candidate) or nir_key_is_valid(candidate):
+                return match
+            pos = match.start() + 1
+
+    def _search_for(self, text: str) -> Callable[[str, int], Optional["re.Match[str]"]]:
+        return (self.regex if "@" in text else self._regex_without_email).search
+
+    def finditer(self, text: str) -> Iterator[SensitiveMatch]:
+        search = self._search_for(text)
+        pos = 0
+        while True:
+            match = self._next(search, text, pos)
+            if match is None:
+                return
+            start, end = match.span()
+            yield SensitiveMatch(self._group_kind[match.lastgroup], start, end)
+            pos = end if end > start else start + 1
+
+    def kinds_in(self, text: str) -> List[str]:
+        """Kinds found in `text`, in declaration order; stops once all are seen."""
+        search = self._search_for(text)
+        match = self._next(search, text, 0)
+        if match is None:
+            return []
+        found = set()
+        while match is not None:
+            found.add(self._group_kind[match.lastgroup])
+            if len(found) == len(self.kinds):
+                break
+            start, end = match.span()
+            match = self._next(search, text, end if end > start else start + 1)
+        return [kind for kind in self.kinds if kind in found]
+
+
+@lru_cache(maxsize=8)
+def scanner_for(patient_id_patterns: Tuple[Tuple[str, str], ...] = DEFAULT_PATIENT_ID_PATTERNS) -> SensitiveScanner:
+    return SensitiveScanner(patient_id_patterns)
+
+
+def detect_sensitive_patterns(
+    text: str,
+    patient_id_patterns: Tuple[Tuple[str, str], ...] = DEFAULT_PATIENT_ID_PATTERNS,
+) -> List[str]:
+    # The defaults skip hashing the pattern tuple for the cache lookup on every call.
+    scanner = scanner_for() if patient_id_patterns is DEFAULT_PATIENT_ID_PATTERNS else scanner_for(patient_id_patterns)
+    return scanner.kinds_in(text or "")
+
+
+def scan_chunk(
+    texts: List[str],
+    patient_id_patterns: Tuple[Tuple[str, str], ...] = DEFAULT_PATIENT_ID_PATTERNS,
+) -> List[List[Tuple[str, int, int]]]:
+    """(kind, start, end) of every match, per text; top-level so a process pool can run it."""
+    finditer = scanner_for(patient_id_patterns).finditer
+    return [[(m.kind, m.start, m.end) for m in finditer(text)] for text in texts]
 
 
 def validate_live_text_for_french_health(text: str, settings: ComplianceSettings) -> List[str]:
     if not settings.french_health_mode or not settings.block_patient_identifiers:
         return []
-    return detect_sensitive_patterns(text)
+    return detect_sensitive_patterns(text, settings.patient_id_patterns)
 
 
 def french_health_compliance_snapshot(settings: ComplianceSettings) -> Dict[str, object]:
@@ -60,6 +201,8 @@ def french_health_compliance_snapshot(settings: ComplianceSettings) -> Dict[str,
         "controls": {
             "block_patient_identifiers": settings.block_patient_identifiers,
             "live_task_retention_days": settings.live_task_retention_days,
+            "live_purge_interval_seconds": settings.live_purge_interval_seconds,
+            "detected_identifier_kinds": scanner_for(settings.patient_id_patterns).kinds,
             "audit_logging": True,
             "minimum_data_ui_notice": True,
             "day_only_scope_enforced": True,
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from .models import DEFAULT_SHIFTS, ExportRequest
+from .tracker import TrackerSnapshot
+
+CSV_BASE_COLUMNS = ["agent_id", "agent_name", "date", "shift"]
+CSV_EXTRA_COLUMNS = ["shift_start", "shift_end", "duration_minutes", "iso_week", "weekend"]
+# Rows are written to a small buffer and handed out in blocks of this size.
+CSV_ROWS_PER_CHUNK = 2000
+
+
+def agent_display_names(req: ExportRequest) -> Dict[str, str]:
+    return {a.id: f"{a.last_name} {a.first_name}".strip() for a in req.agents}
+
+
+def iter_csv_rows(req: ExportRequest) -> Iterator[List[object]]:
+    """Header then one row per assignment, in request order."""
+    extras = [c for c in CSV_EXTRA_COLUMNS if c in req.csv_extra_columns]
+    yield CSV_BASE_COLUMNS + extras
+    names = agent_display_names(req)
+    shifts = req.shifts or DEFAULT_SHIFTS
+    # A year-long export repeats the same few hundred dates: parse each once.
+    days: Dict[str, Tuple[int, int]] = {}
+    for a in req.assignments:
+        row: List[object] = [a.agent_id, names.get(a.agent_id, a.agent_id), a.date, a.shift]
+        if extras:
+            day = days.get(a.date)
+            if day is None:
+                parsed = datetime.strptime(a.date, "%Y-%m-%d").date()
+                day = days[a.date] = (parsed.isocalendar()[1], 1 if parsed.weekday() >= 5 else 0)
+            shift = shifts.get(a.shift)
+            values = {
+                "shift_start": shift.start if shift else "",
+                "shift_end": shift.end if shift else "",
+                "duration_minutes": shift.duration_minutes if shift else "",
+                "iso_week": day[0],
+                "weekend": day[1],
+            }
+            row.extend(values[c] for c in extras)
+        yield row
+
+
+def iter_csv_bytes(rows: Iterable[List[object]], compress: bool = False) -> Iterator[bytes]:
+    """UTF-8 CSV in blocks of CSV_ROWS_PER_CHUNK rows, optionally as one gzip stream."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending < CSV_ROWS_PER_CHUNK:
+            continue
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        pending = 0
+        data = gzip.compress(data) if gzip else data
+        if data:
+            yield data
+    data = buffer.getvalue().encode("utf-8")
+    if gzip:
+        data = gzip.compress(data) + gzip.flush()
+    if data:
+        yield data
+
+
+PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT = landscape(A4)
+PDF_MARGIN = 28.0
+PDF_ROWS_PER_PAGE = 40
+PDF_ROW_HEIGHT = 11.5
+PDF_HEADER_HEIGHT = 18.0
+PDF_NAME_WIDTH = 130.0
+PDF_TOTAL_WIDTH = 44.0
+PDF_DAYS_PER_PAGE = 31
+PDF_DAY_WIDTH = (PDF_PAGE_WIDTH - 2 * PDF_MARGIN - PDF_NAME_WIDTH - PDF_TOTAL_WIDTH) / PDF_DAYS_PER_PAGE
+PDF_GRID_TOP = PDF_PAGE_HEIGHT - PDF_MARGIN - 34
+# Cell letter and fill colour per shift; other codes get their initial on white.
+PDF_SHIFT_STYLES: Dict[str, Tuple[str, Tuple[float, float, float]]] = {
+    "MATIN": ("M", (0.80, 0.89, 0.98)),
+    "SOIR": ("S", (0.99, 0.85, 0.70)),
+    "JOUR_12H": ("J", (0.80, 0.93, 0.80)),
+}
+PDF_WEEKEND_FILL = (0.92, 0.92, 0.92)
+_MONTHS = ["Janvier", "Fevrier", "Mars", "Avril", "Mai", "Juin", "Juillet", "Aout", "Septembre", "Octobre", "Novembre", "Decembre"]
+_WEEKDAYS = "LMMJVSD"
+# Fixed object numbers; pages, templates and their streams follow.
+_CATALOG, _PAGES, _FONT, _FONT_BOLD, _RESOURCES = 1, 2, 3, 4, 5
+
+
+def _pdf_string(text: str) -> str:
+    """PDF literal string for WinAnsi-encoded Helvetica, as latin-1 characters."""
+    raw = text.encode("cp1252", "replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _fit(text: str, font: str, size: float, width: float) -> str:
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+class _PdfWriter:
+    """Serialises objects one at a time and remembers their offsets for the xref table."""
+
+    def __init__(self) -> None:
+        self.offsets: Dict[int, int] = {}
+        self.position = 0
+        self.last_id = _RESOURCES
+
+    def reserve(self) -> int:
+        self.last_id += 1
+        return self.last_id
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def obj(self, num: int, body: str) -> bytes:
+        self.offsets[num] = self.position
+        return self._emit(f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+
+    def stream(self, num: int, entries: str, content: str) -> bytes:
+        data = zlib.compress(content.encode("latin-1"), 6)
+        self.offsets[num] = self.position
+        head = f"{num} 0 obj\n<< {entries} /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode("latin-1")
+        return self._emit(head + data + b"\nendstream\nendobj\n")
+
+    def trailer(self) -> bytes:
+        size = self.last_id + 1
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self.offsets[num]:010d} 00000 n \n" for num in range(1, size))
+        lines.append(f"trailer\n<< /Size {size} /Root {_CATALOG} 0 R >>\nstartxref\n{self.position}\n%%EOF\n")
+        return self._emit("".join(lines).encode("latin-1"))
+
+
+def _grid_template(n_rows: int, n_days: int) -> str:
+    """Lines of an agent x day grid; drawn once per file and reused by every page of that shape."""
+    left = PDF_MARGIN
+    right = PDF_MARGIN + PDF_NAME_WIDTH + n_days * PDF_DAY_WIDTH + PDF_TOTAL_WIDTH
+    top = PDF_GRID_TOP
+    bottom = top - PDF_HEADER_HEIGHT - n_rows * PDF_ROW_HEIGHT
+    ops = ["0.6 0.6 0.6 RG 0.4 w"]
+    for r in range(n_rows + 1):
+        y = bottom + r * PDF_ROW_HEIGHT
+        ops.append(f"{left:.2f} {y:.2f} m {right:.2f} {y:.2f} l")
+    ops.append(f"{left:.2f} {top:.2f} m {right:.2f} {top:.2f} l")
+    xs = [left, left + PDF_NAME_WIDTH]
+    xs.extend(left + PDF_NAME_WIDTH + (d + 1) * PDF_DAY_WIDTH for d in range(n_days))
+    xs.append(right)
+    for x in xs:
+        ops.append(f"{x:.2f} {bottom:.2f} m {x:.2f} {top:.2f} l")
+    ops.append("S")
+    return "\n".join(ops)
+
+
+def _text(x: float, y: float, literal: str) -> str:
+    return f"1 0 0 1 {x:.2f} {y:.2f} Tm {literal} Tj"
+
+
+def _page_frame(title: str, subtitle: str, page_no: int, page_count: int) -> List[str]:
+    footer = f"Page {page_no}/{page_count}"
+    return [
+        "0 g BT",
+        f"/F2 11 Tf {_text(PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN - 11, _pdf_string(title))}",
+        f"/F1 8 Tf {_text(PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN - 24, _pdf_string(subtitle))}",
+        f"/F1 7 Tf {_text(PDF_PAGE_WIDTH - PDF_MARGIN - stringWidth(footer, 'Helvetica', 7), 14, _pdf_string(footer))}",
+        "ET",
+    ]
+
+
+def iter_planning_pdf(req: ExportRequest, tracker: Optional[TrackerSnapshot] = None) -> Iterator[bytes]:
+    """Landscape agent x day grid, one page per month and block of agents, then an hours summary.
+
+    Each page is serialised and handed out as soon as it is drawn; fonts,
+    the shared resources and one grid template per page shape are written
+    once. `tracker` is an already-loaded snapshot for the annual hours.
+    """
+    shifts = req.shifts or DEFAULT_SHIFTS
+    names = agent_display_names(req)
+    agent_ids = [a.id for a in req.agents]
+    known = set(agent_ids)
+    agent_ids.extend(sorted({a.agent_id for a in req.assignments} - known))
+    row_of = {agent_id: i for i, agent_id in enumerate(agent_ids)}
+
+    dates = sorted({a.date for a in req.assignments})
+    first = req.start_date or (dates[0] if dates else None)
+    last = req.end_date or (dates[-1] if dates else None)
+    days: List[date] = []
+    if first and last:
+        cur, end = date.fromisoformat(first), date.fromisoformat(last)
+        while cur <= end:
+            days.append(cur)
+            cur += timedelta(days=1)
+    day_of = {d.isoformat(): i for i, d in enumerate(days)}
+
+    cells: List[Dict[int, str]] = [{} for _ in agent_ids]
+    period_minutes = [0] * len(agent_ids)
+    shift_counts: List[Dict[str, int]] = [{} for _ in agent_ids]
+    for a in req.assignments:
+        row = row_of[a.agent_id]
+        shift = shifts.get(a.shift)
+        period_minutes[row] += shift.duration_minutes if shift else 0
+        counts = shift_counts[row]
+        counts[a.shift] = counts.get(a.shift, 0) + 1
+        d = day_of.get(a.date)
+        if d is not None:
+            cells[row][d] = a.shift
+
+    # Month slices of at most PDF_DAYS_PER_PAGE days.
+    slices: List[Tuple[int, int]] = []
+    for i, d in enumerate(days):
+        if not slices or d.month != days[slices[-1][0]].month or i - slices[-1][0] >= PDF_DAYS_PER_PAGE:
+            slices.append((i, i + 1))
+        else:
+            slices[-1] = (slices[-1][0], i + 1)
+    blocks = [(r, min(r + PDF_ROWS_PER_PAGE, len(agent_ids))) for r in range(0, len(agent_ids), PDF_ROWS_PER_PAGE)]
+    summary_pages = max(1, -(-len(agent_ids) // PDF_ROWS_PER_PAGE))
+    page_count = len(slices) * len(blocks) + summary_pages
+
+    title = "Planning Jour MVP"
+    meta = " ".join(
+        part
+        for part in [
+            f"Service: {req.service_unit}" if req.service_unit else "",
+            f"Periode: {first} -> {last}" if first and last else "",
+        ]
+        if part
+    )
+    fallback_names = tracker.names if tracker else {}
+    fitted_names = [
+        _pdf_string(_fit(names.get(aid) or fallback_names.get(aid, aid), "Helvetica", 7, PDF_NAME_WIDTH - 6))
+        for aid in agent_ids
+    ]
+    letters: Dict[str, Tuple[str, float]] = {}
+    for code in {s for row in cells for s in row.values()}:
+        letter = PDF_SHIFT_STYLES[code][0] if code in PDF_SHIFT_STYLES else code[:1]
+        letters[code] = (_pdf_string(letter), stringWidth(letter, "Helvetica", 6.5) / 2)
+
+    writer = _PdfWriter()
+    yield writer.header()
+    yield writer.obj(_CATALOG, f"<< /Type /Catalog /Pages {_PAGES} 0 R >>")
+    yield writer.obj(_FONT, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    yield writer.obj(_FONT_BOLD, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    templates: Dict[Tuple[int, int], str] = {}
+    template_ids: Dict[str, int] = {}
+    page_ids: List[int] = []
+
+    def _page(content: List[str]) -> bytes:
+        content_id, page_id = writer.reserve(), writer.reserve()
+        page_ids.append(page_id)
+        return writer.stream(content_id, "", "\n".join(content)) + writer.obj(
+            page_id,
+            f"<< /Type /Page /Parent {_PAGES} 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH:.2f} {PDF_PAGE_HEIGHT:.2f}] "
+            f"/Resources {_RESOURCES} 0 R /Contents {content_id} 0 R >>",
+        )
+
+    name_x = PDF_MARGIN + 3
+    day_x0 = PDF_MARGIN + PDF_NAME_WIDTH
+    header_y = PDF_GRID_TOP - PDF_HEADER_HEIGHT
+    for s_start, s_end in slices:
+        n_days = s_end - s_start
+        month = days[s_start]
+        col_x = [day_x0 + k * PDF_DAY_WIDTH for k in range(n_days)]
+        total_right = day_x0 + n_days * PDF_DAY_WIDTH + PDF_TOTAL_WIDTH - 3
+        weekend_cols = [k for k in range(n_days) if days[s_start + k].weekday() >= 5]
+        day_labels = []
+        for k in range(n_days):
+            d = days[s_start + k]
+            number = str(d.day)
+            cx = col_x[k] + PDF_DAY_WIDTH / 2
+            day_labels.append(_text(cx - stringWidth(number, "Helvetica-Bold", 6.5) / 2, header_y + 9, _pdf_string(number)))
+            letter = _WEEKDAYS[d.weekday()]
+            day_labels.append(_text(cx - stringWidth(letter, "Helvetica", 5.5) / 2, header_y + 2.5, _pdf_string(letter)))
+        for b_start, b_end in blocks:
+            n_rows = b_end - b_start
+            key = (n_rows, n_days)
+            if key not in templates:
+                template_id = writer.reserve()
+                name = templates[key] = f"G{len(templates) + 1}"
+                template_ids[name] = template_id
+                yield writer.stream(
+                    template_id,
+                    f"/Type /XObject /Subtype /Form /BBox [0 0 {PDF_PAGE_WIDTH:.2f} {PDF_PAGE_HEIGHT:.2f}]",
+                    _grid_template(n_rows, n_days),
+                )
+            bottom = header_y - n_rows * PDF_ROW_HEIGHT
+            subtitle = f"{meta}   {_MONTHS[month.month - 1]} {month.year} - agents {b_start + 1} a {b_end} sur {len(agent_ids)}".strip()
+            content = _page_frame(title, subtitle, len(page_ids) + 1, page_count)
+            if weekend_cols:
+                content.append("%.2f %.2f %.2f rg" % PDF_WEEKEND_FILL)
+                content.extend(f"{col_x[k]:.2f} {bottom:.2f} {PDF_DAY_WIDTH:.2f} {PDF_GRID_TOP - bottom:.2f} re" for k in weekend_cols)
+                content.append("f")
+            content.append(f"/{templates[key]} Do")
+            fills: Dict[str, List[str]] = {}
+            row_names: List[str] = []
+            cell_letters: List[str] = []
+            totals: List[str] = []
+            for r in range(b_start, b_end):
+                y = header_y - (r - b_start + 1) * PDF_ROW_HEIGHT
+                row_names.append(_text(name_x, y + 3.2, fitted_names[r]))
+                minutes = 0
+                for d, code in cells[r].items():
+                    if not s_start <= d < s_end:
+                        continue
+                    k = d - s_start
+                    shift = shifts.get(code)
+                    minutes += shift.duration_minutes if shift else 0
+                    fills.setdefault(code, []).append(f"{col_x[k] + 0.6:.2f} {y + 0.6:.2f} {PDF_DAY_WIDTH - 1.2:.2f} {PDF_ROW_HEIGHT - 1.2:.2f} re")
+                    literal, half = letters[code]
+                    cell_letters.append(_text(col_x[k] + PDF_DAY_WIDTH / 2 - half, y + 3.3, literal))
+                label = f"{minutes / 60:.1f}h"
+                totals.append(_text(total_right - stringWidth(label, "Helvetica", 7), y + 3.2, _pdf_string(label)))
+            for code, rects in fills.items():
+                if code in PDF_SHIFT_STYLES:
+                    content.append("%.2f %.2f %.2f rg" % PDF_SHIFT_STYLES[code][1])
+                    content.extend(rects)
+                    content.append("f")
+            content.append("0 g BT /F2 6.5 Tf")
+            content.extend(day_labels[0::2])
+            content.append("/F1 5.5 Tf")
+            content.extend(day_labels[1::2])
+            content.append(f"/F2 7 Tf {_text(name_x, header_y + 5, _pdf_string('Agent'))}")
+            content.append(_text(total_right - stringWidth("Heures", "Helvetica-Bold", 7), header_y + 5, _pdf_string("Heures")))
+            content.append("/F1 7 Tf")
+            content.extend(row_names)
+            content.extend(totals)
+            content.append("/F1 6.5 Tf")
+            content.extend(cell_letters)
+            content.append("ET")
+            yield _page(content)
+
+    # Hours summary, with the annual totals of the tracker when available.
+    year_label = f"Heures {tracker.year} (suivi)" if tracker else "Heures annuelles"
+    columns = [("Agent", PDF_MARGIN), ("Shifts", PDF_MARGIN + 230), ("Heures periode", PDF_MARGIN + 420)]
+    columns += [(year_label, PDF_MARGIN + 520), ("Cible", PDF_MARGIN + 640)]
+    targets = {a.id: a.annual_target_hours for a in req.agents}
+    for page in range(summary_pages):
+        content = _page_frame(title, f"{meta}   Synthese par agent".strip(), len(page_ids) + 1, page_count)
+        top = PDF_GRID_TOP - 10
+        content.append("BT /F2 8 Tf")
+        content.extend(_text(x, top, _pdf_string(label)) for label, x in columns)
+        content.append("/F1 8 Tf")
+        rows = range(page * PDF_ROWS_PER_PAGE, min((page + 1) * PDF_ROWS_PER_PAGE, len(agent_ids)))
+        for i, r in enumerate(rows):
+            aid = agent_ids[r]
+            y = top - (i + 1) * PDF_ROW_HEIGHT - 4
+            counts = ", ".join(f"{code} {n}" for code, n in sorted(shift_counts[r].items()))
+            target = targets.get(aid)
+            values = [
+                fitted_names[r],
+                _pdf_string(counts or "-"),
+                _pdf_string(f"{period_minutes[r] / 60:.1f}h"),
+                _pdf_string(f"{tracker.minutes.get(aid, 0) / 60:.1f}h" if tracker else "-"),
+                _pdf_string(f"{target:.0f}h" if target is not None else "-"),
+            ]
+            content.extend(_text(x, y, value) for (_, x), value in zip(columns, values))
+        content.append("ET")
+        content.append(f"0.6 G 0.4 w {PDF_MARGIN:.2f} {top - 4:.2f} m {PDF_PAGE_WIDTH - PDF_MARGIN:.2f} {top - 4:.2f} l S")
+        yield _page(content)
+
+    xobjects = " ".join(f"/{name} {num} 0 R" for name, num in template_ids.items())
+    fonts = f"/F1 {_FONT} 0 R /F2 {_FONT_BOLD} 0 R"
+    yield writer.obj(_RESOURCES, f"<< /Font << {fonts} >> /XObject << {xobjects} >> >>")
+    kids = " ".join(f"{num} 0 R" for num in page_ids)
+    yield writer.obj(_PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>")
+    yield writer.trailer()
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from .models import Agent, GenerateRequest, ShiftAssignment
+
+if TYPE_CHECKING:
+    from .scheduler import ShiftInfo
+
+DAY_MINUTES = 24 * 60
+
+
+def build_greedy_draft(
+    req: GenerateRequest,
+    agents: List[Agent],
+    days: List[str],
+    shifts: Dict[str, "ShiftInfo"],
+    allowed_by_agent: Dict[int, Set[str]],
+    min_rest: int,
+    forbidden_pairs: Set[Tuple[str, str]],
+    baseline_minutes: Dict[str, int] | None = None,
+    trailing: Dict[str, List[Optional[str]]] | None = None,
+) -> Optional[List[ShiftAssignment]]:
+    """Constructive draft: fill coverage day by day, least-loaded agents first.
+
+    `trailing` holds, per agent, the last shifts of the previous period (oldest
+    first); they are kept as fixed days in front of the plan so every rule
+    also sees the boundary.
+
+    Returns None when the greedy pass cannot cover a shift without breaking a
+    hard rule; the CP-SAT model is then solved without a hint.
+    """
+    params = req.params
+    rules = params.ruleset_defaults
+    baseline_minutes = baseline_minutes or {}
+    n_days = len(days)
+    day_index = {d: i for i, d in enumerate(days)}
+    parsed = [datetime.strptime(d, "%Y-%m-%d").date() for d in days]
+    weekend = [d.weekday() >= 5 for d in parsed]
+    iso_week = [tuple(d.isocalendar())[:2] for d in parsed]
+    exception_dates = set(params.allowed_12h_exception_dates)
+
+    trailing = trailing or {}
+    # Rows start with `offset` fixed days from the previous period; plan
+    # index e is day e - offset of the period.
+    offset = max((len(t) for t in trailing.values()), default=0)
+    plan: List[List[Optional[str]]] = []
+    for agent in agents:
+        prefix = [s if s in shifts else None for s in trailing.get(agent.id, [])][-offset:] if offset else []
+        plan.append([None] * (offset - len(prefix)) + prefix + [None] * n_days)
+    n_ext = offset + n_days
+    locked: List[Set[int]] = [set() for _ in agents]
+    minutes = [baseline_minutes.get(a.id, 0) for a in agents]
+    soir_count = [0 for _ in agents]
+    weekend_count = [0 for _ in agents]
+    exceptions_used = [0 for _ in agents]
+    unavailable = [set(a.unavailability_dates) for a in agents]
+    max_consec = [params.agent_regimes[a.regime].max_consecutive_12h_days or 0 for a in agents]
+    prefs = [{(p.date, p.shift): p for p in a.preferences} for a in agents]
+
+    def _bad_transition(s1: Optional[str], s2: Optional[str]) -> bool:
+        if s1 is None or s2 is None:
+            return False
+        if (s1, s2) in forbidden_pairs:
+            return True
+        return (DAY_MINUTES - shifts[s1].end_min) + shifts[s2].start_min < min_rest
+
+    def _has_rest_block(row: List[Optional[str]], start: int, end: int) -> bool:
+        for d in range(start, end):
+            if row[d] is None and row[d + 1] is None:
+                return True
+        for d in range(start, end - 1):
+            s1, s2 = row[d], row[d + 2]
+            if s1 is None or row[d + 1] is not None or s2 is None:
+                continue
+            rest = (DAY_MINUTES - shifts[s1].end_min) + DAY_MINUTES + shifts[s2].start_min
+            if rest >= rules.weekly_rest_min_minutes:
+                return True
+        return False
+
+    def _rest_possible(row: List[Optional[str]], start: int, end: int) -> bool:
+        """Whether a rest block could fit in [start, end] given only the fixed boundary days."""
+        def _free(p: int) -> bool:
+            return p >= offset or row[p] is None
+
+        for p in range(start, end):
+            if _free(p) and _free(p + 1):
+                return True
+        for p in range(start, end - 1):
+            if not _free(p + 1):
+                continue
+            lefts = [row[p]] if p < offset else list(shifts)
+            rights = [row[p + 2]] if p + 2 < offset else list(shifts)
+            for s1 in lefts:
+                for s2 in rights:
+                    if s1 is None or s2 is None:
+                        continue
+                    if (DAY_MINUTES - shifts[s1].end_min) + DAY_MINUTES + shifts[s2].start_min >= rules.weekly_rest_min_minutes:
+                        return True
+        return False
+
+    def _can_work(a_idx: int, d: int, s: str) -> bool:
+        row = plan[a_idx]
+        e = d + offset
+        if row[e] is not None or days[d] in unavailable[a_idx] or s not in allowed_by_agent[a_idx]:
+            return False
+        if agents[a_idx].regime == "REGIME_MIXTE" and s == "JOUR_12H":
+            if exception_dates and days[d] not in exception_dates:
+                return False
+            if params.max_12h_exceptions_per_agent > 0 and exceptions_used[a_idx] >= params.max_12h_exceptions_per_agent:
+                return False
+        if e > 0 and _bad_transition(row[e - 1], s):
+            return False
+        if e + 1 < n_ext and _bad_transition(s, row[e + 1]):
+            return False
+        row[e] = s
+        try:
+            if params.forbid_matin_soir_matin:
+                for k in range(max(0, e - 2), min(e, n_ext - 3) + 1):
+                    if (row[k], row[k + 1], row[k + 2]) == ("MATIN", "SOIR", "MATIN"):
+                        return False
+            limit = max_consec[a_idx]
+            if limit > 0 and s == "JOUR_12H":
+                for k in range(max(0, e - limit), min(e, n_ext - limit - 1) + 1):
+                    if all(row[k + j] == "JOUR_12H" for j in range(limit + 1)):
+                        return False
+            for w in range(max(0, e - 6), e + 1):
+                total = sum(shifts[x].duration for x in row[w:w + 7] if x is not None)
+                if total > rules.max_minutes_rolling_7d:
+                    return False
+            if rules.cycle_mode_enabled:
+                total = sum(
+                    shifts[row[k + offset]].duration
+                    for k in range(n_days)
+                    if row[k + offset] is not None and iso_week[k] == iso_week[d]
+                )
+                if total > rules.max_minutes_per_week_excluding_overtime:
+                    return False
+            # Working day e is only safe if the 7-day window ending at e + 1
+            # already holds a weekly rest block; this keeps every later window
+            # satisfiable whatever happens on the following days.
+            if n_ext >= 7 and e >= 5 and d not in locked[a_idx]:
+                if not _has_rest_block(row, e - 5, e):
+                    return False
+            return True
+        finally:
+            row[e] = None
+
+    def _place(a_idx: int, d: int, s: str) -> None:
+        plan[a_idx][d + offset] = s
+        minutes[a_idx] += shifts[s].duration
+        if s == "SOIR":
+            soir_count[a_idx] += 1
+        if weekend[d]:
+            weekend_count[a_idx] += 1
+        if agents[a_idx].regime == "REGIME_MIXTE" and s == "JOUR_12H":
+            exceptions_used[a_idx] += 1
+
+    agent_index = {a.id: i for i, a in enumerate(agents)}
+    for lock in req.locked_assignments:
+        a_idx = agent_index.get(lock.agent_id)
+        d = day_index.get(lock.date)
+        if a_idx is None or d is None:
+            continue
+        locked[a_idx].add(d)
+        if lock.shift not in shifts or not _can_work(a_idx, d, lock.shift):
+            return None
+        _place(a_idx, d, lock.shift)
+
+    def _priority(a_idx: int, d: int, s: str) -> Tuple[int, int, int, int, float, int]:
+        agent = agents[a_idx]
+        pref = prefs[a_idx].get((days[d], s))
+        pref_cost = 0
+        if pref is not None:
+            pref_cost = -pref.weight if pref.type == "prefer" else pref.weight
+        return (
+            1 if agent.id.startswith("R") else 0,
+            pref_cost,
+            soir_count[a_idx] if s == "SOIR" else 0,
+            weekend_count[a_idx] if weekend[d] else 0,
+            minutes[a_idx] * 100 / max(1, int(agent.quotity)),
+            a_idx,
+        )
+
+    for d in range(n_days):
+        coverage = dict(params.coverage_requirements)
+        if weekend[d]:
+            coverage.update(params.weekend_coverage_requirements)
+        needs = []
+        for s in shifts:
+            required = coverage.get(s, 0)
+            have = sum(1 for a_idx in range(len(agents)) if plan[a_idx][d + offset] == s)
+            if have > required:
+                return None
+            if required > have:
+                needs.append((s, required - have))
+        # Most constrained shift first.
+        needs.sort(key=lambda item: sum(1 for a_idx in range(len(agents)) if item[0] in allowed_by_agent[a_idx]))
+        for s, missing in needs:
+            candidates = [a_idx for a_idx in range(len(agents)) if _can_work(a_idx, d, s)]
+            if len(candidates) < missing:
+                return None
+            candidates.sort(key=lambda a_idx: _priority(a_idx, d, s))
+            for a_idx in candidates[:missing]:
+                _place(a_idx, d, s)
+
+    # Locked days bypass the look-ahead above, so check weekly rest once more.
+    if n_ext >= 7:
+        for a_idx, row in enumerate(plan):
+            # Windows lying entirely in the previous period are not ours to fix,
+            # nor are straddling ones its last days already made impossible.
+            first = max(0, offset - len(trailing.get(agents[a_idx].id, [])))
+            for w in range(first, n_ext - 6):
+                if w + 6 < offset or _has_rest_block(row, w, w + 6):
+                    continue
+                if w < offset and not _rest_possible(row, w, w + 6):
+                    continue
+                return None
+
+    return [
+        ShiftAssignment(agent_id=agent.id, date=days[d], shift=plan[a_idx][d + offset])
+        for a_idx, agent in enumerate(agents)
+        for d in range(n_days)
+        if plan[a_idx][d + offset] is not None
+    ]
@@ -1,16 +1,59 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from threading import Lock
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from uuid import uuid4
 
+from .text_index import TextIndex
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts keep the in-process lock only
+    fcntl = None
+
 LIVE_ACTIVITY_PATH = Path(__file__).resolve().parent.parent / "data" / "live_activity.json"
+LIVE_ENTRY_FIELDS = (
+    "id",
+    "agent_id",
+    "agent_name",
+    "date",
+    "shift",
+    "task_title",
+    "details",
+    "status",
+    "created_at",
+    "updated_at",
+)
+LIVE_STATS_DIMENSIONS = ("date", "shift", "agent_id")
 _TMP_STORAGE = Path("/tmp") / "maman-emploi" / "data"
 _LOCK = Lock()
 
+# live_activity.json is a snapshot; every change since is one line of
+# live_activity.journal.jsonl ({"op": "put", "entry": {...}} or
+# {"op": "del", "id": ...}). Replaying the journal over the snapshot gives the
+# current state; both ops are idempotent, so replaying a journal the snapshot
+# already includes is harmless. The journal is folded into a new snapshot
+# once it holds more ops than the store holds entries (and at least this many).
+#
+# Several worker processes may share the files: writers hold an exclusive
+# flock on live_activity.json.lock while they catch up on the journal,
+# append and compact; readers hold it shared while they catch up.
+#
+# Every op carries a revision number, one higher than the last, which feeds
+# the change feed (live_changes). Deleted ids are remembered for the last
+# TOMBSTONE_REVS revisions; a client further behind gets the full list again.
+JOURNAL_COMPACT_OPS = 500
+TOMBSTONE_REVS = 10000
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
@@ -23,13 +66,6 @@ def _parse_iso(iso: str) -> Optional[datetime]:
         return None
 
 
-def _ensure_file(path: Path) -> None:
-    target = _resolve_storage_path(path)
-    target.parent.mkdir(parents=True, exist_ok=True)
-    if not target.exists():
-        target.write_text(json.dumps({"entries": []}, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
 def _resolve_storage_path(path: Path) -> Path:
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
@@ -43,26 +79,419 @@ def _resolve_storage_path(path: Path) -> Path:
         return _TMP_STORAGE / path.name
 
 
-def _load_raw(path: Path = LIVE_ACTIVITY_PATH) -> Dict[str, List[Dict[str, object]]]:
-    path = _resolve_storage_path(path)
-    try:
-        _ensure_file(path)
-        data = json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        data = {"entries": []}
-    except OSError:
-        return {"entries": []}
-    if not isinstance(data, dict) or "entries" not in data or not isinstance(data["entries"], list):
-        return {"entries": []}
-    return data
+def _expiry_key(entry: Dict[str, object]) -> Optional[str]:
+    """`updated_at` normalised so that keys sort in time order; None when unparseable."""
+    updated = _parse_iso(str(entry.get("updated_at", "")))
+    if updated is None:
+        return None
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return updated.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _sort_key(entry: Dict[str, object]) -> Tuple[str, ...]:
+    return (str(entry.get("date", "")), str(entry.get("shift", "")), str(entry.get("agent_name", "")), str(entry.get("updated_at", "")))
 
 
-def _save_raw(data: Dict[str, List[Dict[str, object]]], path: Path = LIVE_ACTIVITY_PATH) -> None:
-    path = _resolve_storage_path(path)
+def _cell(entry: Dict[str, object]) -> Tuple[str, str, str]:
+    return (str(entry.get("shift", "")), str(entry.get("agent_id", "")), str(entry.get("status", "")))
+
+
+def _journal_path(target: Path) -> Path:
+    return target.with_name(f"{target.stem}.journal.jsonl")
+
+
+def _file_signature(path: Path) -> Tuple[int, int, int]:
     try:
-        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        st = path.stat()
     except OSError:
+        return (0, 0, 0)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class _LiveStore:
+    """Current entries of one store, indexed by id, date, agent, shift and words."""
+
+    target: Path
+    entries: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    by_date: Dict[str, Set[str]] = field(default_factory=dict)
+    by_agent: Dict[str, Set[str]] = field(default_factory=dict)
+    by_shift: Dict[str, Set[str]] = field(default_factory=dict)
+    dates: List[str] = field(default_factory=list)
+    # (updated_at, id) in time order. An update adds a pair without removing
+    # the old one; stale pairs are skipped by the purge and dropped on compaction.
+    expiry: List[Tuple[str, str]] = field(default_factory=list)
+    # Listing order, (date, shift, agent_name, updated_at, id) per entry.
+    ordered: List[Tuple[str, ...]] = field(default_factory=list)
+    order_keys: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    text: TextIndex = field(default_factory=TextIndex)
+    # Entry counts per date, then per (shift, agent_id, status).
+    cells: Dict[str, Dict[Tuple[str, str, str], int]] = field(default_factory=dict)
+    rev: int = 0
+    revs: Dict[str, int] = field(default_factory=dict)
+    tombstones: Dict[str, int] = field(default_factory=dict)
+    # (rev, id) in revision order, with the same lazy clean-up as `expiry`.
+    changes: List[Tuple[int, str]] = field(default_factory=list)
+    # Changes up to this revision are no longer all known.
+    horizon: int = 0
+    snapshot_signature: Tuple[int, int, int] = (0, 0, 0)
+    journal_offset: int = 0
+    journal_ops: int = 0
+
+    @property
+    def journal(self) -> Path:
+        return _journal_path(self.target)
+
+    def _index(self, entry: Dict[str, object]) -> None:
+        entry_id = str(entry["id"])
+        date = str(entry.get("date", ""))
+        if date not in self.by_date:
+            self.by_date[date] = set()
+            insort(self.dates, date)
+        self.by_date[date].add(entry_id)
+        self.by_agent.setdefault(str(entry.get("agent_id", "")), set()).add(entry_id)
+        self.by_shift.setdefault(str(entry.get("shift", "")), set()).add(entry_id)
+        key = self.order_keys[entry_id] = _sort_key(entry) + (entry_id,)
+        insort(self.ordered, key)
+        cell = _cell(entry)
+        day = self.cells.setdefault(date, {})
+        day[cell] = day.get(cell, 0) + 1
+        updated = _expiry_key(entry)
+        if updated is not None:
+            pair = (updated, entry_id)
+            if not self.expiry or self.expiry[-1] <= pair:
+                self.expiry.append(pair)
+            else:
+                insort(self.expiry, pair)
+
+    def _unindex(self, entry: Dict[str, object]) -> None:
+        entry_id = str(entry["id"])
+        date = str(entry.get("date", ""))
+        key = self.order_keys.pop(entry_id, None)
+        if key is not None:
+            self.ordered.pop(bisect_left(self.ordered, key))
+        day = self.cells.get(date, {})
+        cell = _cell(entry)
+        if day.get(cell, 0) > 1:
+            day[cell] -= 1
+        else:
+            day.pop(cell, None)
+            if not day:
+                self.cells.pop(date, None)
+        for index, key in (
+            (self.by_date, date),
+            (self.by_agent, str(entry.get("agent_id", ""))),
+            (self.by_shift, str(entry.get("shift", ""))),
+        ):
+            ids = index.get(key)
+            if ids is None:
+                continue
+            ids.discard(entry_id)
+            if not ids:
+                del index[key]
+                if index is self.by_date:
+                    self.dates.pop(bisect_left(self.dates, date))
+
+    def apply(self, op: Dict[str, object]) -> None:
+        rev = self.rev + 1 if op.get("rev") is None else int(op["rev"])
+        if op.get("op") == "put":
+            entry = op.get("entry")
+            if not isinstance(entry, dict) or "id" not in entry:
+                return
+            entry_id = str(entry["id"])
+            previous = self.entries.get(entry_id)
+            if previous is not None:
+                self._unindex(previous)
+            self.entries[entry_id] = entry
+            self._index(entry)
+            self.text.update(entry_id, str(entry.get("task_title", "")), str(entry.get("details", "")))
+            self.revs[entry_id] = rev
+            self.tombstones.pop(entry_id, None)
+        elif op.get("op") == "del":
+            entry_id = str(op.get("id"))
+            previous = self.entries.pop(entry_id, None)
+            if previous is None:
+                return
+            self._unindex(previous)
+            self.text.remove(entry_id)
+            self.revs.pop(entry_id, None)
+            self.tombstones[entry_id] = rev
+        else:
+            return
+        if rev > 0:
+            self.changes.append((rev, entry_id))
+        self.rev = max(self.rev, rev)
+
+    def load(self) -> None:
+        """Rebuild the state from the snapshot and the whole journal."""
+        self.entries, self.by_date, self.by_agent, self.by_shift, self.dates, self.expiry = {}, {}, {}, {}, [], []
+        self.revs, self.changes, self.ordered, self.order_keys = {}, [], [], {}
+        self.text = TextIndex()
+        self.cells = {}
+        self.snapshot_signature = _file_signature(self.target)
+        try:
+            data = json.loads(self.target.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        revs = data.get("revs") if isinstance(data.get("revs"), dict) else {}
+        tombstones = data.get("tombstones")
+        self.tombstones = {str(k): int(v) for k, v in tombstones.items()} if isinstance(tombstones, dict) else {}
+        self.rev = int(data.get("rev", 0))
+        self.horizon = int(data.get("horizon", 0))
+        entries = data.get("entries")
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and "id" in entry:
+                self.apply({"op": "put", "entry": entry, "rev": int(revs.get(str(entry["id"]), 0))})
+        self.changes = sorted([(r, i) for i, r in self.revs.items() if r > 0] + [(r, i) for i, r in self.tombstones.items()])
+        self.journal_offset = self.journal_ops = 0
+        self.catch_up()
+
+    def catch_up(self) -> None:
+        """Replay journal lines appended since the last read."""
+        try:
+            with self.journal.open("rb") as f:
+                f.seek(self.journal_offset)
+                raw = f.read()
+        except OSError:
+            return
+        complete = raw[: raw.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                op = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(op, dict):
+                self.apply(op)
+                self.journal_ops += 1
+        self.journal_offset += len(complete)
+
+    def refresh(self) -> None:
+        """Pick up changes made to the files since they were last read."""
+        if _file_signature(self.target) != self.snapshot_signature or _file_signature(self.journal)[2] < self.journal_offset:
+            self.load()
+        else:
+            self.catch_up()
+
+    def append(self, ops: List[Dict[str, object]]) -> None:
+        """Journal `ops` in one write, then apply them."""
+        if not ops:
+            return
+        # The exclusive lock is held and the store is up to date: these revisions are free.
+        for rev, op in enumerate(ops, start=self.rev + 1):
+            op["rev"] = rev
+        payload = "".join(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n" for op in ops).encode("utf-8")
+        with self.journal.open("ab") as f:
+            # Bytes past the last complete line are a torn write from a crashed
+            # process; drop them so the first new op starts on its own line.
+            if f.tell() > self.journal_offset:
+                f.truncate(self.journal_offset)
+            f.write(payload)
+        self.catch_up()
+        if self.journal_ops >= max(JOURNAL_COMPACT_OPS, len(self.entries)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Write the current state as the new snapshot and empty the journal."""
+        tmp = self.target.with_name(self.target.name + ".tmp")
+        forgotten = [r for r in self.tombstones.values() if r <= self.rev - TOMBSTONE_REVS]
+        horizon = max([self.horizon, *forgotten])
+        tombstones = {i: r for i, r in self.tombstones.items() if r > horizon}
+        data = {
+            "rev": self.rev,
+            "horizon": horizon,
+            "entries": list(self.entries.values()),
+            "revs": self.revs,
+            "tombstones": tombstones,
+        }
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.target)
+            # A crash here only leaves ops the snapshot already holds.
+            with self.journal.open("wb"):
+                pass
+        except OSError:
+            return
+        self.snapshot_signature = _file_signature(self.target)
+        self.journal_offset = self.journal_ops = 0
+        self.expiry = [pair for pair in self.expiry if self._current(pair)]
+        self.tombstones, self.horizon = tombstones, horizon
+        self.changes = [(r, i) for r, i in self.changes if self.revs.get(i) == r or self.tombstones.get(i) == r]
+
+    def changed_since(self, since: int) -> Optional[Tuple[List[str], List[str]]]:
+        """(ids put, ids deleted) after revision `since`; None when it is too old or ahead of the store."""
+        if since < self.horizon or since > self.rev:
+            return None
+        put: List[str] = []
+        deleted: List[str] = []
+        for rev, entry_id in self.changes[bisect_left(self.changes, (since + 1, "")):]:
+            if self.revs.get(entry_id) == rev:
+                put.append(entry_id)
+            elif self.tombstones.get(entry_id) == rev:
+                deleted.append(entry_id)
+        return put, deleted
+
+    def _current(self, pair: Tuple[str, str]) -> bool:
+        entry = self.entries.get(pair[1])
+        return entry is not None and _expiry_key(entry) == pair[0]
+
+    def expired(self, cutoff: str) -> List[str]:
+        """Ids last updated before `cutoff`, read off the front of the expiry order."""
+        return [pair[1] for pair in self.expiry[: bisect_left(self.expiry, (cutoff, ""))] if self._current(pair)]
+
+    def drop_expired(self, cutoff: str) -> None:
+        """Forget the pairs before `cutoff` that no longer match a stored entry."""
+        end = bisect_left(self.expiry, (cutoff, ""))
+        self.expiry[:end] = [pair for pair in self.expiry[:end] if self._current(pair)]
+
+    def candidates(
+        self,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        agent_id: Optional[str],
+        shift: Optional[str],
+    ) -> Iterable[str]:
+        """Ids matching the filters, starting from the smallest index set."""
+        sets: List[Set[str]] = []
+        if agent_id:
+            sets.append(self.by_agent.get(agent_id, set()))
+        if shift:
+            sets.append(self.by_shift.get(shift, set()))
+        if start_date or end_date:
+            lo = bisect_left(self.dates, start_date) if start_date else 0
+            hi = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+            in_range: Set[str] = set()
+            for d in self.dates[lo:hi]:
+                in_range |= self.by_date[d]
+            sets.append(in_range)
+        if not sets:
+            return list(self.entries)
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def cells_in_range(self, start_date: Optional[str], end_date: Optional[str]) -> Iterator[Tuple[str, Tuple[str, str, str], int]]:
+        """(date, (shift, agent_id, status), count) for every non-empty cell in the date range."""
+        lo = bisect_left(self.dates, start_date) if start_date else 0
+        hi = bisect_right(self.dates, end_date) if end_date else len(self.dates)
+        for k in range(lo, hi):
+            date = self.dates[k]
+            for cell, count in self.cells.get(date, {}).items():
+                yield date, cell, count
+
+    def iter_ordered(
+        self,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        agent_id: Optional[str],
+        shift: Optional[str],
+        after: Optional[Tuple[str, ...]] = None,
+    ) -> Iterator[str]:
+        """Ids matching the filters in listing order, resuming after the key `after`."""
+        lo = bisect_left(self.ordered, (start_date,)) if start_date else 0
+        if after is not None:
+            lo = max(lo, bisect_right(self.ordered, after))
+        hi = bisect_right(self.ordered, (end_date, "\uffff")) if end_date else len(self.ordered)
+        sets = [s for s in (self.by_agent.get(agent_id, set()) if agent_id else None, self.by_shift.get(shift, set()) if shift else None) if s is not None]
+        sets.sort(key=len)
+        if sets and len(sets[0]) < (hi - lo) // 4:
+            # Few entries for this agent/shift: sort them rather than walk the range.
+            if lo >= hi:
+                return
+            lo_key = self.ordered[lo]
+            for key in sorted(self.order_keys[i] for i in sets[0].intersection(*sets[1:])):
+                if key < lo_key:
+                    continue
+                if end_date and key[0] > end_date:
+                    break
+                yield key[-1]
+            return
+        for k in range(lo, hi):
+            entry_id = self.ordered[k][-1]
+            if all(entry_id in s for s in sets):
+                yield entry_id
+
+
+_STORES: Dict[Path, _LiveStore] = {}
+_TARGETS: Dict[Path, Path] = {}
+
+
+@contextmanager
+def _file_lock(target: Path, exclusive: bool) -> Iterator[None]:
+    if fcntl is None:
+        yield
         return
+    # Opened per call: a descriptor inherited across fork would share the lock.
+    with target.with_name(target.name + ".lock").open("a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _locked_store(path: Path, exclusive: bool = True) -> Iterator[_LiveStore]:
+    """The store for `path`, brought up to date with what other processes wrote.
+
+    The file lock is taken before `_LOCK`, so no thread waits on another
+    process while holding it. Writers keep `_LOCK` for the whole block; shared
+    readers only for the refresh, since the shared file lock already keeps
+    writers of every process out while they read.
+    """
+    with _LOCK:
+        target = _TARGETS.get(path)
+        if target is None:
+            target = _TARGETS[path] = _resolve_storage_path(path)
+    with _file_lock(target, exclusive):
+        with _LOCK:
+            store = _STORES.get(target)
+            if store is None:
+                store = _STORES[target] = _LiveStore(target)
+                store.load()
+            else:
+                store.refresh()
+            if exclusive or fcntl is None:
+                yield store
+                return
+        yield store
+
+
+def _new_entry(agent_id: str, agent_name: str, date: str, shift: str, task_title: str, details: str, status: str) -> Dict[str, object]:
+    now = _now_iso()
+    return {
+        "id": str(uuid4()),
+        "agent_id": agent_id,
+        "agent_name": agent_name,
+        "date": date,
+        "shift": shift,
+        "task_title": task_title.strip(),
+        "details": details.strip(),
+        "status": status,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _updated_entry(
+    current: Dict[str, object],
+    task_title: Optional[str],
+    details: Optional[str],
+    status: Optional[str],
+) -> Dict[str, object]:
+    entry = dict(current)
+    if task_title is not None:
+        entry["task_title"] = task_title.strip()
+    if details is not None:
+        entry["details"] = details.strip()
+    if status is not None:
+        entry["status"] = status
+    entry["updated_at"] = _now_iso()
+    return entry
 
 
 def create_live_entry(
@@ -76,23 +505,25 @@ def create_live_entry(
     status: str,
     path: Path = LIVE_ACTIVITY_PATH,
 ) -> Dict[str, object]:
-    entry = {
-        "id": str(uuid4()),
-        "agent_id": agent_id,
-        "agent_name": agent_name,
-        "date": date,
-        "shift": shift,
-        "task_title": task_title.strip(),
-        "details": details.strip(),
-        "status": status,
-        "created_at": _now_iso(),
-        "updated_at": _now_iso(),
-    }
-    with _LOCK:
-        data = _load_raw(path)
-        data["entries"].append(entry)
-        _save_raw(data, path)
-    return entry
+    entry = _new_entry(agent_id, agent_name, date, shift, task_title, details, status)
+    with _locked_store(path) as store:
+        store.append([{"op": "put", "entry": entry}])
+    return dict(entry)
+
+
+def _matches(
+    entry: Dict[str, object],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    agent_id: Optional[str],
+    shift: Optional[str],
+) -> bool:
+    d = str(entry.get("date", ""))
+    if (start_date and d < start_date) or (end_date and d > end_date):
+        return False
+    if agent_id and str(entry.get("agent_id")) != agent_id:
+        return False
+    return not shift or str(entry.get("shift")) == shift
 
 
 def list_live_entries(
@@ -104,23 +535,181 @@ def list_live_entries(
     include_done: bool = True,
     path: Path = LIVE_ACTIVITY_PATH,
 ) -> List[Dict[str, object]]:
-    data = _load_raw(path)
-    out: List[Dict[str, object]] = []
-    for entry in data["entries"]:
-        d = str(entry.get("date", ""))
-        if start_date and d < start_date:
-            continue
-        if end_date and d > end_date:
-            continue
-        if agent_id and str(entry.get("agent_id")) != agent_id:
-            continue
-        if shift and str(entry.get("shift")) != shift:
-            continue
-        if not include_done and str(entry.get("status")) == "done":
-            continue
-        out.append(entry)
-    out.sort(key=lambda e: (str(e.get("date", "")), str(e.get("shift", "")), str(e.get("agent_name", "")), str(e.get("updated_at", ""))))
-    return out
+    with _locked_store(path, exclusive=False) as store:
+        return [
+            dict(store.entries[entry_id])
+            for entry_id in store.iter_ordered(start_date, end_date, agent_id, shift)
+            if include_done or str(store.entries[entry_id].get("status")) != "done"
+        ]
+
+
+def _encode_cursor(key: Tuple[str, ...]) -> str:
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, ...]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ValueError("cursor invalide") from None
+    if not isinstance(key, list) or len(key) != 5 or not all(isinstance(k, str) for k in key):
+        raise ValueError("cursor invalide")
+    return tuple(key)
+
+
+def page_live_entries(
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    shift: Optional[str] = None,
+    include_done: bool = True,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None,
+    path: Path = LIVE_ACTIVITY_PATH,
+) -> Dict[str, object]:
+    """One page of entries in listing order, optionally reduced to `fields`.
+
+    `next_cursor` resumes after the last entry returned; it stays valid when
+    entries are added or removed in between. Raises ValueError on a malformed
+    cursor or an unknown field.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    keep: Optional[List[str]] = None
+    if fields is not None:
+        keep = list(dict.fromkeys(["id", *fields]))
+        unknown = [f for f in keep if f not in LIVE_ENTRY_FIELDS]
+        if unknown:
+            raise ValueError(f"champs inconnus: {', '.join(unknown)}")
+    entries: List[Dict[str, object]] = []
+    next_cursor = None
+    with _locked_store(path, exclusive=False) as store:
+        rev = store.rev
+        for entry_id in store.iter_ordered(start_date, end_date, agent_id, shift, after):
+            entry = store.entries[entry_id]
+            if not include_done and str(entry.get("status")) == "done":
+                continue
+            if len(entries) == limit:
+                next_cursor = _encode_cursor(store.order_keys[str(entries[-1]["id"])])
+                break
+            entries.append({f: entry.get(f) for f in keep} if keep else dict(entry))
+    return {"rev": rev, "entries": entries, "next_cursor": next_cursor}
+
+
+def count_live_entries(
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    shift: Optional[str] = None,
+    include_done: bool = True,
+    path: Path = LIVE_ACTIVITY_PATH,
+) -> Dict[str, object]:
+    """Number of matching entries, in total and per status, from the maintained counters."""
+    stats = live_stats(
+        start_date=start_date,
+        end_date=end_date,
+        agent_id=agent_id,
+        shift=shift,
+        include_done=include_done,
+        group_by=(),
+        path=path,
+    )
+    return {"rev": stats["rev"], "count": stats["total"], "by_status": stats["totals"]}
+
+
+def live_stats(
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    shift: Optional[str] = None,
+    include_done: bool = True,
+    group_by: Iterable[str] = ("date",),
+    path: Path = LIVE_ACTIVITY_PATH,
+) -> Dict[str, object]:
+    """Entry counts per status for each group of `group_by` (date, shift, agent_id).
+
+    Read from counters kept up to date on every change, so the cost depends on
+    the number of (date, shift, agent, status) cells in range, not on entries.
+    Raises ValueError on an unknown dimension.
+    """
+    dims = list(dict.fromkeys(group_by))
+    unknown = [d for d in dims if d not in LIVE_STATS_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"regroupement inconnu: {', '.join(unknown)}")
+    groups: Dict[Tuple[str, ...], Dict[str, int]] = {}
+    totals: Dict[str, int] = {}
+    with _locked_store(path, exclusive=False) as store:
+        rev = store.rev
+        for date, (cell_shift, cell_agent, status), count in store.cells_in_range(start_date, end_date):
+            if (shift and cell_shift != shift) or (agent_id and cell_agent != agent_id):
+                continue
+            if not include_done and status == "done":
+                continue
+            values = {"date": date, "shift": cell_shift, "agent_id": cell_agent}
+            counts = groups.setdefault(tuple(values[d] for d in dims), {})
+            counts[status] = counts.get(status, 0) + count
+            totals[status] = totals.get(status, 0) + count
+    return {
+        "rev": rev,
+        "group_by": dims,
+        "groups": [
+            {"key": dict(zip(dims, key)), "counts": counts, "total": sum(counts.values())}
+            for key, counts in sorted(groups.items())
+        ] if dims else [],
+        "totals": totals,
+        "total": sum(totals.values()),
+    }
+
+
+def live_revision(path: Path = LIVE_ACTIVITY_PATH) -> int:
+    """Revision of the last change to the store."""
+    with _locked_store(path, exclusive=False) as store:
+        return store.rev
+
+
+def live_changes(
+    since_rev: Optional[int] = None,
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    shift: Optional[str] = None,
+    include_done: bool = True,
+    path: Path = LIVE_ACTIVITY_PATH,
+) -> Dict[str, object]:
+    """Matching entries changed after `since_rev`, and the ids to drop.
+
+    `deleted_ids` lists deletions (whatever their filters) and, without
+    include_done, entries that became done. With no `since_rev`, one older
+    than the tombstones still kept or one ahead of the store, `reset` is True,
+    `rev` is the current revision and `entries` holds every matching entry.
+    """
+    with _locked_store(path, exclusive=False) as store:
+        rev = store.rev
+        changed = None if since_rev is None else store.changed_since(since_rev)
+        if changed is None:
+            reset = True
+            ids: Iterable[str] = store.iter_ordered(start_date, end_date, agent_id, shift)
+            deleted: List[str] = []
+        else:
+            reset = False
+            ids, deleted = changed
+        entries = []
+        for entry_id in ids:
+            entry = store.entries[entry_id]
+            if not reset and not _matches(entry, start_date, end_date, agent_id, shift):
+                continue
+            if not include_done and str(entry.get("status")) == "done":
+                if not reset:
+                    deleted.append(entry_id)
+                continue
+            entries.append(dict(entry))
+    entries.sort(key=_sort_key)
+    return {"rev": rev, "reset": reset, "entries": entries, "deleted_ids": deleted}
 
 
 def update_live_entry(
@@ -131,48 +720,134 @@ def update_live_entry(
     status: Optional[str] = None,
     path: Path = LIVE_ACTIVITY_PATH,
 ) -> Optional[Dict[str, object]]:
-    with _LOCK:
-        data = _load_raw(path)
-        for entry in data["entries"]:
-            if str(entry.get("id")) != entry_id:
-                continue
-            if task_title is not None:
-                entry["task_title"] = task_title.strip()
-            if details is not None:
-                entry["details"] = details.strip()
-            if status is not None:
-                entry["status"] = status
-            entry["updated_at"] = _now_iso()
-            _save_raw(data, path)
-            return entry
-    return None
+    with _locked_store(path) as store:
+        current = store.entries.get(entry_id)
+        if current is None:
+            return None
+        entry = _updated_entry(current, task_title, details, status)
+        store.append([{"op": "put", "entry": entry}])
+    return dict(entry)
 
 
 def delete_live_entry(entry_id: str, path: Path = LIVE_ACTIVITY_PATH) -> bool:
-    with _LOCK:
-        data = _load_raw(path)
-        before = len(data["entries"])
-        data["entries"] = [e for e in data["entries"] if str(e.get("id")) != entry_id]
-        if len(data["entries"]) == before:
+    with _locked_store(path) as store:
+        if entry_id not in store.entries:
             return False
-        _save_raw(data, path)
+        store.append([{"op": "del", "id": entry_id}])
         return True
 
 
+def search_live_entries(
+    q: str,
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    shift: Optional[str] = None,
+    include_done: bool = True,
+    limit: int = 20,
+    offset: int = 0,
+    path: Path = LIVE_ACTIVITY_PATH,
+) -> Dict[str, object]:
+    """Entries whose title or details match every word of `q`, best first.
+
+    Matching ignores case and accents, and a word also matches longer words
+    it starts ("pans" finds "pansement").
+    """
+    with _locked_store(path, exclusive=False) as store:
+        rev = store.rev
+        ranked = []
+        for entry_id, score in store.text.search(q).items():
+            entry = store.entries[entry_id]
+            if not _matches(entry, start_date, end_date, agent_id, shift):
+                continue
+            if not include_done and str(entry.get("status")) == "done":
+                continue
+            ranked.append((-score, store.order_keys[entry_id], entry))
+    ranked.sort(key=lambda hit: hit[:2])
+    hits = [{"entry": dict(entry), "score": round(-neg, 4)} for neg, _, entry in ranked[offset:offset + limit]]
+    return {"rev": rev, "total": len(ranked), "hits": hits}
+
+
+def apply_live_batch(items: List[Dict[str, object]], path: Path = LIVE_ACTIVITY_PATH) -> Dict[str, object]:
+    """Apply a list of changes with a single journal write.
+
+    Items, already validated by the caller, are applied in order and later
+    items see the effect of earlier ones:
+      {"op": "create", "entry": {agent_id, agent_name, date, shift, task_title, details, status}}
+      {"op": "update", "id": ..., "task_title"/"details"/"status": new value or None}
+      {"op": "delete", "id": ...}
+      {"op": "transition", "from_status": ..., "to_status": ..., "date"/"shift"/"agent_id": filter or None}
+    A transition moves every matching entry in `from_status` to `to_status`.
+    Each result is {"status": "ok" | "not_found", "entries": [...], "deleted_ids": [...]}.
+    """
+    results: List[Dict[str, object]] = []
+    ops: List[Dict[str, object]] = []
+    with _locked_store(path) as store:
+        # Entries written by this batch so far; None once deleted.
+        pending: Dict[str, Optional[Dict[str, object]]] = {}
+
+        def _get(entry_id: str) -> Optional[Dict[str, object]]:
+            return pending[entry_id] if entry_id in pending else store.entries.get(entry_id)
+
+        def _put(entry: Dict[str, object]) -> None:
+            pending[str(entry["id"])] = entry
+            ops.append({"op": "put", "entry": entry})
+
+        for item in items:
+            op = item.get("op")
+            result: Dict[str, object] = {"status": "ok", "entries": [], "deleted_ids": []}
+            if op == "create":
+                fields = item["entry"]
+                entry = _new_entry(**{k: fields[k] for k in ("agent_id", "agent_name", "date", "shift", "task_title", "details", "status")})
+                _put(entry)
+                result["entries"] = [entry]
+            elif op == "update":
+                current = _get(str(item["id"]))
+                if current is None:
+                    result["status"] = "not_found"
+                else:
+                    entry = _updated_entry(current, item.get("task_title"), item.get("details"), item.get("status"))
+                    _put(entry)
+                    result["entries"] = [entry]
+            elif op == "delete":
+                entry_id = str(item["id"])
+                if _get(entry_id) is None:
+                    result["status"] = "not_found"
+                else:
+                    pending[entry_id] = None
+                    ops.append({"op": "del", "id": entry_id})
+                    result["deleted_ids"] = [entry_id]
+            elif op == "transition":
+                date, shift, agent_id = item.get("date"), item.get("shift"), item.get("agent_id")
+                ids = set(store.candidates(date, date, agent_id, shift)) | set(pending)
+                moved = []
+                for entry_id in sorted(ids, key=lambda i: _sort_key(_get(i) or {})):
+                    current = _get(entry_id)
+                    if current is None or str(current.get("status")) != item["from_status"]:
+                        continue
+                    if not _matches(current, date, date, agent_id, shift):
+                        continue
+                    entry = _updated_entry(current, None, None, str(item["to_status"]))
+                    _put(entry)
+                    moved.append(entry)
+                result["entries"] = moved
+            else:
+                result["status"] = "not_found"
+            results.append(result)
+        store.append(ops)
+        rev = store.rev
+    for result in results:
+        result["entries"] = [dict(e) for e in result["entries"]]
+    return {"rev": rev, "results": results}
+
+
 def purge_old_entries(retention_days: int, path: Path = LIVE_ACTIVITY_PATH) -> int:
+    """Delete entries not updated for `retention_days`; only the expired prefix is visited."""
     cutoff = datetime.now(timezone.utc) - timedelta(days=max(1, retention_days))
-    with _LOCK:
-        data = _load_raw(path)
-        before = len(data["entries"])
-        kept = []
-        for entry in data["entries"]:
-            updated = _parse_iso(str(entry.get("updated_at", "")))
-            if updated is None:
-                kept.append(entry)
-                continue
-            if updated >= cutoff:
-                kept.append(entry)
-        if len(kept) != before:
-            data["entries"] = kept
-            _save_raw(data, path)
-        return before - len(kept)
+    cutoff_key = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+    with _locked_store(path) as store:
+        expired = store.expired(cutoff_key)
+        store.append([{"op": "del", "id": entry_id} for entry_id in expired])
+        store.drop_expired(cutoff_key)
+        return len(expired)
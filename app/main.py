@@ -1,45 +1,138 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timedelta, timezone
-from io import BytesIO
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.colors import HexColor, Color
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
 from pydantic import ValidationError
 
-from .audit import read_recent_audit_events, write_audit_event
+from .audit import (
+    iter_audit_events,
+    read_recent_audit_events,
+    shutdown_audit,
+    verify_audit_chain,
+    write_audit_event,
+    write_audit_events,
+)
+from .boundary import compute_boundary_states, load_states_before, save_states
+from .capacity import plan_capacity
 from .compliance import (
     french_health_compliance_snapshot,
     load_compliance_settings,
+    scan_chunk,
     validate_live_text_for_french_health,
 )
-from .live_activity import create_live_entry, delete_live_entry, list_live_entries, purge_old_entries, update_live_entry
+from .exports import iter_csv_bytes, iter_csv_rows, iter_planning_pdf
+from .live_activity import (
+    apply_live_batch,
+    count_live_entries,
+    create_live_entry,
+    delete_live_entry,
+    live_changes,
+    live_revision,
+    live_stats,
+    page_live_entries,
+    purge_old_entries,
+    search_live_entries,
+    update_live_entry,
+)
 from .models import (
+    DEFAULT_SHIFTS,
+    Agent,
+    AgentBoundaryState,
+    CapacityRequest,
+    CapacityResponse,
     ComplianceReport,
+    ComplianceScanItem,
+    ComplianceScanRequest,
     ExportRequest,
     GenerateRequest,
     GenerateResponse,
+    LiveBulkItem,
+    LiveBulkItemResult,
+    LiveBulkRequest,
+    LiveBulkResponse,
+    LiveSearchResponse,
+    LiveStatsResponse,
+    LiveTaskCountResponse,
     LiveTaskCreateRequest,
     LiveTaskEntry,
     LiveTaskListResponse,
+    LiveTaskPageResponse,
     LiveTaskUpdateRequest,
+    RollupGranularity,
+    ScenarioRequest,
+    ScenarioResponse,
     ShiftAssignment,
+    ShiftDef,
     TrackerRecordRequest,
     TrackerResponse,
+    TrackerRollupResponse,
+    TrackerRollupRow,
 )
-from .scheduler import build_solution
-from .tracker import add_minutes, load_tracker, save_tracker, snapshot_minutes, snapshot_names
+from .scenarios import run_scenarios
+from .scheduler import coverage_for_day, solve_planning
+from .tracker import plan_key, query_rollups, record_plan, snapshot_minutes, snapshot_names, tracker_snapshot
 
-app = FastAPI(title="Planning Jour MVP")
+
+def _purge_live_entries() -> int:
+    try:
+        purged = purge_old_entries(COMPLIANCE_SETTINGS.live_task_retention_days)
+    except Exception:
+        return 0
+    if purged > 0:
+        try:
+            write_audit_event(
+                "live_purge",
+                {"retention_days": COMPLIANCE_SETTINGS.live_task_retention_days, "removed_entries": purged},
+            )
+        except Exception:
+            pass
+    return purged
+
+
+async def _live_retention_loop() -> None:
+    while True:
+        await asyncio.to_thread(_purge_live_entries)
+        await asyncio.sleep(COMPLIANCE_SETTINGS.live_purge_interval_seconds)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    retention = asyncio.create_task(_live_retention_loop())
+    yield
+    retention.cancel()
+    with suppress(asyncio.CancelledError):
+        await retention
+    if _SCAN_POOL is not None:
+        _SCAN_POOL.shutdown(cancel_futures=True)
+    # Queued audit events are written and fsynced before the process exits.
+    shutdown_audit()
+
+
+app = FastAPI(title="Planning Jour MVP", lifespan=lifespan)
 COMPLIANCE_SETTINGS = load_compliance_settings()
+# The stream checks the store (two stat calls when idle) at this pace; any
+# worker process sees changes made by the others.
+LIVE_STREAM_POLL_SECONDS = 1.0
+LIVE_STREAM_KEEPALIVE_SECONDS = 15.0
+# POST /compliance/scan hands texts to the pool by chunks and keeps at most
+# two chunks per worker in flight, whatever the size of the upload.
+SCAN_CHUNK_SIZE = 500
+SCAN_MAX_LINE_BYTES = 1 << 20
+_SCAN_POOL: Optional[Executor] = None
 
 app.add_middleware(
     CORSMiddleware,
@@ -103,7 +196,7 @@ def _build_compliance(req: GenerateRequest, assignments: List[ShiftAssignment],
     # Coverage
     days = _date_range(params.start_date, params.end_date)
     for d in days:
-        for shift, required in params.coverage_requirements.items():
+        for shift, required in coverage_for_day(params, d).items():
             count = sum(1 for a in assignments if a.date == d and a.shift == shift)
             if count < required:
                 hard_violations.append(f"Couverture insuffisante {shift} le {d}: {count}/{required}")
@@ -171,6 +264,16 @@ def _build_compliance(req: GenerateRequest, assignments: List[ShiftAssignment],
     return ComplianceReport(hard_violations=hard_violations, warnings=warnings, ruleset_used=ruleset_used)
 
 
+def _with_boundary_states(req: GenerateRequest) -> GenerateRequest:
+    if not req.params.use_boundary_state or req.boundary_states:
+        return req
+    try:
+        states = load_states_before(req.params.service_unit, req.params.start_date)
+    except Exception:
+        states = {}
+    return req.model_copy(update={"boundary_states": states}) if states else req
+
+
 @app.post("/generate", response_model=GenerateResponse)
 def generate(req: GenerateRequest) -> GenerateResponse:
     tracker_baseline = {}
@@ -178,11 +281,19 @@ def generate(req: GenerateRequest) -> GenerateResponse:
     if req.params.use_tracker:
         tracker_year = req.params.tracker_year
         try:
-            tracker_baseline = snapshot_minutes(load_tracker(), tracker_year)
+            tracker_baseline = snapshot_minutes(tracker_year)
         except Exception:
             tracker_baseline = {}
 
-    status, assignments, score, explanation, added_agents = build_solution(req, tracker_baseline)
+    req = _with_boundary_states(req)
+    result = solve_planning(req, tracker_baseline)
+    status, assignments, score, explanation, added_agents = (
+        result.status,
+        result.assignments,
+        result.score,
+        result.explanation,
+        result.added_agents,
+    )
     if status != "ok":
         try:
             write_audit_event(
@@ -208,6 +319,7 @@ def generate(req: GenerateRequest) -> GenerateResponse:
             tracker_year=tracker_year,
             tracker_baseline_minutes=tracker_baseline,
             tracker_updated=False,
+            solver_stats=result.stats,
         )
 
     all_agents = list(req.agents) + list(added_agents)
@@ -216,13 +328,19 @@ def generate(req: GenerateRequest) -> GenerateResponse:
     tracker_updated = False
     if req.params.use_tracker and req.params.record_tracker_on_generate:
         try:
-            data = load_tracker()
-            durations = {code: s.duration_minutes for code, s in req.params.shifts.items()}
-            name_map = {a.id: f"{a.last_name} {a.first_name}".strip() for a in all_agents}
-            for assignment in assignments:
-                minutes = durations.get(assignment.shift, 0)
-                add_minutes(data, req.params.tracker_year, assignment.agent_id, minutes, name_map.get(assignment.agent_id))
-            save_tracker(data)
+            record_plan(
+                plan_key(req.params.service_unit, req.params.start_date, req.params.end_date),
+                req.params.tracker_year,
+                _ledger_rows(assignments, all_agents, req.params.shifts),
+            )
+            _save_boundary(
+                req.params.service_unit,
+                req.params.start_date,
+                req.params.end_date,
+                assignments,
+                all_agents,
+                req.boundary_states,
+            )
             tracker_updated = True
         except Exception:
             tracker_updated = False
@@ -238,6 +356,8 @@ def generate(req: GenerateRequest) -> GenerateResponse:
                 "assignments_count": len(assignments),
                 "added_agents_count": len(added_agents),
                 "tracker_updated": tracker_updated,
+                "solution_source": result.source,
+                "solver_mode": result.stats.get("mode"),
             },
         )
     except Exception:
@@ -253,86 +373,346 @@ def generate(req: GenerateRequest) -> GenerateResponse:
         tracker_year=tracker_year,
         tracker_baseline_minutes=tracker_baseline,
         tracker_updated=tracker_updated,
+        solution_source=result.source,
+        solver_stats=result.stats,
+    )
+
+
+@app.post("/capacity", response_model=CapacityResponse)
+def capacity(req: CapacityRequest) -> CapacityResponse:
+    results = plan_capacity(req)
+    try:
+        write_audit_event(
+            "capacity",
+            {
+                "service_unit": req.params.service_unit,
+                "start_date": req.params.start_date,
+                "end_date": req.params.end_date,
+                "mixes_count": len(req.regime_mixes),
+            },
+        )
+    except Exception:
+        pass
+    return CapacityResponse(results=results)
+
+
+@app.post("/scenarios", response_model=ScenarioResponse)
+def scenarios(req: ScenarioRequest) -> ScenarioResponse:
+    try:
+        req = req.model_copy(update={"base": _with_boundary_states(req.base)})
+        results = run_scenarios(req, snapshot_minutes)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        write_audit_event(
+            "scenarios",
+            {
+                "service_unit": req.base.params.service_unit,
+                "start_date": req.base.params.start_date,
+                "end_date": req.base.params.end_date,
+                "variants_count": len(results),
+            },
+        )
+    except Exception:
+        pass
+    return ScenarioResponse(results=results)
+
+
+def _save_boundary(
+    service_unit: str,
+    start_date: str,
+    end_date: str,
+    assignments: List[ShiftAssignment],
+    agents: List[Agent],
+    previous: Dict[str, AgentBoundaryState],
+) -> None:
+    states = compute_boundary_states(assignments, [a.id for a in agents], start_date, end_date, previous)
+    save_states(service_unit, end_date, states)
+
+
+def _ledger_rows(
+    assignments: List[ShiftAssignment],
+    agents: List[Agent],
+    shifts: Dict[str, ShiftDef],
+) -> List[Tuple[str, str, str, int, Optional[str]]]:
+    name_map = {a.id: f"{a.last_name} {a.first_name}".strip() for a in agents}
+    return [
+        (a.agent_id, a.date, a.shift, shifts[a.shift].duration_minutes if a.shift in shifts else 0, name_map.get(a.agent_id))
+        for a in assignments
+    ]
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@app.get("/tracker/rollups", response_model=TrackerRollupResponse)
+def tracker_rollups(
+    granularity: RollupGranularity = Query(default="week"),
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+) -> TrackerRollupResponse:
+    year_fraction = None
+    if end_date:
+        try:
+            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="end_date invalide (YYYY-MM-DD)")
+        year_days = (end.replace(year=end.year + 1, month=1, day=1) - end.replace(month=1, day=1)).days
+        year_fraction = round(end.timetuple().tm_yday / year_days, 4)
+    rows = query_rollups(granularity, start_date, end_date, agent_id, shift)
+    minutes_by_agent: Dict[str, int] = {}
+    for row in rows:
+        minutes_by_agent[row["agent_id"]] = minutes_by_agent.get(row["agent_id"], 0) + int(row["minutes"])
+    return TrackerRollupResponse(
+        granularity=granularity,
+        rows=[TrackerRollupRow(**row) for row in rows],
+        minutes_by_agent=minutes_by_agent,
+        year_fraction=year_fraction,
     )
 
 
 @app.get("/tracker/{year}", response_model=TrackerResponse)
-def tracker_year(year: int) -> TrackerResponse:
-    data = load_tracker()
+def tracker_year(
+    year: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    snapshot = tracker_snapshot(year)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return TrackerResponse(
         year=year,
-        minutes_by_agent=snapshot_minutes(data, year),
-        names_by_agent=snapshot_names(data, year),
+        minutes_by_agent=snapshot.minutes,
+        names_by_agent=snapshot.names,
     )
 
 
 @app.post("/tracker/record", response_model=TrackerResponse)
 def tracker_record(req: TrackerRecordRequest) -> TrackerResponse:
-    data = load_tracker()
-    durations = {"MATIN": 420, "SOIR": 420, "JOUR_12H": 720}
-    name_map = {a.id: f"{a.last_name} {a.first_name}".strip() for a in req.agents}
-    for assignment in req.assignments:
-        minutes = durations.get(assignment.shift, 0)
-        add_minutes(data, req.year, assignment.agent_id, minutes, name_map.get(assignment.agent_id))
-    save_tracker(data)
+    dates = sorted(a.date for a in req.assignments)
+    start_date = req.start_date or (dates[0] if dates else "")
+    plan_id = req.plan_id or plan_key(req.service_unit, start_date, req.end_date or (dates[-1] if dates else ""))
+    record_plan(plan_id, req.year, _ledger_rows(req.assignments, req.agents, req.shifts or DEFAULT_SHIFTS))
+    if req.service_unit and req.end_date and start_date:
+        _save_boundary(
+            req.service_unit,
+            start_date,
+            req.end_date,
+            req.assignments,
+            req.agents,
+            load_states_before(req.service_unit, start_date),
+        )
     write_audit_event(
         "tracker_record",
         {
             "year": req.year,
+            "plan_id": plan_id,
             "assignments_count": len(req.assignments),
             "agents_count": len(req.agents),
         },
     )
     return TrackerResponse(
         year=req.year,
-        minutes_by_agent=snapshot_minutes(data, req.year),
-        names_by_agent=snapshot_names(data, req.year),
+        minutes_by_agent=snapshot_minutes(req.year),
+        names_by_agent=snapshot_names(req.year),
+    )
+
+
+def _live_etag(rev: int) -> str:
+    return f'"live-{rev}"'
+
+
+def _live_response(changes: Dict[str, object]) -> LiveTaskListResponse:
+    parsed_entries = []
+    for entry in changes["entries"]:
+        try:
+            parsed_entries.append(LiveTaskEntry(**entry))
+        except ValidationError:
+            continue
+    return LiveTaskListResponse(
+        entries=parsed_entries,
+        server_time=datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+        rev=changes["rev"],
+        reset=changes["reset"],
+        deleted_ids=changes["deleted_ids"],
     )
 
 
 @app.get("/live/entries", response_model=LiveTaskListResponse)
 def get_live_entries(
+    response: Response,
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+    include_done: bool = Query(default=True),
+    since_rev: int | None = Query(default=None, ge=0),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    # The answer to a given URL only changes with the store revision.
+    if if_none_match and _etag_matches(if_none_match, _live_etag(live_revision())):
+        return Response(status_code=304, headers={"ETag": if_none_match.strip(), "Cache-Control": "no-cache"})
+    # A cursor the store cannot answer comes back as a reset at the current
+    # revision; any other failure is a 5xx so clients keep what they have.
+    changes = live_changes(
+        since_rev,
+        start_date=start_date,
+        end_date=end_date,
+        agent_id=agent_id,
+        shift=shift,
+        include_done=include_done,
+    )
+    response.headers.update({"ETag": _live_etag(changes["rev"]), "Cache-Control": "no-cache"})
+    return _live_response(changes)
+
+
+@app.get("/live/entries/page", response_model=LiveTaskPageResponse)
+def get_live_entries_page(
     start_date: str | None = Query(default=None),
     end_date: str | None = Query(default=None),
     agent_id: str | None = Query(default=None),
     shift: str | None = Query(default=None),
     include_done: bool = Query(default=True),
-) -> LiveTaskListResponse:
+    limit: int = Query(default=50, ge=1, le=1000),
+    cursor: str | None = Query(default=None),
+    fields: str | None = Query(default=None, description="Champs a renvoyer, separes par des virgules"),
+) -> LiveTaskPageResponse:
     try:
-        purged = purge_old_entries(COMPLIANCE_SETTINGS.live_task_retention_days)
-    except Exception:
-        purged = 0
+        page = page_live_entries(
+            start_date=start_date,
+            end_date=end_date,
+            agent_id=agent_id,
+            shift=shift,
+            include_done=include_done,
+            limit=limit,
+            cursor=cursor,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return LiveTaskPageResponse(
+        **page,
+        server_time=datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+    )
 
+
+@app.get("/live/entries/count", response_model=LiveTaskCountResponse)
+def get_live_entries_count(
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+    include_done: bool = Query(default=True),
+) -> LiveTaskCountResponse:
+    return LiveTaskCountResponse(
+        **count_live_entries(
+            start_date=start_date,
+            end_date=end_date,
+            agent_id=agent_id,
+            shift=shift,
+            include_done=include_done,
+        )
+    )
+
+
+@app.get("/live/search", response_model=LiveSearchResponse)
+def get_live_search(
+    q: str = Query(min_length=1, max_length=200),
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+    include_done: bool = Query(default=True),
+    limit: int = Query(default=20, ge=1, le=200),
+    offset: int = Query(default=0, ge=0),
+) -> LiveSearchResponse:
+    found = search_live_entries(
+        q,
+        start_date=start_date,
+        end_date=end_date,
+        agent_id=agent_id,
+        shift=shift,
+        include_done=include_done,
+        limit=limit,
+        offset=offset,
+    )
+    return LiveSearchResponse(q=q, offset=offset, limit=limit, **found)
+
+
+@app.get("/live/stats", response_model=LiveStatsResponse)
+def get_live_stats(
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+    include_done: bool = Query(default=True),
+    group_by: str = Query(default="date", description="Dimensions parmi date, shift, agent_id, separees par des virgules"),
+) -> LiveStatsResponse:
     try:
-        entries = list_live_entries(
+        stats = live_stats(
             start_date=start_date,
             end_date=end_date,
             agent_id=agent_id,
             shift=shift,
             include_done=include_done,
+            group_by=[d.strip() for d in group_by.split(",") if d.strip()],
         )
-    except Exception:
-        entries = []
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return LiveStatsResponse(**stats)
 
-    parsed_entries = []
-    for entry in entries:
-        try:
-            parsed_entries.append(LiveTaskEntry(**entry))
-        except ValidationError:
-            continue
 
-    if purged > 0:
-        try:
-            write_audit_event(
-                "live_purge",
-                {"retention_days": COMPLIANCE_SETTINGS.live_task_retention_days, "removed_entries": purged},
+@app.get("/live/stream")
+async def live_stream(
+    request: Request,
+    start_date: str | None = Query(default=None),
+    end_date: str | None = Query(default=None),
+    agent_id: str | None = Query(default=None),
+    shift: str | None = Query(default=None),
+    include_done: bool = Query(default=True),
+    since_rev: int | None = Query(default=None, ge=0),
+    last_event_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """Server-sent events: one `changes` event per batch of changes, same payload as GET /live/entries."""
+    if last_event_id and last_event_id.isdigit():
+        since_rev = int(last_event_id)
+
+    async def _events():
+        rev = since_rev
+        idle = 0.0
+        while not await request.is_disconnected():
+            changes = await asyncio.to_thread(
+                live_changes,
+                rev,
+                start_date=start_date,
+                end_date=end_date,
+                agent_id=agent_id,
+                shift=shift,
+                include_done=include_done,
             )
-        except Exception:
-            pass
+            if changes["reset"] or changes["entries"] or changes["deleted_ids"]:
+                payload = _live_response(changes).model_dump_json()
+                yield f"id: {changes['rev']}\nevent: changes\ndata: {payload}\n\n"
+                idle = 0.0
+            elif idle >= LIVE_STREAM_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            rev = changes["rev"]
+            await asyncio.sleep(LIVE_STREAM_POLL_SECONDS)
+            idle += LIVE_STREAM_POLL_SECONDS
 
-    return LiveTaskListResponse(
-        entries=parsed_entries,
-        server_time=datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -410,6 +790,93 @@ def put_live_entry(entry_id: str, req: LiveTaskUpdateRequest) -> LiveTaskEntry:
     return LiveTaskEntry(**entry)
 
 
+def _bulk_rejection(item: LiveBulkItem) -> Tuple[Optional[str], List[str]]:
+    """(reason, blocked patterns) when a bulk item cannot be applied; checked before anything is written."""
+    if item.op == "create":
+        if item.create is None:
+            return "create manquant", []
+        if not item.create.task_title.strip():
+            return "task_title is required", []
+        text = f"{item.create.task_title}\n{item.create.details}"
+    elif item.op == "update":
+        if not item.entry_id or item.update is None:
+            return "entry_id et update requis", []
+        text = "\n".join(part for part in [item.update.task_title or "", item.update.details or ""] if part)
+    elif item.op == "delete":
+        return (None if item.entry_id else "entry_id requis"), []
+    else:
+        return (None if item.transition is not None else "transition manquante"), []
+    blocked = sorted(set(_blocked_patterns(text))) if text else []
+    if blocked:
+        return "Texte refuse (donnees sensibles detectees: " + ", ".join(blocked) + ").", blocked
+    return None, []
+
+
+@app.post("/live/entries/bulk", response_model=LiveBulkResponse)
+def post_live_entries_bulk(req: LiveBulkRequest) -> LiveBulkResponse:
+    """Apply creates, updates, deletes and status transitions in one write; rejected items do not stop the others."""
+    results: List[Optional[LiveBulkItemResult]] = []
+    batch: List[Dict[str, object]] = []
+    audit: List[Tuple[str, Dict[str, object]]] = []
+    for index, item in enumerate(req.items):
+        rejection, blocked = _bulk_rejection(item)
+        if rejection is not None:
+            results.append(LiveBulkItemResult(index=index, op=item.op, status="rejected", detail=rejection))
+            if blocked and item.op == "create":
+                c = item.create
+                audit.append(("live_create_blocked", {"agent_id": c.agent_id, "date": c.date, "shift": c.shift, "blocked_patterns": blocked}))
+            elif blocked:
+                audit.append(("live_update_blocked", {"entry_id": item.entry_id, "blocked_patterns": blocked}))
+            continue
+        results.append(None)
+        if item.op == "create":
+            batch.append({"op": "create", "entry": item.create.model_dump()})
+        elif item.op == "update":
+            batch.append({"op": "update", "id": item.entry_id, **item.update.model_dump()})
+        elif item.op == "delete":
+            batch.append({"op": "delete", "id": item.entry_id})
+        else:
+            batch.append({"op": "transition", **item.transition.model_dump()})
+
+    applied = apply_live_batch(batch)
+    outcomes = iter(applied["results"])
+    for index, item in enumerate(req.items):
+        if results[index] is not None:
+            continue
+        outcome = next(outcomes)
+        entries = [LiveTaskEntry(**e) for e in outcome["entries"]]
+        results[index] = LiveBulkItemResult(
+            index=index,
+            op=item.op,
+            status=outcome["status"],
+            detail="entry not found" if outcome["status"] == "not_found" else None,
+            entries=entries,
+            deleted_ids=outcome["deleted_ids"],
+        )
+        if outcome["status"] != "ok":
+            continue
+        if item.op == "create":
+            e = entries[0]
+            audit.append(("live_create", {"entry_id": e.id, "agent_id": e.agent_id, "date": e.date, "shift": e.shift, "status": e.status}))
+        elif item.op == "update":
+            audit.append((
+                "live_update",
+                {"entry_id": item.entry_id, "status": item.update.status, "task_title_updated": item.update.task_title is not None, "details_updated": item.update.details is not None},
+            ))
+        elif item.op == "delete":
+            audit.append(("live_delete", {"entry_id": item.entry_id}))
+        else:
+            audit.extend(("live_update", {"entry_id": e.id, "status": e.status, "transition_from": item.transition.from_status}) for e in entries)
+    write_audit_events(audit)
+    done = [r for r in results if r is not None]
+    return LiveBulkResponse(
+        results=done,
+        applied=sum(1 for r in done if r.status == "ok"),
+        rejected=sum(1 for r in done if r.status != "ok"),
+        rev=applied["rev"],
+    )
+
+
 @app.delete("/live/entries/{entry_id}")
 def remove_live_entry(entry_id: str) -> Dict[str, object]:
     deleted = delete_live_entry(entry_id)
@@ -426,27 +893,153 @@ def compliance_french_health() -> Dict[str, object]:
     return snapshot
 
 
+def _scan_pool() -> Executor:
+    """Worker processes when there are cores to spare, else one thread off the event loop."""
+    global _SCAN_POOL
+    if _SCAN_POOL is None:
+        workers = COMPLIANCE_SETTINGS.scan_workers
+        if workers > 1:
+            # Spawned, not forked: this process runs the audit writer thread.
+            _SCAN_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _SCAN_POOL = ThreadPoolExecutor(max_workers=1)
+    return _SCAN_POOL
+
+
+ScanItem = Tuple[object, Optional[str], Optional[str]]  # id, text, error
+
+
+def _parse_scan_line(line: bytes) -> ScanItem:
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return None, None, "Ligne NDJSON invalide"
+    if isinstance(value, str):
+        return None, value, None
+    if isinstance(value, dict) and isinstance(value.get("text"), str):
+        return value.get("id"), value["text"], None
+    return value.get("id") if isinstance(value, dict) else None, None, "Attendu: une chaine ou {\"id\", \"text\"}"
+
+
+async def _ndjson_scan_items(request: Request) -> AsyncIterator[ScanItem]:
+    """One item per line of the body, parsed as it arrives."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_scan_line(line)
+        if len(buffer) > SCAN_MAX_LINE_BYTES:
+            yield None, None, f"Ligne de plus de {SCAN_MAX_LINE_BYTES} octets, lecture interrompue"
+            return
+    if buffer.strip():
+        yield _parse_scan_line(buffer)
+
+
+async def _batch_scan_items(items: List[ComplianceScanItem | str]) -> AsyncIterator[ScanItem]:
+    for item in items:
+        if isinstance(item, str):
+            yield None, item, None
+        else:
+            yield item.id, item.text, None
+
+
+async def _scan_lines(items: AsyncIterator[ScanItem]) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    pool = _scan_pool()
+    patterns = COMPLIANCE_SETTINGS.patient_id_patterns
+    max_in_flight = 2 * COMPLIANCE_SETTINGS.scan_workers
+    pending: Deque[Tuple[int, List[ScanItem], asyncio.Future]] = deque()
+    totals = {"items": 0, "flagged": 0, "invalid": 0}
+
+    def _submit(first: int, batch: List[ScanItem]) -> None:
+        texts = [text or "" for _, text, _ in batch]
+        pending.append((first, batch, loop.run_in_executor(pool, scan_chunk, texts, patterns)))
+
+    async def _collect() -> str:
+        first, batch, future = pending.popleft()
+        out = []
+        for offset, ((item_id, _, error), found) in enumerate(zip(batch, await future)):
+            row: Dict[str, object] = {"index": first + offset, "id": item_id}
+            if error is not None:
+                totals["invalid"] += 1
+                row["error"] = error
+            else:
+                row["kinds"] = list(dict.fromkeys(kind for kind, _, _ in found))
+                row["matches"] = [{"kind": kind, "start": start, "end": end} for kind, start, end in found]
+                totals["flagged"] += 1 if found else 0
+            out.append(json.dumps(row, ensure_ascii=False) + "\n")
+        return "".join(out)
+
+    batch: List[ScanItem] = []
+    async for item in items:
+        batch.append(item)
+        totals["items"] += 1
+        if len(batch) == SCAN_CHUNK_SIZE:
+            _submit(totals["items"] - len(batch), batch)
+            batch = []
+            if len(pending) >= max_in_flight:
+                yield await _collect()
+    if batch:
+        _submit(totals["items"] - len(batch), batch)
+    while pending:
+        yield await _collect()
+    try:
+        write_audit_event("compliance_scan", dict(totals))
+    except Exception:
+        pass
+    yield json.dumps({"done": True, **totals}) + "\n"
+
+
+@app.post("/compliance/scan")
+async def compliance_scan(request: Request) -> StreamingResponse:
+    """Scan many texts for sensitive data before an import.
+
+    Body: `{"items": ["texte", {"id": 7, "text": "..."}]}`, or the same items
+    one per line with `Content-Type: application/x-ndjson`, read as it
+    arrives. Answers one NDJSON line per item, in order, with the kinds found
+    and their offsets (in characters), then a `{"done": true, ...}` summary.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = _ndjson_scan_items(request)
+    else:
+        try:
+            req = ComplianceScanRequest.model_validate_json(await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors()) from exc
+        items = _batch_scan_items(req.items)
+    return StreamingResponse(_scan_lines(items), media_type="application/x-ndjson")
+
+
 @app.get("/compliance/audit/recent")
 def compliance_audit_recent(limit: int = Query(default=100, ge=1, le=1000)) -> Dict[str, object]:
     events = read_recent_audit_events(limit=limit)
     return {"events": events, "count": len(events)}
 
 
+@app.get("/compliance/audit/query")
+def compliance_audit_query(
+    action: str | None = Query(default=None),
+    start: str | None = Query(default=None),
+    end: str | None = Query(default=None),
+    entry_id: str | None = Query(default=None),
+    limit: int = Query(default=1000, ge=1, le=100000),
+) -> StreamingResponse:
+    def _lines():
+        for event in islice(iter_audit_events(action=action, start=start, end=end, entry_id=entry_id), limit):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/compliance/audit/verify")
+def compliance_audit_verify(full: bool = Query(default=False)) -> Dict[str, object]:
+    return verify_audit_chain(full=full)
+
+
 @app.post("/export/csv")
-def export_csv(req: ExportRequest) -> Response:
-    agent_names = {a.id: f"{a.last_name} {a.first_name}".strip() for a in req.agents}
-    rows = []
-    for a in req.assignments:
-        rows.append(
-            {
-                "agent_id": a.agent_id,
-                "agent_name": agent_names.get(a.agent_id, a.agent_id),
-                "date": a.date,
-                "shift": a.shift,
-            }
-        )
-    df = pd.DataFrame(rows)
-    data = df.to_csv(index=False).encode("utf-8")
+def export_csv(req: ExportRequest) -> StreamingResponse:
     write_audit_event(
         "export_csv",
         {
@@ -454,115 +1047,28 @@ def export_csv(req: ExportRequest) -> Response:
             "agents_count": len(req.agents),
             "start_date": req.start_date,
             "end_date": req.end_date,
+            "extra_columns": list(req.csv_extra_columns),
+            "gzip": req.gzip,
         },
     )
-    return Response(content=data, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=planning.csv"})
+    body = iter_csv_bytes(iter_csv_rows(req), compress=req.gzip)
+    if req.gzip:
+        return StreamingResponse(
+            body,
+            media_type="application/gzip",
+            headers={"Content-Disposition": "attachment; filename=planning.csv.gz"},
+        )
+    return StreamingResponse(body, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=planning.csv"})
 
 
 @app.post("/export/pdf")
-def export_pdf(req: ExportRequest) -> Response:
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 40
-    c.setFont("Helvetica", 12)
-    title = "Planning Jour MVP"
-    c.drawString(40, y, title)
-    y -= 18
-    if req.service_unit or (req.start_date and req.end_date):
-        meta = " ".join(
-            part
-            for part in [
-                f"Service: {req.service_unit}" if req.service_unit else "",
-                f"Periode: {req.start_date} -> {req.end_date}" if req.start_date and req.end_date else "",
-            ]
-            if part
-        )
-        c.setFont("Helvetica", 9)
-        c.drawString(40, y, meta)
-        y -= 14
-    c.setFont("Helvetica", 9)
-    agent_names = {a.id: f"{a.last_name} {a.first_name}".strip() for a in req.agents}
-    shift_order = ["MATIN", "SOIR", "JOUR_12H"]
-    by_date_shift: Dict[str, Dict[str, List[str]]] = {}
-    for assignment in req.assignments:
-        by_date_shift.setdefault(assignment.date, {}).setdefault(assignment.shift, []).append(assignment.agent_id)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(40, y, "Planning par jour")
-    y -= 14
-    c.setFont("Helvetica", 9)
-    for day in sorted(by_date_shift.keys()):
-        if y < 90:
-            c.showPage()
-            y = height - 40
-            c.setFont("Helvetica", 9)
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(40, y, day)
-        y -= 12
-        c.setFont("Helvetica", 9)
-        for shift in shift_order:
-            ids = sorted(by_date_shift.get(day, {}).get(shift, []), key=lambda aid: agent_names.get(aid, aid))
-            names = [agent_names.get(aid, aid) for aid in ids]
-            label = f"{shift}: {', '.join(names) if names else 'Aucun'}"
-            c.drawString(52, y, label[:130])
-            y -= 11
-
-    # Per-agent summary
-    y -= 8
-    if y < 120:
-        c.showPage()
-        y = height - 40
-    c.setFont("Helvetica-Bold", 9)
-    c.drawString(40, y, "Synthese par agent")
-    y -= 12
-    c.setFont("Helvetica", 9)
-    durations = {"MATIN": 420, "SOIR": 420, "JOUR_12H": 720}
-    minutes_by_agent: Dict[str, int] = {}
-    for assignment in req.assignments:
-        minutes_by_agent[assignment.agent_id] = minutes_by_agent.get(assignment.agent_id, 0) + durations.get(assignment.shift, 0)
-    for agent in req.agents:
-        if y < 60:
-            c.showPage()
-            y = height - 40
-            c.setFont("Helvetica", 9)
-        name = agent_names.get(agent.id, agent.id)
-        line = f"{name}: {(minutes_by_agent.get(agent.id, 0) / 60):.1f}h"
-        c.drawString(40, y, line)
-        y -= 12
-
-    # Tracker summary (if available)
-    y -= 10
-    if y < 120:
-        c.showPage()
-        y = height - 40
-    c.setFont("Helvetica-Bold", 9)
-    c.drawString(40, y, "Résumé annuel (heures)")
-    y -= 12
-    c.setFont("Helvetica", 9)
-    minutes_by_agent = {}
+def export_pdf(req: ExportRequest) -> StreamingResponse:
+    tracker = None
     if req.start_date and req.end_date:
         try:
-            year = int(req.start_date.split("-")[0])
-        except ValueError:
-            year = None
-        if year is not None:
-            minutes_by_agent = snapshot_minutes(load_tracker(), year)
-    for agent in req.agents:
-        name = agent_names.get(agent.id, agent.id)
-        minutes = minutes_by_agent.get(agent.id, 0)
-        target = agent.annual_target_hours
-        target_str = f" / cible {target:.0f}h" if target is not None else ""
-        line = f"{name}: {minutes/60:.1f}h{target_str}"
-        c.drawString(40, y, line)
-        y -= 12
-        if y < 40:
-            c.showPage()
-            y = height - 40
-            c.setFont("Helvetica", 9)
-    c.showPage()
-    c.save()
-    pdf = buffer.getvalue()
+            tracker = tracker_snapshot(int(req.start_date.split("-")[0]))
+        except Exception:
+            tracker = None
     write_audit_event(
         "export_pdf",
         {
@@ -572,7 +1078,11 @@ def export_pdf(req: ExportRequest) -> Response:
             "end_date": req.end_date,
         },
     )
-    return Response(content=pdf, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=planning.pdf"})
+    return StreamingResponse(
+        iter_planning_pdf(req, tracker),
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=planning.pdf"},
+    )
 
 
 if FRONTEND_DIR.exists():
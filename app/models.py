@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 ShiftCode = Literal["MATIN", "SOIR", "JOUR_12H"]
 ModeCode = Literal["12h_jour", "matin_soir", "mixte"]
+SolverFormulation = Literal["day", "pattern"]
+SolverMode = Literal["default", "deterministic"]
 LegalProfile = Literal["FPH", "contractuel", "mixte"]
 RegimeCode = Literal[
     "REGIME_12H_JOUR",
@@ -26,6 +28,14 @@ class ShiftDef(BaseModel):
     duration_minutes: int
 
 
+# Used when a caller records hours without sending its shift definitions.
+DEFAULT_SHIFTS: Dict[str, ShiftDef] = {
+    "MATIN": ShiftDef(start="07:00", end="14:00", duration_minutes=420),
+    "SOIR": ShiftDef(start="14:00", end="21:00", duration_minutes=420),
+    "JOUR_12H": ShiftDef(start="07:00", end="19:00", duration_minutes=720),
+}
+
+
 class Assumptions(BaseModel):
     transmissions_included: bool = True
     pause_included_in_shift: bool = True
@@ -63,6 +73,8 @@ class PlanningParams(BaseModel):
     end_date: str
     mode: ModeCode
     coverage_requirements: Dict[ShiftCode, int]
+    # Saturday/Sunday overrides of coverage_requirements (missing shifts keep the weekday need).
+    weekend_coverage_requirements: Dict[ShiftCode, int] = {}
     planning_scope: PlanningScope = PlanningScope()
     shifts: Dict[ShiftCode, ShiftDef]
     assumptions: Assumptions = Assumptions()
@@ -81,6 +93,16 @@ class PlanningParams(BaseModel):
     auto_add_agents_if_needed: bool = True
     max_extra_agents: int = 10
     record_tracker_on_generate: bool = False
+    solver_formulation: SolverFormulation = "day"
+    solver_time_limit_seconds: float = 10.0
+    draft_only: bool = False
+    solver_mode: SolverMode = "default"
+    solver_seed: int = 0
+    solver_workers: int = 4
+    solver_deterministic_time: float = 20.0
+    # Continue from the boundary state saved when the previous period of the
+    # same service_unit was recorded (ending the day before start_date).
+    use_boundary_state: bool = True
 
 
 class Preference(BaseModel):
@@ -107,10 +129,22 @@ class LockedAssignment(BaseModel):
     shift: ShiftCode
 
 
+class AgentBoundaryState(BaseModel):
+    """What the next period needs to know about one agent's previous period."""
+
+    end_date: str
+    # Shifts of the last known days of the period, oldest first, ending at
+    # end_date; unknown older days are left out rather than read as days off.
+    last_shifts: List[Optional[ShiftCode]] = []
+    streak_12h: int = 0
+
+
 class GenerateRequest(BaseModel):
     params: PlanningParams
     agents: List[Agent]
     locked_assignments: List[LockedAssignment] = []
+    # Filled from the saved state when empty and params.use_boundary_state.
+    boundary_states: Dict[str, AgentBoundaryState] = {}
 
 
 class ShiftAssignment(BaseModel):
@@ -125,12 +159,25 @@ class ExportRequest(BaseModel):
     service_unit: Optional[str] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    # Used for the shift times and durations; DEFAULT_SHIFTS when omitted.
+    shifts: Optional[Dict[ShiftCode, ShiftDef]] = None
+    csv_extra_columns: List[Literal["shift_start", "shift_end", "duration_minutes", "iso_week", "weekend"]] = Field(
+        default_factory=list
+    )
+    gzip: bool = False
 
 
 class TrackerRecordRequest(BaseModel):
     year: int
     assignments: List[ShiftAssignment]
     agents: List[Agent]
+    # Re-recording the same plan replaces its entries; by default the plan
+    # is identified by service_unit and the period covered.
+    plan_id: Optional[str] = None
+    service_unit: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    shifts: Optional[Dict[ShiftCode, ShiftDef]] = None
 
 
 class TrackerResponse(BaseModel):
@@ -139,6 +186,29 @@ class TrackerResponse(BaseModel):
     names_by_agent: Dict[str, str] = {}
 
 
+RollupGranularity = Literal["week", "month"]
+
+
+class TrackerRollupRow(BaseModel):
+    bucket: str
+    start_date: str
+    end_date: str
+    agent_id: str
+    shift: str
+    minutes: int
+    shifts: int
+    weekend_shifts: int
+
+
+class TrackerRollupResponse(BaseModel):
+    granularity: RollupGranularity
+    rows: List[TrackerRollupRow]
+    minutes_by_agent: Dict[str, int] = {}
+    # Share of the calendar year elapsed at end_date: annual_target_hours *
+    # year_fraction is the prorated year-to-date target.
+    year_fraction: Optional[float] = None
+
+
 LiveTaskStatus = Literal["planned", "in_progress", "done", "blocked"]
 
 
@@ -174,6 +244,161 @@ class LiveTaskEntry(BaseModel):
 class LiveTaskListResponse(BaseModel):
     entries: List[LiveTaskEntry]
     server_time: str
+    rev: int = 0
+    # False when `entries` only holds what changed since the requested since_rev.
+    reset: bool = True
+    deleted_ids: List[str] = Field(default_factory=list)
+
+
+class LiveTaskPageResponse(BaseModel):
+    # Full entries, or only the requested fields (always with id).
+    entries: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    rev: int
+    server_time: str
+
+
+class LiveTaskCountResponse(BaseModel):
+    count: int
+    by_status: Dict[str, int]
+    rev: int
+
+
+class LiveSearchHit(BaseModel):
+    entry: LiveTaskEntry
+    score: float
+
+
+class LiveSearchResponse(BaseModel):
+    q: str
+    hits: List[LiveSearchHit]
+    total: int
+    offset: int
+    limit: int
+    rev: int
+
+
+class LiveStatsGroup(BaseModel):
+    key: Dict[str, str]
+    counts: Dict[str, int]
+    total: int
+
+
+class LiveStatsResponse(BaseModel):
+    group_by: List[str]
+    groups: List[LiveStatsGroup]
+    totals: Dict[str, int]
+    total: int
+    rev: int
+
+
+class LiveTaskTransition(BaseModel):
+    from_status: LiveTaskStatus
+    to_status: LiveTaskStatus
+    date: Optional[str] = None
+    shift: Optional[ShiftCode] = None
+    agent_id: Optional[str] = None
+
+
+class LiveBulkItem(BaseModel):
+    op: Literal["create", "update", "delete", "transition"]
+    entry_id: Optional[str] = None  # update, delete
+    create: Optional[LiveTaskCreateRequest] = None
+    update: Optional[LiveTaskUpdateRequest] = None
+    transition: Optional[LiveTaskTransition] = None
+
+
+class LiveBulkRequest(BaseModel):
+    items: List[LiveBulkItem] = Field(max_length=1000)
+
+
+class LiveBulkItemResult(BaseModel):
+    index: int
+    op: str
+    status: Literal["ok", "rejected", "not_found"]
+    detail: Optional[str] = None
+    entries: List[LiveTaskEntry] = Field(default_factory=list)
+    deleted_ids: List[str] = Field(default_factory=list)
+
+
+class LiveBulkResponse(BaseModel):
+    results: List[LiveBulkItemResult]
+    applied: int
+    rejected: int
+    rev: int
+
+
+class ComplianceScanItem(BaseModel):
+    id: Optional[str | int] = None
+    text: str
+
+
+class ComplianceScanRequest(BaseModel):
+    items: List[ComplianceScanItem | str] = Field(max_length=100000)
+
+
+class RegimeMix(BaseModel):
+    name: Optional[str] = None
+    regimes: List[RegimeCode]
+
+
+class CapacityRequest(BaseModel):
+    params: PlanningParams
+    regime_mixes: List[RegimeMix]
+    confirm: bool = True
+    confirm_horizon_days: int = 28
+    confirm_time_limit_seconds: float = 5.0
+    max_confirm_steps: int = 3
+    max_parallel: int = 4
+
+
+class CapacityMixResult(BaseModel):
+    name: str
+    regimes: List[RegimeCode]
+    status: Literal["confirmed", "lower_bound", "infeasible"]
+    headcount_by_regime: Dict[str, int] = {}
+    total_headcount: int = 0
+    lower_bound_total: int = 0
+    bounds: Dict[str, int] = {}
+    solves: int = 0
+    solve_time_seconds: float = 0.0
+    explanation: Optional[str] = None
+
+
+class CapacityResponse(BaseModel):
+    results: List[CapacityMixResult]
+
+
+class ScenarioVariant(BaseModel):
+    name: str
+    # PlanningParams fields to override; nested dicts are merged into the base values.
+    overrides: Dict[str, object] = {}
+
+
+class ScenarioRequest(BaseModel):
+    base: GenerateRequest
+    variants: List[ScenarioVariant]
+    include_base: bool = True
+    cpu_budget: Optional[int] = None
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    overrides: Dict[str, object] = {}
+    status: Literal["ok", "infeasible"]
+    score: Optional[int] = None
+    renforts_used: int = 0
+    assignments_count: int = 0
+    soir_spread: int = 0
+    weekend_spread: int = 0
+    minutes_spread: int = 0
+    solve_time_seconds: float = 0.0
+    solution_source: Optional[Literal["heuristic", "optimized"]] = None
+    explanation: Optional[str] = None
+
+
+class ScenarioResponse(BaseModel):
+    results: List[ScenarioResult]
 
 
 class ComplianceReport(BaseModel):
@@ -192,3 +417,5 @@ class GenerateResponse(BaseModel):
     tracker_year: Optional[int] = None
     tracker_baseline_minutes: Dict[str, int] = {}
     tracker_updated: bool = False
+    solution_source: Optional[Literal["heuristic", "optimized"]] = None
+    solver_stats: Dict[str, object] = {}
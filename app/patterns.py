@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+DAY_MINUTES = 24 * 60
+WEEK_DAYS = 7
+
+# One entry per day of the block: a shift code, or None for a day off.
+Pattern = Tuple[Optional[str], ...]
+
+
+@dataclass(frozen=True)
+class PatternRuleset:
+    """Hashable view of the rules that constrain one agent's week.
+
+    Two agents sharing a regime under the same ruleset share the same key, so
+    the enumeration below is done once and reused across requests.
+    """
+
+    # (code, start_min, end_min, duration)
+    shifts: Tuple[Tuple[str, int, int, int], ...]
+    allowed_shifts: FrozenSet[str]
+    min_rest: int
+    forbidden_pairs: FrozenSet[Tuple[str, str]]
+    max_consecutive_12h: int
+    forbid_matin_soir_matin: bool
+    max_minutes_rolling_7d: int
+    weekly_rest_min_minutes: int
+
+
+def _rest_between(ruleset: PatternRuleset, s1: str, s2: str, off_days: int) -> int:
+    ends = {code: end for code, _, end, _ in ruleset.shifts}
+    starts = {code: start for code, start, _, _ in ruleset.shifts}
+    return (DAY_MINUTES - ends[s1]) + off_days * DAY_MINUTES + starts[s2]
+
+
+def _has_weekly_rest(ruleset: PatternRuleset, pattern: Pattern) -> bool:
+    for d in range(len(pattern) - 1):
+        if pattern[d] is None and pattern[d + 1] is None:
+            return True
+    for d in range(len(pattern) - 2):
+        s1, mid, s2 = pattern[d], pattern[d + 1], pattern[d + 2]
+        if s1 is None or mid is not None or s2 is None:
+            continue
+        if _rest_between(ruleset, s1, s2, 1) >= ruleset.weekly_rest_min_minutes:
+            return True
+    return False
+
+
+@lru_cache(maxsize=256)
+def enumerate_week_patterns(ruleset: PatternRuleset, length: int = WEEK_DAYS) -> Tuple[Pattern, ...]:
+    """Every legal sequence of `length` days for one agent under `ruleset`.
+
+    Applies the same rules as the day-level model for windows that fit inside
+    the block: daily rest and forbidden transitions, MATIN->SOIR->MATIN,
+    consecutive 12h days, the rolling 48h cap and, for full weeks, the 36h
+    weekly rest block.
+    """
+    durations = {code: duration for code, _, _, duration in ruleset.shifts}
+    options: List[Optional[str]] = [None] + sorted(ruleset.allowed_shifts)
+    forbidden_after = set()
+    for s1 in durations:
+        for s2 in durations:
+            if (s1, s2) in ruleset.forbidden_pairs or _rest_between(ruleset, s1, s2, 0) < ruleset.min_rest:
+                forbidden_after.add((s1, s2))
+
+    out: List[Pattern] = []
+    current: List[Optional[str]] = []
+
+    def _extend(minutes: int) -> None:
+        day = len(current)
+        if day == length:
+            pattern = tuple(current)
+            if length < WEEK_DAYS or _has_weekly_rest(ruleset, pattern):
+                out.append(pattern)
+            return
+        for shift in options:
+            if shift is not None:
+                total = minutes + durations[shift]
+                if total > ruleset.max_minutes_rolling_7d:
+                    continue
+                prev = current[-1] if current else None
+                if prev is not None and (prev, shift) in forbidden_after:
+                    continue
+                if (
+                    ruleset.forbid_matin_soir_matin
+                    and shift == "MATIN"
+                    and day >= 2
+                    and current[-2] == "MATIN"
+                    and current[-1] == "SOIR"
+                ):
+                    continue
+                limit = ruleset.max_consecutive_12h
+                if (
+                    limit > 0
+                    and shift == "JOUR_12H"
+                    and day >= limit
+                    and all(s == "JOUR_12H" for s in current[-limit:])
+                ):
+                    continue
+            else:
+                total = minutes
+            current.append(shift)
+            _extend(total)
+            current.pop()
+
+    _extend(0)
+    return tuple(out)
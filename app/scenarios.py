@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from .models import GenerateRequest, PlanningParams, ScenarioRequest, ScenarioResult, ScenarioVariant
+from .scheduler import SolveContext, solve_planning
+
+
+def _merge(base: Dict[str, object], overrides: Dict[str, object]) -> Dict[str, object]:
+    merged = dict(base)
+    for key, value in overrides.items():
+        current = merged.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = _merge(current, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def build_variant_requests(req: ScenarioRequest) -> List[Tuple[ScenarioVariant, GenerateRequest]]:
+    """One GenerateRequest per variant, sharing the base agents and locks.
+
+    Raises ValueError naming the variant when its overrides are not valid
+    PlanningParams.
+    """
+    base_params = req.base.params.model_dump(by_alias=True)
+    variants = list(req.variants)
+    if req.include_base:
+        variants.insert(0, ScenarioVariant(name="base"))
+    out: List[Tuple[ScenarioVariant, GenerateRequest]] = []
+    for variant in variants:
+        try:
+            params = PlanningParams(**_merge(base_params, variant.overrides))
+        except ValidationError as exc:
+            raise ValueError(f"Variante {variant.name}: {exc.errors()[0].get('msg', 'invalide')}") from exc
+        # Agents and locks are already validated: reuse the same objects.
+        out.append(
+            (
+                variant,
+                GenerateRequest.model_construct(
+                    params=params,
+                    agents=req.base.agents,
+                    locked_assignments=req.base.locked_assignments,
+                    boundary_states=req.base.boundary_states,
+                ),
+            )
+        )
+    return out
+
+
+def _spread(values: List[int]) -> int:
+    return max(values) - min(values) if values else 0
+
+
+def run_scenarios(
+    req: ScenarioRequest,
+    baseline_for_year: Callable[[int], Dict[str, int]],
+) -> List[ScenarioResult]:
+    """Solve every variant concurrently, splitting `cpu_budget` threads between them."""
+    variant_requests = build_variant_requests(req)
+    budget = max(1, req.cpu_budget or os.cpu_count() or 1)
+    parallel = max(1, min(len(variant_requests), budget))
+    workers_per_solve = max(1, budget // parallel)
+    # Variants share the base agents and locks: days, shifts, weekly patterns
+    # and greedy drafts are built once per distinct input.
+    context = SolveContext()
+
+    baselines: Dict[int, Dict[str, int]] = {}
+    baselines_lock = Lock()
+
+    def _baseline(gen: GenerateRequest) -> Dict[str, int]:
+        if not gen.params.use_tracker:
+            return {}
+        year = gen.params.tracker_year
+        with baselines_lock:
+            if year not in baselines:
+                try:
+                    baselines[year] = baseline_for_year(year)
+                except Exception:
+                    baselines[year] = {}
+            return baselines[year]
+
+    def _run(item: Tuple[ScenarioVariant, GenerateRequest]) -> ScenarioResult:
+        variant, gen = item
+        started = time.monotonic()
+        result = solve_planning(gen, _baseline(gen), num_workers=workers_per_solve, context=context)
+        elapsed = round(time.monotonic() - started, 3)
+        agents = list(gen.agents) + list(result.added_agents)
+        durations = {code: s.duration_minutes for code, s in gen.params.shifts.items()}
+        soir = {a.id: 0 for a in agents}
+        weekend = {a.id: 0 for a in agents}
+        minutes = {a.id: 0 for a in agents}
+        for a in result.assignments:
+            if a.shift == "SOIR":
+                soir[a.agent_id] = soir.get(a.agent_id, 0) + 1
+            if datetime.strptime(a.date, "%Y-%m-%d").date().weekday() >= 5:
+                weekend[a.agent_id] = weekend.get(a.agent_id, 0) + 1
+            minutes[a.agent_id] = minutes.get(a.agent_id, 0) + durations.get(a.shift, 0)
+        ok = result.status == "ok"
+        return ScenarioResult(
+            name=variant.name,
+            overrides=variant.overrides,
+            status="ok" if ok else "infeasible",
+            score=result.score,
+            renforts_used=len(result.added_agents),
+            assignments_count=len(result.assignments),
+            soir_spread=_spread(list(soir.values())) if ok else 0,
+            weekend_spread=_spread(list(weekend.values())) if ok else 0,
+            minutes_spread=_spread(list(minutes.values())) if ok else 0,
+            solve_time_seconds=elapsed,
+            solution_source=result.source,
+            explanation=result.explanation,
+        )
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        return list(pool.map(_run, variant_requests))
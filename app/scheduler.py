@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from threading import Lock
+from typing import Callable, Dict, List, Tuple, TypeVar
 
 from ortools.sat.python import cp_model
 
-from .models import Agent, GenerateRequest, ShiftAssignment
+from .heuristic import build_greedy_draft
+from .models import Agent, GenerateRequest, PlanningParams, ShiftAssignment
+from .patterns import WEEK_DAYS, Pattern, PatternRuleset, enumerate_week_patterns
 
 
 @dataclass
@@ -17,6 +21,54 @@ class ShiftInfo:
     duration: int
 
 
+@dataclass
+class SolveResult:
+    status: str
+    assignments: List[ShiftAssignment]
+    score: int | None
+    explanation: str | None
+    added_agents: List[Agent] = field(default_factory=list)
+    # "heuristic" when the greedy draft is returned as is, "optimized" when CP-SAT produced it.
+    source: str | None = None
+    # Solver settings actually used plus search effort (status, times, branches).
+    stats: Dict[str, object] = field(default_factory=dict)
+
+
+_T = TypeVar("_T")
+
+# Params that only steer CP-SAT: variants differing in these share a greedy draft.
+_SOLVER_ONLY_FIELDS = {
+    "solver_formulation",
+    "solver_time_limit_seconds",
+    "draft_only",
+    "solver_mode",
+    "solver_seed",
+    "solver_workers",
+    "solver_deterministic_time",
+    "record_tracker_on_generate",
+}
+
+
+@dataclass
+class SolveContext:
+    """Pre-processed inputs shared by several solves of the same agents and locks.
+
+    Entries are keyed by what they are derived from, so a solve only rebuilds
+    the pieces its own params change.
+    """
+
+    cache: Dict[Tuple[object, ...], object] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def get(self, key: Tuple[object, ...], build: Callable[[], _T]) -> _T:
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]  # type: ignore[return-value]
+        value = build()
+        with self.lock:
+            return self.cache.setdefault(key, value)  # type: ignore[return-value]
+
+
 DAY_MINUTES = 24 * 60
 
 
@@ -47,44 +99,119 @@ def _is_weekend(date_str: str) -> bool:
     return d.weekday() >= 5
 
 
-def build_solution(
-    req: GenerateRequest,
-    baseline_minutes: Dict[str, int] | None = None,
-) -> Tuple[str, List[ShiftAssignment], int | None, str | None, List[Agent]]:
-    params = req.params
-    days = _date_range(params.start_date, params.end_date)
-    if not days:
-        return "infeasible", [], None, "Période invalide", []
-
-    shifts: Dict[str, ShiftInfo] = {}
-    for code, sdef in params.shifts.items():
-        shifts[code] = ShiftInfo(
+def parse_shifts(params: PlanningParams) -> Dict[str, ShiftInfo]:
+    return {
+        code: ShiftInfo(
             code=code,
             start_min=_parse_time_to_min(sdef.start),
             end_min=_parse_time_to_min(sdef.end),
             duration=sdef.duration_minutes,
         )
+        for code, sdef in params.shifts.items()
+    }
+
 
-    global_allowed = set(shifts.keys())
+def global_allowed_shifts(params: PlanningParams) -> set[str]:
     if params.mode == "12h_jour":
-        global_allowed = {"JOUR_12H"}
-    elif params.mode == "matin_soir":
-        global_allowed = {"MATIN", "SOIR"}
+        return {"JOUR_12H"}
+    if params.mode == "matin_soir":
+        return {"MATIN", "SOIR"}
+    return set(params.shifts.keys())
+
+
+def regime_allowed_shifts(params: PlanningParams, regime: str, global_allowed: set[str]) -> set[str]:
+    allowed = set(params.agent_regimes[regime].allowed_shifts).intersection(global_allowed)
+    if regime == "REGIME_MIXTE":
+        allowed = set(["MATIN", "SOIR"]).intersection(global_allowed)
+        if params.allow_single_12h_exception and "JOUR_12H" in global_allowed:
+            allowed.add("JOUR_12H")
+    return allowed
+
+
+def coverage_for_day(params: PlanningParams, date_str: str) -> Dict[str, int]:
+    if params.weekend_coverage_requirements and _is_weekend(date_str):
+        return {**params.coverage_requirements, **params.weekend_coverage_requirements}
+    return dict(params.coverage_requirements)
+
+
+def daily_min_rest(params: PlanningParams) -> int:
+    min_rest = params.ruleset_defaults.daily_rest_min_minutes
+    if params.agreement_11h_enabled:
+        min_rest = min(min_rest, params.ruleset_defaults.daily_rest_min_minutes_with_agreement)
+    return min_rest
+
+
+def _legal_patterns(
+    ruleset: PatternRuleset,
+    block_days: List[str],
+    locked: Dict[str, str],
+    agent: Agent,
+    exception_dates: List[str],
+) -> List[Tuple[int, Pattern]]:
+    """(index, pattern) for the weekly patterns this agent can work on `block_days`."""
+    legal_patterns = []
+    for p_idx, pattern in enumerate(enumerate_week_patterns(ruleset, len(block_days))):
+        legal = True
+        for d, s in zip(block_days, pattern):
+            if d in locked and locked[d] != s:
+                legal = False
+            elif s is not None and d in agent.unavailability_dates:
+                legal = False
+            elif s == "JOUR_12H" and agent.regime == "REGIME_MIXTE" and exception_dates and d not in exception_dates:
+                legal = False
+            if not legal:
+                break
+        if legal:
+            legal_patterns.append((p_idx, pattern))
+    return legal_patterns
+
+
+def build_solution(
+    req: GenerateRequest,
+    baseline_minutes: Dict[str, int] | None = None,
+) -> Tuple[str, List[ShiftAssignment], int | None, str | None, List[Agent]]:
+    result = solve_planning(req, baseline_minutes)
+    return result.status, result.assignments, result.score, result.explanation, result.added_agents
+
+
+def solve_planning(
+    req: GenerateRequest,
+    baseline_minutes: Dict[str, int] | None = None,
+    num_workers: int | None = None,
+    context: SolveContext | None = None,
+) -> SolveResult:
+    """Solve one planning; `num_workers` caps CP-SAT threads in default mode (all cores otherwise).
+
+    `context` shares days, shifts, legal weekly patterns and greedy drafts
+    with other solves of the same agents (see app.scenarios).
+    """
+    params = req.params
+    context = context or SolveContext()
+    days = context.get(("days", params.start_date, params.end_date), lambda: _date_range(params.start_date, params.end_date))
+    if not days:
+        return SolveResult("infeasible", [], None, "Période invalide")
+
+    shifts = context.get(
+        ("shifts", tuple((code, s.start, s.end, s.duration_minutes) for code, s in params.shifts.items())),
+        lambda: parse_shifts(params),
+    )
+    global_allowed = global_allowed_shifts(params)
 
     # A non-zero need on a shift disabled by mode must fail fast.
-    for shift_code, required in params.coverage_requirements.items():
+    peak_coverage: Dict[str, int] = {}
+    for d in days:
+        for shift_code, required in coverage_for_day(params, d).items():
+            peak_coverage[shift_code] = max(peak_coverage.get(shift_code, 0), required)
+    for shift_code, required in peak_coverage.items():
         if required > 0 and shift_code not in global_allowed:
-            return (
+            return SolveResult(
                 "infeasible",
                 [],
                 None,
                 f"Couverture demandee pour {shift_code} incompatible avec le mode {params.mode}",
-                [],
             )
 
-    min_rest = params.ruleset_defaults.daily_rest_min_minutes
-    if params.agreement_11h_enabled:
-        min_rest = min(min_rest, params.ruleset_defaults.daily_rest_min_minutes_with_agreement)
+    min_rest = daily_min_rest(params)
 
     forbidden_pairs = set()
     for tr in params.hard_forbidden_transitions:
@@ -93,8 +220,40 @@ def build_solution(
     baseline_minutes = baseline_minutes or {}
     max_shift_duration = max(s.duration for s in shifts.values())
 
+    # Last days of the previous period (oldest first, ending the day before
+    # start_date), used as constants on the first days of this one.
+    previous_end = (datetime.strptime(days[0], "%Y-%m-%d").date() - timedelta(days=1)).isoformat()
+    trailing: Dict[str, List[str | None]] = {}
+    streak_12h: Dict[str, int] = {}
+    for agent_id, state in req.boundary_states.items():
+        if state.end_date != previous_end:
+            continue
+        trailing[agent_id] = [s if s in shifts else None for s in state.last_shifts][-(WEEK_DAYS - 1):]
+        streak_12h[agent_id] = state.streak_12h
+
+    # Pattern formulation: each agent picks one legal pattern per 7-day block
+    # (counted from start_date); day-level rules are then only posted on
+    # windows that straddle two blocks.
+    use_patterns = params.solver_formulation == "pattern"
+    block_of = [d_idx // WEEK_DAYS for d_idx in range(len(days))]
+
+    def _within_block(d_start: int, d_end: int) -> bool:
+        return use_patterns and block_of[d_start] == block_of[min(d_end, len(days) - 1)]
+
+    def _pattern_ruleset(allowed: set[str], max_consec: int) -> PatternRuleset:
+        return PatternRuleset(
+            shifts=tuple(sorted((s.code, s.start_min, s.end_min, s.duration) for s in shifts.values())),
+            allowed_shifts=frozenset(allowed),
+            min_rest=min_rest,
+            forbidden_pairs=frozenset(forbidden_pairs),
+            max_consecutive_12h=max_consec if "JOUR_12H" in shifts else 0,
+            forbid_matin_soir_matin=params.forbid_matin_soir_matin and {"MATIN", "SOIR"} <= set(shifts),
+            max_minutes_rolling_7d=params.ruleset_defaults.max_minutes_rolling_7d,
+            weekly_rest_min_minutes=params.ruleset_defaults.weekly_rest_min_minutes,
+        )
+
     def _make_extra_agent(index: int) -> Agent:
-        needs_12h = params.coverage_requirements.get("JOUR_12H", 0) > 0
+        needs_12h = peak_coverage.get("JOUR_12H", 0) > 0
         if params.mode == "12h_jour":
             regime = "REGIME_12H_JOUR"
         elif needs_12h and "REGIME_POLYVALENT" in params.agent_regimes:
@@ -117,7 +276,43 @@ def build_solution(
             preferences=[],
         )
 
-    def _solve(agents: List[Agent]) -> Tuple[str, List[ShiftAssignment], int | None, str | None]:
+    if params.solver_mode == "deterministic":
+        solver_config: Dict[str, object] = {
+            "mode": "deterministic",
+            "seed": params.solver_seed,
+            "workers": max(1, params.solver_workers),
+            "max_deterministic_time": params.solver_deterministic_time,
+        }
+    else:
+        solver_config = {"mode": "default", "max_time_in_seconds": params.solver_time_limit_seconds}
+        if num_workers:
+            solver_config["workers"] = num_workers
+
+    def _solve(agents: List[Agent]) -> SolveResult:
+        started = time.monotonic()
+        allowed_shifts_by_agent: Dict[int, set[str]] = {a_idx: regime_allowed_shifts(params, a.regime, global_allowed) for a_idx, a in enumerate(agents)}
+        draft = context.get(
+            (
+                "draft",
+                params.model_dump_json(exclude=_SOLVER_ONLY_FIELDS),
+                tuple(a.id for a in agents),
+                tuple(sorted(baseline_minutes.items())),
+            ),
+            lambda: build_greedy_draft(
+                req,
+                agents,
+                days,
+                shifts,
+                allowed_shifts_by_agent,
+                min_rest,
+                forbidden_pairs,
+                baseline_minutes,
+                trailing,
+            ),
+        )
+        if draft is not None and params.draft_only:
+            return SolveResult("ok", list(draft), None, None, source="heuristic", stats=dict(solver_config))
+
         model = cp_model.CpModel()
 
         # Variables
@@ -128,15 +323,8 @@ def build_solution(
                     x[(a_idx, d_idx, s)] = model.NewBoolVar(f"x_{a_idx}_{d_idx}_{s}")
 
         # One shift per day + availability + regime
-        allowed_shifts_by_agent: Dict[int, set[str]] = {}
         for a_idx, agent in enumerate(agents):
-            regime = params.agent_regimes[agent.regime]
-            allowed = set(regime.allowed_shifts).intersection(global_allowed)
-            if agent.regime == "REGIME_MIXTE":
-                allowed = set(["MATIN", "SOIR"]).intersection(global_allowed)
-                if params.allow_single_12h_exception and "JOUR_12H" in global_allowed:
-                    allowed.add("JOUR_12H")
-            allowed_shifts_by_agent[a_idx] = set(allowed)
+            allowed = allowed_shifts_by_agent[a_idx]
             for d_idx, d in enumerate(days):
                 day_vars = [x[(a_idx, d_idx, s)] for s in shifts.keys()]
                 model.Add(sum(day_vars) <= 1)
@@ -165,16 +353,60 @@ def build_solution(
             for s in shifts.keys():
                 model.Add(x[(a_idx, d_idx, s)] == (1 if s == lock.shift else 0))
 
+        # Weekly patterns: one per agent and block, linked to the day variables.
+        if use_patterns:
+            locked_by_agent: Dict[str, Dict[str, str]] = {}
+            for lock in req.locked_assignments:
+                locked_by_agent.setdefault(lock.agent_id, {})[lock.date] = lock.shift
+            for a_idx, agent in enumerate(agents):
+                ruleset = _pattern_ruleset(
+                    allowed_shifts_by_agent[a_idx],
+                    params.agent_regimes[agent.regime].max_consecutive_12h_days or 0,
+                )
+                locked = locked_by_agent.get(agent.id, {})
+                for b_start in range(0, len(days), WEEK_DAYS):
+                    block_days = days[b_start:b_start + WEEK_DAYS]
+                    legal_patterns = context.get(
+                        (
+                            "patterns",
+                            ruleset,
+                            tuple(block_days),
+                            agent.id,
+                            agent.regime,
+                            tuple(params.allowed_12h_exception_dates),
+                        ),
+                        lambda: _legal_patterns(ruleset, block_days, locked, agent, params.allowed_12h_exception_dates),
+                    )
+                    chosen = [
+                        (pattern, model.NewBoolVar(f"pattern_{a_idx}_{b_start}_{p_idx}"))
+                        for p_idx, pattern in legal_patterns
+                    ]
+                    if not chosen:
+                        return SolveResult(
+                            "infeasible",
+                            [],
+                            None,
+                            f"Aucun motif hebdomadaire legal pour {agent.id}",
+                            stats=dict(solver_config),
+                        )
+                    model.AddExactlyOne(var for _, var in chosen)
+                    for k, d in enumerate(block_days):
+                        for s in shifts.keys():
+                            model.Add(x[(a_idx, b_start + k, s)] == sum(var for pattern, var in chosen if pattern[k] == s))
+
         # Coverage constraints: assign exactly the requested count per shift/day.
         for d_idx, d in enumerate(days):
-            for s in global_allowed:
-                required = params.coverage_requirements.get(s, 0)
+            day_coverage = coverage_for_day(params, d)
+            for s in sorted(global_allowed):
+                required = day_coverage.get(s, 0)
                 vars_cover = [x[(a_idx, d_idx, s)] for a_idx in range(len(agents))]
                 model.Add(sum(vars_cover) == required)
 
         # Daily rest and forbidden transitions
         for a_idx, agent in enumerate(agents):
             for d_idx in range(len(days) - 1):
+                if _within_block(d_idx, d_idx + 1):
+                    continue
                 for s1 in shifts.keys():
                     for s2 in shifts.keys():
                         if (s1, s2) in forbidden_pairs:
@@ -192,6 +424,8 @@ def build_solution(
             max_consec = regime.max_consecutive_12h_days or 0
             if max_consec > 0:
                 for d_idx in range(len(days) - max_consec):
+                    if _within_block(d_idx, d_idx + max_consec):
+                        continue
                     window = [x[(a_idx, d_idx + k, "JOUR_12H")] for k in range(max_consec + 1)]
                     model.Add(sum(window) <= max_consec)
 
@@ -209,6 +443,8 @@ def build_solution(
         if params.forbid_matin_soir_matin:
             for a_idx, agent in enumerate(agents):
                 for d_idx in range(len(days) - 2):
+                    if _within_block(d_idx, d_idx + 2):
+                        continue
                     model.Add(
                         x[(a_idx, d_idx, "MATIN")]
                         + x[(a_idx, d_idx + 1, "SOIR")]
@@ -220,6 +456,8 @@ def build_solution(
         max_7d = params.ruleset_defaults.max_minutes_rolling_7d
         for a_idx, agent in enumerate(agents):
             for d_idx in range(len(days)):
+                if _within_block(d_idx, d_idx + 6):
+                    continue
                 window_vars = []
                 for k in range(7):
                     if d_idx + k >= len(days):
@@ -265,6 +503,8 @@ def build_solution(
             # For each rolling 7-day window, require at least one rest block inside
             if len(days) >= 7:
                 for w in range(len(days) - 6):
+                    if _within_block(w, w + 6):
+                        continue
                     candidates = []
                     for (d_start, d_end, rb) in rest_blocks:
                         if d_start >= w and d_end <= w + 6:
@@ -275,6 +515,80 @@ def build_solution(
                     if candidates:
                         model.Add(sum(candidates) >= 1)
 
+            # Windows starting in the previous period: the part already worked
+            # is fixed, the rest block has to come from the first days here.
+            trail = trailing.get(agent.id, [])
+            # "Off on day 0, then s2 on day 1" closes a rest block after the
+            # last day worked; every window that needs it shares the same var.
+            rest1_prev: Dict[str, cp_model.IntVar] = {}
+            if trail and trail[-1] is not None and len(days) >= 2:
+                for s2 in shifts.keys():
+                    if (DAY_MINUTES - shifts[trail[-1]].end_min) + DAY_MINUTES + shifts[s2].start_min >= weekly_rest_min:
+                        rb = model.NewBoolVar(f"rest1_prev_{a_idx}_{s2}")
+                        model.Add(rb <= off[0])
+                        model.Add(rb <= x[(a_idx, 1, s2)])
+                        rest1_prev[s2] = rb
+            for k in range(1, len(trail) + 1):
+                w_end = WEEK_DAYS - 1 - k
+                if w_end >= len(days):
+                    continue
+                part = trail[len(trail) - k:]
+                if any(
+                    part[i] is None and part[i + 1] is None for i in range(len(part) - 1)
+                ) or any(
+                    part[i] is not None
+                    and part[i + 1] is None
+                    and part[i + 2] is not None
+                    and (DAY_MINUTES - shifts[part[i]].end_min) + DAY_MINUTES + shifts[part[i + 2]].start_min >= weekly_rest_min
+                    for i in range(len(part) - 2)
+                ):
+                    continue
+                candidates = [rb for (d_start, d_end, rb) in rest_blocks + single_blocks if d_end <= w_end]
+                last, before = trail[-1], (trail[-2] if k >= 2 else None)
+                if last is None:
+                    candidates.append(off[0])
+                    if before is not None:
+                        for s2 in shifts.keys():
+                            if (DAY_MINUTES - shifts[before].end_min) + DAY_MINUTES + shifts[s2].start_min >= weekly_rest_min:
+                                candidates.append(x[(a_idx, 0, s2)])
+                elif w_end >= 1:
+                    candidates.extend(rest1_prev.values())
+                # A window the previous period already made impossible is left out.
+                if candidates:
+                    model.AddBoolOr(candidates)
+
+        # Other rules across the boundary with the previous period
+        for a_idx, agent in enumerate(agents):
+            trail = trailing.get(agent.id)
+            if not trail:
+                continue
+            last = trail[-1]
+            if last is not None:
+                for s2 in shifts.keys():
+                    rest = (DAY_MINUTES - shifts[last].end_min) + shifts[s2].start_min
+                    if (last, s2) in forbidden_pairs or rest < min_rest:
+                        model.Add(x[(a_idx, 0, s2)] == 0)
+            if params.forbid_matin_soir_matin and {"MATIN", "SOIR"} <= set(shifts):
+                if trail[-2:] == ["MATIN", "SOIR"]:
+                    model.Add(x[(a_idx, 0, "MATIN")] == 0)
+                if last == "MATIN" and len(days) >= 2:
+                    model.Add(x[(a_idx, 0, "SOIR")] + x[(a_idx, 1, "MATIN")] <= 1)
+            max_consec = params.agent_regimes[agent.regime].max_consecutive_12h_days or 0
+            streak = streak_12h.get(agent.id, 0)
+            if max_consec > 0 and streak > 0 and "JOUR_12H" in shifts:
+                allowed_more = max(0, max_consec - streak)
+                lead = [x[(a_idx, d_idx, "JOUR_12H")] for d_idx in range(min(allowed_more + 1, len(days)))]
+                if len(lead) > allowed_more:
+                    model.Add(sum(lead) <= allowed_more)
+            for k in range(1, len(trail) + 1):
+                carried = sum(shifts[s].duration for s in trail[len(trail) - k:] if s is not None)
+                window_vars = [
+                    x[(a_idx, d_idx, s)] * shifts[s].duration
+                    for d_idx in range(min(WEEK_DAYS - k, len(days)))
+                    for s in shifts.keys()
+                ]
+                model.Add(sum(window_vars) <= max_7d - carried)
+
         # Cycle mode weekly max
         if params.ruleset_defaults.cycle_mode_enabled:
             max_week = params.ruleset_defaults.max_minutes_per_week_excluding_overtime
@@ -417,11 +731,11 @@ def build_solution(
 
         # Fairness on period target minutes by shift eligibility and quotity.
         desired_period_minutes = [0 for _ in agents]
-        for shift_code in global_allowed:
-            required_per_day = params.coverage_requirements.get(shift_code, 0)
-            if required_per_day <= 0:
+        for shift_code in sorted(global_allowed):
+            required_days = sum(coverage_for_day(params, d).get(shift_code, 0) for d in days)
+            if required_days <= 0:
                 continue
-            total_minutes_for_shift = required_per_day * len(days) * shifts[shift_code].duration
+            total_minutes_for_shift = required_days * shifts[shift_code].duration
             eligible = [a_idx for a_idx in range(len(agents)) if shift_code in allowed_shifts_by_agent[a_idx]]
             if not eligible:
                 continue
@@ -474,11 +788,40 @@ def build_solution(
 
         model.Minimize(sum(penalties) if penalties else 0)
 
+        # Start the search from the greedy draft when there is one.
+        if draft is not None:
+            drafted = {(a.agent_id, a.date): a.shift for a in draft}
+            for (a_idx, d_idx, s), var in x.items():
+                model.AddHint(var, int(drafted.get((agents[a_idx].id, days[d_idx])) == s))
+
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 10
+        if params.solver_mode == "deterministic":
+            # Interleaved search is reproducible for a given seed and worker
+            # count; the deterministic time limit replaces the wall clock.
+            solver.parameters.random_seed = params.solver_seed
+            solver.parameters.num_workers = max(1, params.solver_workers)
+            solver.parameters.interleave_search = True
+            solver.parameters.max_deterministic_time = params.solver_deterministic_time
+        else:
+            solver.parameters.max_time_in_seconds = max(0.1, params.solver_time_limit_seconds - (time.monotonic() - started))
+            if num_workers:
+                solver.parameters.num_workers = num_workers
         status = solver.Solve(model)
+        stats = dict(solver_config)
+        stats.update(
+            {
+                "status": solver.StatusName(status),
+                "wall_time": round(solver.WallTime(), 3),
+                "deterministic_time": round(solver.deterministic_time, 3),
+                "branches": solver.NumBranches(),
+                "conflicts": solver.NumConflicts(),
+                "hinted": draft is not None,
+            }
+        )
         if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            return "infeasible", [], None, "Aucune solution faisable sous contraintes"
+            if status == cp_model.UNKNOWN and draft is not None:
+                return SolveResult("ok", list(draft), None, None, source="heuristic", stats=stats)
+            return SolveResult("infeasible", [], None, "Aucune solution faisable sous contraintes", stats=stats)
 
         assignments: List[ShiftAssignment] = []
         for a_idx, agent in enumerate(agents):
@@ -487,25 +830,21 @@ def build_solution(
                     if solver.Value(x[(a_idx, d_idx, s)]) == 1:
                         assignments.append(ShiftAssignment(agent_id=agent.id, date=d, shift=s))
 
-        return "ok", assignments, int(solver.ObjectiveValue()), None
+        return SolveResult("ok", assignments, int(solver.ObjectiveValue()), None, source="optimized", stats=stats)
 
     added_agents: List[Agent] = []
     base_agents = list(req.agents)
     if not params.auto_add_agents_if_needed:
-        status, assignments, score, explanation = _solve(base_agents)
-        return status, assignments, score, explanation, added_agents
+        return _solve(base_agents)
 
     max_extra = max(params.max_extra_agents, 0)
-    last_status = "infeasible"
-    last_assignments: List[ShiftAssignment] = []
-    last_score: int | None = None
-    last_explanation: str | None = None
+    last = SolveResult("infeasible", [], None, None)
     for idx in range(max_extra + 1):
-        status, assignments, score, explanation = _solve(base_agents + added_agents)
-        last_status, last_assignments, last_score, last_explanation = status, assignments, score, explanation
-        if status == "ok":
-            return status, assignments, score, explanation, added_agents
+        last = _solve(base_agents + added_agents)
+        last.added_agents = list(added_agents)
+        if last.status == "ok":
+            return last
         if idx < max_extra:
             added_agents.append(_make_extra_agent(idx + 1))
 
-    return last_status, last_assignments, last_score, last_explanation, added_agents
+    return last
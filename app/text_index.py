@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ß": "ss"})
+# Too common in task titles to tell entries apart.
+STOPWORDS = frozenset(
+    "au aux avec ce ces dans de des du elle en et il la le les leur ne ou par pas pour qui que sa se ses son sur un une".split()
+)
+TITLE_WEIGHT = 3
+DETAILS_WEIGHT = 1
+
+
+def fold_text(text: str) -> str:
+    """Lower-case `text` and strip accents: "Bilan sanguin à jeûn" -> "bilan sanguin a jeun"."""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_LIGATURES))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded words of `text`, without stopwords and single letters (l', d', ...)."""
+    return [t for t in _TOKEN_RE.findall(fold_text(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class TextIndex:
+    """Inverted index of weighted terms per document, with prefix lookups.
+
+    A title word counts TITLE_WEIGHT, a details word DETAILS_WEIGHT; a query
+    word matches a term equal to it or starting with it, the latter at half
+    weight. Every query word must match.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.docs: Dict[str, Dict[str, int]] = {}
+        # Sorted vocabulary, for prefix ranges.
+        self.terms: List[str] = []
+
+    def update(self, doc_id: str, title: str, details: str) -> None:
+        weights: Dict[str, int] = {}
+        for token in tokenize(title):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(details):
+            weights[token] = weights.get(token, 0) + DETAILS_WEIGHT
+        if self.docs.get(doc_id) == weights:
+            return
+        self.remove(doc_id)
+        self.docs[doc_id] = weights
+        for term, weight in weights.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                insort(self.terms, term)
+            posting[doc_id] = weight
+
+    def remove(self, doc_id: str) -> None:
+        for term in self.docs.pop(doc_id, {}):
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+                self.terms.pop(bisect_left(self.terms, term))
+
+    def _expand(self, word: str) -> Iterable[Tuple[str, float]]:
+        """Terms matching one query word, with their match factor."""
+        i = bisect_left(self.terms, word)
+        while i < len(self.terms) and self.terms[i].startswith(word):
+            term = self.terms[i]
+            yield term, 1.0 if term == word else 0.5
+            i += 1
+
+    def search(self, query: str) -> Dict[str, float]:
+        """Score of every document matching all words of `query` (tf-idf style)."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return {}
+        n_docs = max(1, len(self.docs))
+        scores: Dict[str, float] = {}
+        for position, word in enumerate(words):
+            best: Dict[str, float] = {}
+            for term, factor in self._expand(word):
+                posting = self.postings[term]
+                idf = math.log(1 + n_docs / len(posting))
+                for doc_id, weight in posting.items():
+                    if position and doc_id not in scores:
+                        continue
+                    score = weight * factor * idf
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            if not best:
+                return {}
+            scores = {doc_id: scores.get(doc_id, 0.0) + score for doc_id, score in best.items()}
+        return scores
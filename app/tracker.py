@@ -1,75 +1,465 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date as date_cls, timedelta
 from pathlib import Path
-from typing import Dict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
 
-TRACKER_PATH = Path(__file__).resolve().parent.parent / "data" / "hours_tracker.json"
-_TMP_TRACKER_PATH = Path("/tmp") / "maman-emploi" / "data" / "hours_tracker.json"
+TRACKER_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "hours_tracker.sqlite3"
+# Legacy store, imported once into SQLite on first use.
+TRACKER_PATH = TRACKER_DB_PATH.with_suffix(".json")
+_TMP_TRACKER_DB_PATH = Path("/tmp") / "maman-emploi" / "data" / "hours_tracker.sqlite3"
+
+# One ledger row per (plan, agent, date) holds the real shift duration;
+# tracker_minutes is the per-year aggregate kept in step with the ledger.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracker_minutes (
+    year INTEGER NOT NULL,
+    agent_id TEXT NOT NULL,
+    minutes INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL,
+    PRIMARY KEY (year, agent_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tracker_ledger (
+    plan_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    shift TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, agent_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tracker_ledger_year_agent ON tracker_ledger (year, agent_id);
+CREATE TABLE IF NOT EXISTS tracker_rollup (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    shift TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    minutes INTEGER NOT NULL DEFAULT 0,
+    shifts INTEGER NOT NULL DEFAULT 0,
+    weekend_shifts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, agent_id, shift)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tracker_rollup_range ON tracker_rollup (granularity, start_date, agent_id);
+CREATE TABLE IF NOT EXISTS boundary_state (
+    service_unit TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (service_unit, end_date, agent_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tracker_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_ADD_SQL = """
+INSERT INTO tracker_minutes (year, agent_id, minutes, name) VALUES (?, ?, ?, ?)
+ON CONFLICT (year, agent_id) DO UPDATE SET
+    minutes = tracker_minutes.minutes + excluded.minutes,
+    name = CASE WHEN ? THEN excluded.name ELSE tracker_minutes.name END
+"""
+
+_ROLLUP_SQL = """
+INSERT INTO tracker_rollup
+    (granularity, bucket, agent_id, shift, start_date, end_date, minutes, shifts, weekend_shifts)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (granularity, bucket, agent_id, shift) DO UPDATE SET
+    minutes = tracker_rollup.minutes + excluded.minutes,
+    shifts = tracker_rollup.shifts + excluded.shifts,
+    weekend_shifts = tracker_rollup.weekend_shifts + excluded.weekend_shifts
+"""
+
+ROLLUP_GRANULARITIES = ("week", "month")
+
+# (agent_id, date, shift, minutes, name)
+LedgerRow = Tuple[str, str, str, int, Optional[str]]
+
+_INIT_LOCK = Lock()
+_INITIALISED: set[Path] = set()
+_RESOLVED: Dict[Path, Path] = {}
+
+
+@dataclass(frozen=True)
+class TrackerSnapshot:
+    year: int
+    minutes: Dict[str, int]
+    names: Dict[str, str]
+    etag: str
+
+
+# Parsed per-year snapshots. An entry is reused while the write counter and
+# the database/WAL file stats are unchanged; writes through this module bump
+# the counter, writes from other processes show up in the file stats.
+_CACHE_LOCK = Lock()
+_CACHE: Dict[Tuple[Path, int], Tuple[tuple, TrackerSnapshot]] = {}
+_WRITE_VERSION: Dict[Path, int] = {}
+
+
+def plan_key(service_unit: str | None, start_date: str, end_date: str) -> str:
+    """Stable id of a planning: the same unit and period always map to the same plan."""
+    return f"{service_unit or '-'}:{start_date}:{end_date}"
 
 
 def _resolve_storage_path(path: Path) -> Path:
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
         if not path.exists():
-            path.write_text("{}", encoding="utf-8")
+            path.touch()
         return path
     except OSError:
-        _TMP_TRACKER_PATH.parent.mkdir(parents=True, exist_ok=True)
-        if not _TMP_TRACKER_PATH.exists():
-            _TMP_TRACKER_PATH.write_text("{}", encoding="utf-8")
-        return _TMP_TRACKER_PATH
+        _TMP_TRACKER_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        return _TMP_TRACKER_DB_PATH.with_name(path.name)
 
 
-def _ensure_file(path: Path) -> Path:
-    target = _resolve_storage_path(path)
-    if not target.exists():
-        target.write_text("{}", encoding="utf-8")
+def _target(path: Path) -> Path:
+    target = _RESOLVED.get(path)
+    if target is None:
+        target = _RESOLVED[path] = _resolve_storage_path(path)
     return target
 
 
-def load_tracker(path: Path = TRACKER_PATH) -> Dict[str, Dict[str, Dict[str, object]]]:
-    target = _ensure_file(path)
-    try:
-        return json.loads(target.read_text(encoding="utf-8"))
-    except (json.JSONDecodeError, OSError):
-        return {}
+def _file_signature(target: Path) -> tuple:
+    sig: list = [_WRITE_VERSION.get(target, 0)]
+    for candidate in (target, Path(f"{target}-wal")):
+        try:
+            st = os.stat(candidate)
+            sig.extend((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.extend((0, 0))
+    return tuple(sig)
 
 
-def save_tracker(data: Dict[str, Dict[str, Dict[str, object]]], path: Path = TRACKER_PATH) -> None:
-    target = _ensure_file(path)
-    try:
-        target.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    except OSError:
+def _invalidate(target: Path) -> None:
+    with _CACHE_LOCK:
+        _WRITE_VERSION[target] = _WRITE_VERSION.get(target, 0) + 1
+        for key in [key for key in _CACHE if key[0] == target]:
+            del _CACHE[key]
+
+
+def rollup_buckets(day: date_cls) -> List[Tuple[str, str, str, str]]:
+    """(granularity, bucket, first day, last day) of the ISO week and month holding `day`."""
+    iso_year, iso_week, iso_weekday = day.isocalendar()
+    monday = day - timedelta(days=iso_weekday - 1)
+    first = day.replace(day=1)
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return [
+        ("week", f"{iso_year}-W{iso_week:02d}", monday.isoformat(), (monday + timedelta(days=6)).isoformat()),
+        ("month", f"{day.year}-{day.month:02d}", first.isoformat(), last.isoformat()),
+    ]
+
+
+def _apply_rollups(conn: sqlite3.Connection, rows: Iterable[Tuple[str, str, str, int]], sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) dated ledger rows from the week/month rollups.
+
+    Undated rows (legacy totals, manual adjustments) only count in the year totals.
+    """
+    deltas: Dict[Tuple[str, str, str, str], list] = {}
+    for agent_id, day, shift, minutes in rows:
+        if not day:
+            continue
+        try:
+            parsed = date_cls.fromisoformat(day)
+        except ValueError:
+            continue
+        weekend = 1 if parsed.weekday() >= 5 else 0
+        for granularity, bucket, start, end in rollup_buckets(parsed):
+            entry = deltas.setdefault((granularity, bucket, agent_id, shift), [start, end, 0, 0, 0])
+            entry[2] += sign * int(minutes)
+            entry[3] += sign
+            entry[4] += sign * weekend
+    if not deltas:
         return
+    conn.executemany(_ROLLUP_SQL, [(*key, *values) for key, values in deltas.items()])
+    if sign < 0:
+        conn.executemany(
+            "DELETE FROM tracker_rollup WHERE granularity = ? AND bucket = ? AND agent_id = ? AND shift = ? AND shifts <= 0",
+            list(deltas),
+        )
+
+
+def _replace_plan(conn: sqlite3.Connection, plan_id: str, year: int, rows: Iterable[LedgerRow]) -> None:
+    """Swap a plan's ledger rows and move the year aggregates by the difference.
+
+    Must run inside a transaction.
+    """
+    _apply_rollups(
+        conn,
+        conn.execute("SELECT agent_id, date, shift, minutes FROM tracker_ledger WHERE plan_id = ?", (plan_id,)).fetchall(),
+        -1,
+    )
+    for old_year, agent_id, minutes in conn.execute(
+        "SELECT year, agent_id, SUM(minutes) FROM tracker_ledger WHERE plan_id = ? GROUP BY year, agent_id",
+        (plan_id,),
+    ).fetchall():
+        conn.execute(
+            "UPDATE tracker_minutes SET minutes = minutes - ? WHERE year = ? AND agent_id = ?",
+            (int(minutes), old_year, agent_id),
+        )
+    conn.execute("DELETE FROM tracker_ledger WHERE plan_id = ?", (plan_id,))
+
+    ledger: Dict[Tuple[str, str], Tuple[str, int]] = {}
+    names: Dict[str, Optional[str]] = {}
+    for agent_id, date, shift, minutes, name in rows:
+        ledger[(agent_id, date)] = (shift, int(minutes))
+        if name or agent_id not in names:
+            names[agent_id] = name
+    conn.executemany(
+        "INSERT INTO tracker_ledger (plan_id, agent_id, date, year, shift, minutes) VALUES (?, ?, ?, ?, ?, ?)",
+        [(plan_id, agent_id, date, int(year), shift, minutes) for (agent_id, date), (shift, minutes) in ledger.items()],
+    )
+    _apply_rollups(conn, [(agent_id, date, shift, minutes) for (agent_id, date), (shift, minutes) in ledger.items()], 1)
+    totals: Dict[str, int] = {}
+    for (agent_id, _), (_, minutes) in ledger.items():
+        totals[agent_id] = totals.get(agent_id, 0) + minutes
+    conn.executemany(
+        _ADD_SQL,
+        [
+            (int(year), agent_id, minutes, names.get(agent_id) or agent_id, 1 if names.get(agent_id) else 0)
+            for agent_id, minutes in totals.items()
+        ],
+    )
+
+
+def _migrate(conn: sqlite3.Connection, json_path: Path) -> None:
+    """One-time imports, each guarded by a tracker_meta flag."""
+    done = {key for (key,) in conn.execute("SELECT key FROM tracker_meta").fetchall()}
+    if "ledger_backfilled" not in done:
+        # Totals written before the ledger existed become one opaque row each,
+        # so recomputing from the ledger keeps them.
+        conn.execute(
+            "INSERT INTO tracker_ledger (plan_id, agent_id, date, year, shift, minutes) "
+            "SELECT 'legacy-totals:' || year, agent_id, '', year, '', minutes FROM tracker_minutes"
+        )
+        conn.execute("INSERT INTO tracker_meta (key, value) VALUES ('ledger_backfilled', '1')")
+    if "rollups_backfilled" not in done:
+        _apply_rollups(conn, conn.execute("SELECT agent_id, date, shift, minutes FROM tracker_ledger").fetchall(), 1)
+        conn.execute("INSERT INTO tracker_meta (key, value) VALUES ('rollups_backfilled', '1')")
+    if "json_migrated" not in done:
+        try:
+            data = json.loads(json_path.read_text(encoding="utf-8")) if json_path.exists() else {}
+        except (json.JSONDecodeError, OSError):
+            data = {}
+        if isinstance(data, dict):
+            for year_key, agents in data.items():
+                if not isinstance(agents, dict):
+                    continue
+                rows = []
+                for agent_id, entry in agents.items():
+                    try:
+                        rows.append((agent_id, "", "", int(entry.get("minutes", 0)), str(entry.get("name", agent_id))))
+                    except (TypeError, ValueError, AttributeError):
+                        continue
+                try:
+                    _replace_plan(conn, f"legacy-json:{int(year_key)}", int(year_key), rows)
+                except ValueError:
+                    continue
+        conn.execute("INSERT INTO tracker_meta (key, value) VALUES ('json_migrated', ?)", (str(json_path),))
 
 
-def get_year(data: Dict[str, Dict[str, Dict[str, object]]], year: int) -> Dict[str, Dict[str, object]]:
-    return data.get(str(year), {})
+def _connect(path: Path) -> sqlite3.Connection:
+    target = _target(path)
+    conn = sqlite3.connect(str(target), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 10000")
+    if target not in _INITIALISED:
+        with _INIT_LOCK:
+            if target not in _INITIALISED:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                with _transaction(conn):
+                    _migrate(conn, path.with_suffix(".json"))
+                _INITIALISED.add(target)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+class _transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def record_plan(plan_id: str, year: int, rows: Iterable[LedgerRow], path: Path = TRACKER_DB_PATH) -> None:
+    """Record a planning's assignments; recording the same plan_id again replaces it."""
+    try:
+        with closing(_connect(path)) as conn, _transaction(conn):
+            _replace_plan(conn, plan_id, year, rows)
+    finally:
+        _invalidate(_target(path))
+
+
+def add_minutes_bulk(
+    year: int,
+    rows: Iterable[Tuple[str, int, Optional[str]]],
+    path: Path = TRACKER_DB_PATH,
+) -> None:
+    """Manual adjustment outside any planning, kept as its own ledger entry.
+
+    Unlike record_plan, calling this twice adds twice.
+    """
+    totals: Dict[str, int] = {}
+    names: Dict[str, Optional[str]] = {}
+    for agent_id, minutes, name in rows:
+        totals[agent_id] = totals.get(agent_id, 0) + int(minutes)
+        if name or agent_id not in names:
+            names[agent_id] = name
+    ledger = [(agent_id, "", "", minutes, names[agent_id]) for agent_id, minutes in totals.items()]
+    record_plan(f"adjustment:{uuid4()}", year, ledger, path)
 
 
 def add_minutes(
-    data: Dict[str, Dict[str, Dict[str, object]]],
     year: int,
     agent_id: str,
     minutes: int,
     name: str | None = None,
+    path: Path = TRACKER_DB_PATH,
+) -> None:
+    add_minutes_bulk(year, [(agent_id, minutes, name)], path)
+
+
+def recompute_totals(year: int, path: Path = TRACKER_DB_PATH) -> Dict[str, int]:
+    """Rebuild one year's aggregates from the ledger (indexed on year, agent_id)."""
+    with closing(_connect(path)) as conn, _transaction(conn):
+        totals = {
+            agent_id: int(minutes)
+            for agent_id, minutes in conn.execute(
+                "SELECT agent_id, SUM(minutes) FROM tracker_ledger WHERE year = ? GROUP BY agent_id",
+                (int(year),),
+            ).fetchall()
+        }
+        conn.execute("UPDATE tracker_minutes SET minutes = 0 WHERE year = ?", (int(year),))
+        conn.executemany(
+            "UPDATE tracker_minutes SET minutes = ? WHERE year = ? AND agent_id = ?",
+            [(minutes, int(year), agent_id) for agent_id, minutes in totals.items()],
+        )
+    _invalidate(_target(path))
+    return totals
+
+
+def save_boundary_states(
+    service_unit: str,
+    end_date: str,
+    states: Dict[str, Dict[str, object]],
+    path: Path = TRACKER_DB_PATH,
 ) -> None:
-    year_key = str(year)
-    if year_key not in data:
-        data[year_key] = {}
-    entry = data[year_key].get(agent_id, {"minutes": 0, "name": name or agent_id})
-    entry["minutes"] = int(entry.get("minutes", 0)) + int(minutes)
-    if name:
-        entry["name"] = name
-    data[year_key][agent_id] = entry
+    """Replace the boundary states saved for a unit's period ending at end_date."""
+    with closing(_connect(path)) as conn, _transaction(conn):
+        conn.execute(
+            "DELETE FROM boundary_state WHERE service_unit = ? AND end_date = ?",
+            (service_unit, end_date),
+        )
+        conn.executemany(
+            "INSERT INTO boundary_state (service_unit, end_date, agent_id, state) VALUES (?, ?, ?, ?)",
+            [(service_unit, end_date, agent_id, json.dumps(state)) for agent_id, state in states.items()],
+        )
+
+
+def load_boundary_states(service_unit: str, end_date: str, path: Path = TRACKER_DB_PATH) -> Dict[str, Dict[str, object]]:
+    with closing(_connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT agent_id, state FROM boundary_state WHERE service_unit = ? AND end_date = ?",
+            (service_unit, end_date),
+        ).fetchall()
+    return {agent_id: json.loads(state) for agent_id, state in rows}
+
+
+def query_rollups(
+    granularity: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    agent_id: str | None = None,
+    shift: str | None = None,
+    path: Path = TRACKER_DB_PATH,
+) -> List[Dict[str, object]]:
+    """Week or month buckets overlapping [start_date, end_date], oldest first.
+
+    Buckets are returned whole: a month partly inside the range counts fully.
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"Granularite inconnue: {granularity}")
+    sql = (
+        "SELECT bucket, start_date, end_date, agent_id, shift, minutes, shifts, weekend_shifts "
+        "FROM tracker_rollup WHERE granularity = ?"
+    )
+    params: list = [granularity]
+    if start_date:
+        sql += " AND end_date >= ?"
+        params.append(start_date)
+    if end_date:
+        sql += " AND start_date <= ?"
+        params.append(end_date)
+    if agent_id:
+        sql += " AND agent_id = ?"
+        params.append(agent_id)
+    if shift:
+        sql += " AND shift = ?"
+        params.append(shift)
+    sql += " ORDER BY start_date, agent_id, shift"
+    with closing(_connect(path)) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    keys = ("bucket", "start_date", "end_date", "agent_id", "shift", "minutes", "shifts", "weekend_shifts")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def recent_shift_counts(
+    end_date: str,
+    weeks: int = 12,
+    shift: str = "SOIR",
+    path: Path = TRACKER_DB_PATH,
+) -> Dict[str, int]:
+    """Shifts of one kind per agent over the `weeks` ISO weeks ending with end_date's week."""
+    last = date_cls.fromisoformat(end_date)
+    first = last - timedelta(days=7 * (max(1, weeks) - 1))
+    counts: Dict[str, int] = {}
+    for row in query_rollups("week", first.isoformat(), last.isoformat(), shift=shift, path=path):
+        counts[row["agent_id"]] = counts.get(row["agent_id"], 0) + int(row["shifts"])
+    return counts
+
+
+def tracker_snapshot(year: int, path: Path = TRACKER_DB_PATH) -> TrackerSnapshot:
+    """Cached minutes and names for one year; the snapshot must not be mutated."""
+    target = _target(path)
+    key = (target, int(year))
+    signature = _file_signature(target)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with closing(_connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT agent_id, minutes, name FROM tracker_minutes WHERE year = ? ORDER BY agent_id",
+            (int(year),),
+        ).fetchall()
+    minutes = {agent_id: int(m) for agent_id, m, _ in rows}
+    names = {agent_id: str(name) for agent_id, _, name in rows}
+    digest = hashlib.sha1(json.dumps([int(year), rows], ensure_ascii=False).encode("utf-8")).hexdigest()
+    snapshot = TrackerSnapshot(year=int(year), minutes=minutes, names=names, etag=f'"{digest[:20]}"')
+    with _CACHE_LOCK:
+        # Keyed on the signature taken before the read: a concurrent write
+        # leaves a stale signature behind and the next call reloads.
+        _CACHE[key] = (signature, snapshot)
+    return snapshot
 
 
-def snapshot_minutes(data: Dict[str, Dict[str, Dict[str, object]]], year: int) -> Dict[str, int]:
-    year_data = get_year(data, year)
-    return {agent_id: int(entry.get("minutes", 0)) for agent_id, entry in year_data.items()}
+def snapshot_minutes(year: int, path: Path = TRACKER_DB_PATH) -> Dict[str, int]:
+    return dict(tracker_snapshot(year, path).minutes)
 
 
-def snapshot_names(data: Dict[str, Dict[str, Dict[str, object]]], year: int) -> Dict[str, str]:
-    year_data = get_year(data, year)
-    return {agent_id: str(entry.get("name", agent_id)) for agent_id, entry in year_data.items()}
+def snapshot_names(year: int, path: Path = TRACKER_DB_PATH) -> Dict[str, str]:
+    return dict(tracker_snapshot(year, path).names)
@@ -13,16 +13,29 @@ export async function apiGenerate(requestBody) {
   return res.json();
 }
 
-export async function apiGetLiveEntries(startDate, endDate) {
+function liveQueryParams(startDate, endDate, sinceRev) {
   const params = new URLSearchParams();
   if (startDate) params.set("start_date", startDate);
   if (endDate) params.set("end_date", endDate);
   params.set("include_done", "true");
+  if (sinceRev !== null && sinceRev !== undefined) params.set("since_rev", String(sinceRev));
+  return params;
+}
+
+// With sinceRev, the response only holds what changed since that revision
+// (entries + deleted_ids, reset=false). Unchanged polls are answered 304 and
+// served from the browser cache.
+export async function apiGetLiveEntries(startDate, endDate, sinceRev = null) {
+  const params = liveQueryParams(startDate, endDate, sinceRev);
   const res = await fetch(`${API_BASE}/live/entries?${params.toString()}`);
   if (!res.ok) return null;
   return res.json();
 }
 
+export function apiLiveStreamUrl(startDate, endDate, sinceRev = null) {
+  return `${API_BASE}/live/stream?${liveQueryParams(startDate, endDate, sinceRev).toString()}`;
+}
+
 export async function apiCreateLiveEntry(payload) {
   const res = await fetch(`${API_BASE}/live/entries`, {
     method: "POST",
@@ -305,7 +305,11 @@ async function handleGenerate() {
       await apiRecordTracker({
         year: req.params.tracker_year,
         assignments: data.assignments,
-        agents: getEffectiveAgents(getAgents())
+        agents: getEffectiveAgents(getAgents()),
+        service_unit: req.params.service_unit,
+        start_date: req.params.start_date,
+        end_date: req.params.end_date,
+        shifts: req.params.shifts
       });
     }
     if (req.params.use_tracker) {
@@ -3,8 +3,11 @@
 // ==========================================================================
 
 import { SHIFT_DEFS, SHIFT_ORDER } from './config.js';
-import { lastAssignments, liveEntries, setLiveEntries, setLiveRefreshTimer, liveRefreshTimer, getEffectiveAgents, getAgentNameMap } from './state.js';
-import { apiGetLiveEntries, apiCreateLiveEntry, apiUpdateLiveEntry, apiDeleteLiveEntry, apiGetComplianceFrench } from './api.js';
+import {
+  lastAssignments, liveEntries, setLiveEntries, setLiveRefreshTimer, liveRefreshTimer,
+  liveStream, setLiveStream, liveRev, setLiveRev, getEffectiveAgents, getAgentNameMap
+} from './state.js';
+import { apiGetLiveEntries, apiLiveStreamUrl, apiCreateLiveEntry, apiUpdateLiveEntry, apiDeleteLiveEntry, apiGetComplianceFrench } from './api.js';
 import { statusLabel, timeAgo, escapeHtml } from './utils.js';
 import { getAgents } from './request-builder.js';
 
@@ -14,24 +17,81 @@ export function initLiveTasks() {
   loadFrenchComplianceNotice();
 }
 
-export async function refreshLiveEntries() {
-  const startDate = document.getElementById("start_date")?.value;
-  const endDate = document.getElementById("end_date")?.value;
+// Filters the current liveEntries/liveRev were fetched with.
+let liveQueryKey = null;
 
-  try {
-    const data = await apiGetLiveEntries(startDate, endDate);
-    if (!data) return;
+function liveQuery() {
+  const startDate = document.getElementById("start_date")?.value || "";
+  const endDate = document.getElementById("end_date")?.value || "";
+  return { startDate, endDate, key: `${startDate}|${endDate}` };
+}
+
+function compareLiveEntries(a, b) {
+  const ka = [a.date, a.shift, a.agent_name, a.updated_at];
+  const kb = [b.date, b.shift, b.agent_name, b.updated_at];
+  for (let i = 0; i < ka.length; i++) {
+    if (ka[i] !== kb[i]) return ka[i] < kb[i] ? -1 : 1;
+  }
+  return 0;
+}
+
+function applyLiveChanges(data) {
+  if (data.reset) {
     setLiveEntries(data.entries || []);
-    const serverTimeEl = document.getElementById("live_server_time");
-    if (serverTimeEl) serverTimeEl.textContent = data.server_time ? `Synchro: ${data.server_time}` : "";
+  } else {
+    const byId = new Map(liveEntries.map(e => [e.id, e]));
+    (data.deleted_ids || []).forEach(id => byId.delete(id));
+    (data.entries || []).forEach(e => byId.set(e.id, e));
+    setLiveEntries([...byId.values()].sort(compareLiveEntries));
+  }
+  setLiveRev(data.rev ?? null);
+  const serverTimeEl = document.getElementById("live_server_time");
+  if (serverTimeEl) serverTimeEl.textContent = data.server_time ? `Synchro: ${data.server_time}` : "";
+  if (data.reset || (data.entries || []).length || (data.deleted_ids || []).length) {
     renderLiveEntriesFull();
     renderSidebarTasks();
     renderRightTasks();
+  }
+}
+
+export async function refreshLiveEntries() {
+  const { startDate, endDate, key } = liveQuery();
+  const filtersChanged = key !== liveQueryKey;
+
+  try {
+    const data = await apiGetLiveEntries(startDate, endDate, filtersChanged ? null : liveRev);
+    if (!data) return;
+    liveQueryKey = key;
+    applyLiveChanges(data);
+    if (filtersChanged && liveStream) openLiveStream();
   } catch (_err) {
     // silent
   }
 }
 
+function closeLiveStream() {
+  if (liveStream) {
+    liveStream.close();
+    setLiveStream(null);
+  }
+}
+
+function openLiveStream() {
+  closeLiveStream();
+  const { startDate, endDate, key } = liveQuery();
+  const stream = new EventSource(apiLiveStreamUrl(startDate, endDate, key === liveQueryKey ? liveRev : null));
+  stream.addEventListener("changes", (event) => {
+    try {
+      liveQueryKey = key;
+      applyLiveChanges(JSON.parse(event.data));
+    } catch (_err) {
+      // silent
+    }
+  });
+  // On errors the browser reconnects by itself, resuming from the last event id.
+  setLiveStream(stream);
+}
+
 export function renderLiveAssignmentOptions() {
   const select = document.getElementById("live_assignment_select");
   if (!select) return;
@@ -231,8 +291,12 @@ export function setLiveAutoRefresh() {
     clearInterval(liveRefreshTimer);
     setLiveRefreshTimer(null);
   }
+  closeLiveStream();
   const checkbox = document.getElementById("live_auto_refresh");
-  if (checkbox?.checked) {
+  if (!checkbox?.checked) return;
+  if (typeof EventSource !== "undefined") {
+    openLiveStream();
+  } else {
     setLiveRefreshTimer(setInterval(() => { refreshLiveEntries(); }, 10000));
   }
 }
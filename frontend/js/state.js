@@ -10,12 +10,16 @@ export let lastAgents = [];
 export let lockedAssignments = [];
 export let liveEntries = [];
 export let liveRefreshTimer = null;
+export let liveStream = null;
+export let liveRev = null;
 
 export function setLastAssignments(val) { lastAssignments = val; }
 export function setLastAgents(val) { lastAgents = val; }
 export function setLockedAssignments(val) { lockedAssignments = val; }
 export function setLiveEntries(val) { liveEntries = val; }
 export function setLiveRefreshTimer(val) { liveRefreshTimer = val; }
+export function setLiveStream(val) { liveStream = val; }
+export function setLiveRev(val) { liveRev = val; }
 
 // ── UI state ──
 export const uiState = {
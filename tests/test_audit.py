@@ -1,4 +1,22 @@
-from app.audit import read_recent_audit_events, write_audit_event
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from app import audit
+from app.audit import (
+    AuditSettings,
+    flush_audit,
+    iter_audit_events,
+    read_recent_audit_events,
+    shutdown_audit,
+    verify_audit_chain,
+    write_audit_event,
+    write_audit_events,
+)
 
 
 def test_audit_write_and_read(tmp_path):
@@ -10,3 +28,199 @@ def test_audit_write_and_read(tmp_path):
     assert events[0]["action"] == "test_action"
     assert events[1]["action"] == "test_action_2"
 
+
+
+def test_audit_writer_batches_and_fsyncs_on_flush(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    synced = []
+    real_fsync = audit.os.fsync
+    monkeypatch.setattr(audit.os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="shutdown", fsync_interval_ms=200, queue_size=4))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda i: write_audit_event("burst", {"i": i}, path=path), range(50)))
+    flush_audit(path)
+    assert len(synced) == 1
+    events = read_recent_audit_events(limit=100, path=path)
+    assert sorted(e["payload"]["i"] for e in events) == list(range(50))
+    shutdown_audit()
+
+
+def test_audit_always_policy_is_durable_on_return(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="always", fsync_interval_ms=200, queue_size=10))
+    write_audit_event("durable", {}, path=path)
+    (segment,) = (tmp_path / "audit_segments").glob("[0-9]*.jsonl")
+    assert json.loads(segment.read_text(encoding="utf-8"))["action"] == "durable"
+    shutdown_audit()
+
+
+def test_segments_rotate_compress_and_use_index(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    legacy = [{"ts": "2026-01-0%dT08:00:00Z" % d, "action": "legacy", "payload": {}} for d in (1, 2, 3)]
+    path.write_text("".join(json.dumps(e) + "\n" for e in legacy), encoding="utf-8")
+    monkeypatch.setattr(audit, "INDEX_BLOCK_EVENTS", 8)
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="shutdown", fsync_interval_ms=200, queue_size=100, segment_max_bytes=4096))
+    for i in range(300):
+        write_audit_event("odd" if i % 2 else "even", {"entry_id": f"e{i}", "i": i}, path=path)
+    flush_audit(path)
+
+    seg_dir = tmp_path / "audit_segments"
+    assert len(list(seg_dir.glob("*.jsonl.gz"))) >= 2
+    assert len(list(seg_dir.glob("[0-9]*.jsonl"))) == 1
+
+    assert [e["payload"]["i"] for e in read_recent_audit_events(limit=5, path=path)] == list(range(295, 300))
+    assert len(read_recent_audit_events(limit=1000, path=path)) == 303
+    assert [e["action"] for e in iter_audit_events(end="2026-01-02", path=path)] == ["legacy", "legacy"]
+
+    reads = []
+    real_read_block = audit._read_block
+    monkeypatch.setattr(audit, "_read_block", lambda seg, block: (reads.append(seg), real_read_block(seg, block))[1])
+    hits = list(iter_audit_events(action="odd", entry_id="e7", path=path))
+    assert [e["payload"]["i"] for e in hits] == [7]
+    assert len(reads) == 1
+    monkeypatch.setattr(audit, "_read_block", real_read_block)
+
+    # A new writer picks up the open segment where the previous one stopped.
+    shutdown_audit()
+    write_audit_event("after_restart", {}, path=path)
+    assert [e["action"] for e in read_recent_audit_events(limit=2, path=path)] == ["odd", "after_restart"]
+    assert len(list(iter_audit_events(path=path))) == 304
+    shutdown_audit()
+
+
+def test_reading_the_open_segment_leaves_its_index_to_the_writer(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    monkeypatch.setattr(audit, "INDEX_BLOCK_EVENTS", 8)
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="always", fsync_interval_ms=200, queue_size=10))
+    for i in range(3):
+        write_audit_event("open", {"i": i}, path=path)
+    # A reader scans the partial block the writer is still filling.
+    assert len(list(iter_audit_events(path=path))) == 3
+    for i in range(3, 11):
+        write_audit_event("open", {"i": i}, path=path)
+    assert [e["seq"] for e in iter_audit_events(path=path)] == list(range(1, 12))
+    shutdown_audit()
+
+
+def test_hash_chain_checkpoints_and_incremental_verify(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUDIT_CHECKPOINT_KEY", "test-key")
+    monkeypatch.setattr(audit, "INDEX_BLOCK_EVENTS", 8)
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="shutdown", fsync_interval_ms=200, queue_size=100, checkpoint_every=10))
+    for i in range(40):
+        write_audit_event("chained", {"i": i}, path=path)
+    flush_audit(path)
+
+    first = verify_audit_chain(path=path)
+    assert first["ok"] and first["events_checked"] == 40 and first["checkpoints_checked"] >= 1
+
+    for i in range(40, 45):
+        write_audit_event("chained", {"i": i}, path=path)
+    second = verify_audit_chain(path=path)
+    assert second["ok"] and second["resumed_from_seq"] == 40 and second["events_checked"] == 5
+    shutdown_audit()
+
+    (segment,) = (tmp_path / "audit_segments").glob("[0-9]*.jsonl")
+    raw = segment.read_text(encoding="utf-8")
+    # Same length, so the offsets the incremental state kept still line up.
+    segment.write_text(raw.replace('"i": 3}', '"i": 9}', 1), encoding="utf-8")
+    assert verify_audit_chain(path=path)["ok"]
+    tampered = verify_audit_chain(full=True, path=path)
+    assert not tampered["ok"] and "seq 4" in tampered["errors"][0]
+
+
+def test_audit_batch_is_written_in_order(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    write_audit_events([("bulk_a", {"i": 0}), ("bulk_b", {"i": 1})], path=path)
+    write_audit_events([], path=path)
+    events = read_recent_audit_events(limit=10, path=path)
+    assert [(e["action"], e["seq"]) for e in events] == [("bulk_a", 1), ("bulk_b", 2)]
+    assert verify_audit_chain(path=path)["ok"]
+    shutdown_audit()
+
+
+def test_bad_payload_fails_in_caller_and_writer_survives(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    with pytest.raises(TypeError):
+        write_audit_event("bad", {"d": date.today()}, path=path)
+    # A failure inside the writer loses its batch but releases every waiter.
+    real_chain_hash = audit._chain_hash
+    calls = []
+
+    def _failing_once(prev, event):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return real_chain_hash(prev, event)
+
+    monkeypatch.setattr(audit, "_chain_hash", _failing_once)
+    write_audit_event("lost", {}, path=path)
+    flush_audit(path)
+    write_audit_event("kept", {}, path=path)
+    assert [(e["action"], e["seq"]) for e in read_recent_audit_events(limit=10, path=path)] == [("kept", 1)]
+    assert verify_audit_chain(full=True, path=path)["ok"]
+    shutdown_audit()
+
+
+def _audit_worker(path, worker: int, count: int) -> int:
+    for i in range(count):
+        write_audit_event("multi", {"worker": worker, "i": i}, path=path)
+    shutdown_audit()
+    return count
+
+
+def test_processes_share_one_chain(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUDIT_CHECKPOINT_KEY", "test-key")
+    monkeypatch.setattr(audit, "INDEX_BLOCK_EVENTS", 8)
+    monkeypatch.setattr(
+        audit,
+        "_SETTINGS",
+        AuditSettings(fsync_policy="always", fsync_interval_ms=200, queue_size=10, segment_max_bytes=4096, checkpoint_every=25),
+    )
+    workers, count = 4, 80
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert list(pool.map(_audit_worker, [path] * workers, range(workers), [count] * workers)) == [count] * workers
+
+    events = list(iter_audit_events(path=path))
+    assert [e["seq"] for e in events] == list(range(1, workers * count + 1))
+    assert sorted((e["payload"]["worker"], e["payload"]["i"]) for e in events) == [
+        (w, i) for w in range(workers) for i in range(count)
+    ]
+    report = verify_audit_chain(full=True, path=path)
+    assert report["ok"], report["errors"]
+    assert report["checkpoints_checked"] >= 1
+    shutdown_audit()
+
+
+def test_without_key_checkpoints_are_unsigned_and_verify_is_full(tmp_path, monkeypatch):
+    path = tmp_path / "audit.jsonl"
+    monkeypatch.delenv("AUDIT_CHECKPOINT_KEY", raising=False)
+    monkeypatch.setattr(audit, "_SETTINGS", AuditSettings(fsync_policy="always", fsync_interval_ms=200, queue_size=10, checkpoint_every=2))
+    for i in range(5):
+        write_audit_event("unsigned", {"i": i}, path=path)
+    seg_dir = tmp_path / "audit_segments"
+    # No key file next to the log, and nothing signed with one.
+    assert not (seg_dir / ".checkpoint_key").exists()
+    assert not (seg_dir / "checkpoints.jsonl").exists()
+    for _ in range(2):
+        report = verify_audit_chain(path=path)
+        assert report["ok"] and not report["checkpoints_signed"]
+        assert report["resumed_from_seq"] is None and report["events_checked"] == 5
+    assert not (seg_dir / "verified.json").exists()
+    shutdown_audit()
+
+
+def test_verify_waits_for_the_writer_lock(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    write_audit_event("locked", {}, path=path)
+    flush_audit(path)
+    reports = []
+    with audit._writer_lock(tmp_path / "audit_segments"):
+        thread = threading.Thread(target=lambda: reports.append(verify_audit_chain(path=path)))
+        thread.start()
+        thread.join(0.3)
+        assert thread.is_alive() and reports == []
+    thread.join(5)
+    assert reports[0]["ok"]
+    shutdown_audit()
@@ -0,0 +1,96 @@
+from app.boundary import compute_boundary_states, load_states_before, save_states
+from app.models import AgentBoundaryState, GenerateRequest, ShiftAssignment
+from app.scheduler import solve_planning
+from tests.test_scheduler import base_request
+
+
+def _twelve_hour_request():
+    data = base_request()
+    data["params"]["mode"] = "12h_jour"
+    data["params"]["coverage_requirements"] = {"MATIN": 0, "SOIR": 0, "JOUR_12H": 1}
+    data["agents"] = [
+        {"id": "A1", "first_name": "Anna", "last_name": "Dupont", "regime": "REGIME_12H_JOUR"},
+        {"id": "A2", "first_name": "Samir", "last_name": "Khelifi", "regime": "REGIME_12H_JOUR"},
+    ]
+    return data
+
+
+def test_compute_boundary_states():
+    assignments = [
+        ShiftAssignment(agent_id="A1", date="2026-02-05", shift="MATIN"),
+        ShiftAssignment(agent_id="A1", date="2026-02-07", shift="JOUR_12H"),
+        ShiftAssignment(agent_id="A1", date="2026-02-08", shift="JOUR_12H"),
+    ]
+    states = compute_boundary_states(assignments, ["A1", "A2"], "2026-02-02", "2026-02-08")
+    a1 = states["A1"]
+    assert a1.last_shifts == [None, None, "MATIN", None, "JOUR_12H", "JOUR_12H"]
+    assert a1.streak_12h == 2
+    assert states["A2"].last_shifts == [None] * 6
+
+
+def test_days_before_a_short_plan_are_unknown_unless_carried_over():
+    assignments = [
+        ShiftAssignment(agent_id="A1", date="2026-02-07", shift="JOUR_12H"),
+        ShiftAssignment(agent_id="A1", date="2026-02-08", shift="JOUR_12H"),
+    ]
+    alone = compute_boundary_states(assignments, ["A1"], "2026-02-07", "2026-02-08")
+    assert alone["A1"].last_shifts == ["JOUR_12H", "JOUR_12H"]
+    assert alone["A1"].streak_12h == 2
+
+    previous = {"A1": AgentBoundaryState(end_date="2026-02-06", last_shifts=["SOIR", None, "JOUR_12H"], streak_12h=1)}
+    carried = compute_boundary_states(assignments, ["A1"], "2026-02-07", "2026-02-08", previous)
+    assert carried["A1"].last_shifts == ["SOIR", None, "JOUR_12H", "JOUR_12H", "JOUR_12H"]
+    assert carried["A1"].streak_12h == 3
+
+    # A state that does not end the day before the plan says nothing about it.
+    stale = {"A1": previous["A1"].model_copy(update={"end_date": "2026-02-05"})}
+    assert compute_boundary_states(assignments, ["A1"], "2026-02-07", "2026-02-08", stale) == alone
+
+
+def test_states_round_trip(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    state = AgentBoundaryState(end_date="2026-02-08", last_shifts=["SOIR"], streak_12h=0)
+    save_states("USLD", "2026-02-08", {"A1": state}, path=path)
+    assert load_states_before("USLD", "2026-02-09", path=path) == {"A1": state}
+    assert load_states_before("USLD", "2026-02-10", path=path) == {}
+
+
+def test_12h_streak_carries_over():
+    for draft_only in (True, False):
+        data = _twelve_hour_request()
+        data["params"]["draft_only"] = draft_only
+        data["boundary_states"] = {
+            "A1": {"end_date": "2026-02-08", "last_shifts": [None, None, None, "JOUR_12H", "JOUR_12H", "JOUR_12H"], "streak_12h": 3},
+            "A2": {"end_date": "2026-02-08", "last_shifts": [None] * 6},
+        }
+        result = solve_planning(GenerateRequest(**data))
+        assert result.status == "ok"
+        first_day = {a.agent_id for a in result.assignments if a.date == "2026-02-09"}
+        assert first_day == {"A2"}
+
+
+def test_rolling_7d_minutes_carry_over():
+    data = _twelve_hour_request()
+    # 4 x 12h in the last 6 days: the 48h of the window starting on day -6 are used up.
+    data["boundary_states"] = {
+        "A1": {"end_date": "2026-02-08", "last_shifts": ["JOUR_12H", None, None, "JOUR_12H", "JOUR_12H", "JOUR_12H"], "streak_12h": 3},
+    }
+    data["params"]["agent_regimes"]["REGIME_12H_JOUR"]["max_consecutive_12h_days"] = 4
+    data["locked_assignments"] = [{"agent_id": "A1", "date": "2026-02-09", "shift": "JOUR_12H"}]
+    assert solve_planning(GenerateRequest(**data)).status != "ok"
+    data["boundary_states"]["A1"]["last_shifts"][0] = None
+    assert solve_planning(GenerateRequest(**data)).status == "ok"
+
+
+def test_daily_rest_across_boundary_and_stale_state_ignored():
+    data = base_request()
+    data["agents"][0]["regime"] = "REGIME_MIXTE"
+    data["boundary_states"] = {"A1": {"end_date": "2026-02-08", "last_shifts": ["SOIR"]}}
+    result = solve_planning(GenerateRequest(**data))
+    assert result.status == "ok"
+    assert not any(a.agent_id == "A1" and a.date == "2026-02-09" and a.shift == "MATIN" for a in result.assignments)
+
+    data["locked_assignments"] = [{"agent_id": "A1", "date": "2026-02-09", "shift": "MATIN"}]
+    assert solve_planning(GenerateRequest(**data)).status != "ok"
+    data["boundary_states"]["A1"]["end_date"] = "2026-02-01"
+    assert solve_planning(GenerateRequest(**data)).status == "ok"
@@ -0,0 +1,37 @@
+from app.capacity import plan_capacity
+from app.models import CapacityRequest
+
+from tests.test_scheduler import base_request
+
+
+def _request(mixes, **kwargs):
+    params = base_request()["params"]
+    params["end_date"] = "2026-03-08"
+    return CapacityRequest(params=params, regime_mixes=mixes, **kwargs)
+
+
+def test_capacity_single_shift_regimes_confirmed():
+    req = _request([{"name": "split", "regimes": ["REGIME_MATIN_ONLY", "REGIME_SOIR_ONLY"]}])
+    (result,) = plan_capacity(req)
+    assert result.status == "confirmed"
+    # 7 shifts of 7h per week exceed one agent's 48h over 7 rolling days.
+    assert result.headcount_by_regime == {"REGIME_MATIN_ONLY": 2, "REGIME_SOIR_ONLY": 2}
+    assert result.total_headcount == 4
+    assert result.lower_bound_total == 4
+    assert result.bounds["coverage"] == 2
+
+
+def test_capacity_lower_bound_only():
+    req = _request([{"regimes": ["REGIME_MIXTE"]}], confirm=False)
+    (result,) = plan_capacity(req)
+    assert result.status == "lower_bound"
+    assert result.solves == 0
+    assert result.headcount_by_regime["REGIME_MIXTE"] >= result.bounds["rolling_7d_minutes"]
+
+
+def test_capacity_reports_impossible_mixes():
+    req = _request([{"regimes": ["REGIME_12H_JOUR"]}, {"regimes": ["REGIME_POLYVALENT"]}])
+    impossible, unknown = plan_capacity(req)
+    assert impossible.status == "infeasible"
+    assert unknown.status == "infeasible"
+    assert "REGIME_POLYVALENT" in unknown.explanation
@@ -1,8 +1,25 @@
-from app.compliance import ComplianceSettings, detect_sensitive_patterns, french_health_compliance_snapshot, validate_live_text_for_french_health
+import json
+import re
+import time
+from pathlib import Path
+
+from app.compliance import (
+    DEFAULT_PATIENT_ID_PATTERNS,
+    ComplianceSettings,
+    detect_sensitive_patterns,
+    french_health_compliance_snapshot,
+    load_compliance_settings,
+    nir_key_is_valid,
+    scan_chunk,
+    scanner_for,
+    validate_live_text_for_french_health,
+)
+
+CORPUS = json.loads((Path(__file__).parent / "pii_corpus.json").read_text(encoding="utf-8"))
 
 
 def test_detect_sensitive_patterns():
-    text = "patient: jean@example.com tel 06 12 34 56 78 nir 185027512345678"
+    text = "patient: jean@example.com tel 06 12 34 56 78 nir 185027512345625"
     found = detect_sensitive_patterns(text)
     assert "email" in found
     assert "phone" in found
@@ -39,3 +56,71 @@ def test_compliance_snapshot_shape():
     assert snap["french_health_mode"] is True
     assert snap["controls"]["live_task_retention_days"] == 120
 
+
+
+def test_nir_key_is_checked():
+    assert nir_key_is_valid("1 85 02 75 123 456 25")
+    assert nir_key_is_valid("285122A00401235")
+    assert not nir_key_is_valid("185027512345678")
+    assert detect_sensitive_patterns("lot 185027512345678") == []
+    # Without its key a NIR cannot be checked, so it is always reported.
+    assert detect_sensitive_patterns("nir 1850275123456") == ["nir"]
+
+
+def test_corpus_precision_and_recall():
+    missed = [(text, kinds) for text, kinds in CORPUS["sensitive"] if detect_sensitive_patterns(text) != kinds]
+    false_alarms = [text for text in CORPUS["clean"] if detect_sensitive_patterns(text)]
+    assert missed == []
+    assert false_alarms == []
+
+
+def test_match_offsets_and_configured_patient_ids(monkeypatch):
+    text = "IPP 12345678, tel 06 12 34 56 78"
+    found = [(m.kind, text[m.start:m.end]) for m in scanner_for().finditer(text)]
+    assert found == [("ipp", "IPP 12345678"), ("phone", "06 12 34 56 78")]
+
+    monkeypatch.setenv("PATIENT_ID_PATTERNS", json.dumps({"dossier": r"DOS-\d{5}"}))
+    settings = load_compliance_settings()
+    assert settings.patient_id_patterns == (("dossier", r"DOS-\d{5}"),)
+    assert validate_live_text_for_french_health("voir DOS-12345 puis IPP 12345678", settings) == ["dossier"]
+    assert "dossier" in french_health_compliance_snapshot(settings)["controls"]["detected_identifier_kinds"]
+
+    monkeypatch.setenv("PATIENT_ID_PATTERNS", json.dumps({"cassé": "a)|(b"}))
+    # An invalid pattern falls back to the defaults rather than breaking every scan.
+    assert load_compliance_settings().patient_id_patterns == DEFAULT_PATIENT_ID_PATTERNS
+
+
+def test_scan_chunk_reports_offsets_per_text():
+    texts = ["rien", "mail a@b.fr", "tel 06 12 34 56 78 et 07 98 76 54 32"]
+    assert scan_chunk(texts) == [[], [("email", 5, 11)], [("phone", 4, 18), ("phone", 22, 36)]]
+
+
+
+# The three separate searches the single-pass scanner replaced.
+_BASELINE = (
+    ("email", re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.IGNORECASE)),
+    ("phone", re.compile(r"\b(?:\+33|0)[ .-]?[1-9](?:[ .-]?\d{2}){4}\b")),
+    ("nir", re.compile(r"\b[12](?:[ .-]?\d){12,14}\b")),
+)
+
+
+def _baseline_kinds(text):
+    return [kind for kind, regex in _BASELINE if regex.search(text)]
+
+
+def test_scanner_is_no_slower_than_separate_searches():
+    texts = [text for text, _ in CORPUS["sensitive"]] + CORPUS["clean"]
+
+    def timed(detect):
+        started = time.perf_counter()
+        for _ in range(50):
+            for text in texts:
+                detect(text)
+        return time.perf_counter() - started
+
+    # Interleaved runs, best of each: a noisy neighbour slows both sides alike.
+    runs = [(timed(detect_sensitive_patterns), timed(_baseline_kinds)) for _ in range(15)]
+    scanner = min(run[0] for run in runs)
+    baseline = min(run[1] for run in runs)
+    # The scanner also covers IPP/NDA and checks NIR keys; the margin absorbs timer noise.
+    assert scanner < baseline * 1.25
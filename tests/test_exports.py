@@ -0,0 +1,107 @@
+import csv
+import io
+import re
+import time
+import tracemalloc
+import zlib
+from datetime import date, timedelta
+
+from app import exports
+from app.exports import iter_csv_bytes, iter_csv_rows, iter_planning_pdf
+from app.models import Agent, ExportRequest, ShiftAssignment
+from app.tracker import TrackerSnapshot
+
+
+def _request(n_agents: int, n_days: int, **kwargs) -> ExportRequest:
+    agents = [Agent(id=f"A{i}", first_name="Anna", last_name=f"Nom{i}", regime="REGIME_MIXTE") for i in range(n_agents)]
+    start = date(2026, 1, 1)
+    shifts = ["MATIN", "SOIR", "JOUR_12H"]
+    assignments = [
+        ShiftAssignment.model_construct(agent_id=a.id, date=(start + timedelta(days=d)).isoformat(), shift=shifts[(i + d) % 3])
+        for i, a in enumerate(agents)
+        for d in range(n_days)
+    ]
+    return ExportRequest(assignments=assignments, agents=agents, **kwargs)
+
+
+def test_csv_rows_with_extra_columns():
+    req = _request(1, 4, csv_extra_columns=["weekend", "iso_week", "duration_minutes"])
+    req.assignments.append(ShiftAssignment(agent_id="X9", date="2026-01-05", shift="SOIR"))
+    text = b"".join(iter_csv_bytes(iter_csv_rows(req))).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(text)))
+    # Extra columns come in their fixed order, whatever the request order.
+    assert rows[0] == ["agent_id", "agent_name", "date", "shift", "duration_minutes", "iso_week", "weekend"]
+    assert rows[1] == ["A0", "Nom0 Anna", "2026-01-01", "MATIN", "420", "1", "0"]
+    assert rows[3] == ["A0", "Nom0 Anna", "2026-01-03", "JOUR_12H", "720", "1", "1"]
+    assert rows[-1] == ["X9", "X9", "2026-01-05", "SOIR", "420", "2", "0"]
+
+
+def test_csv_without_extras_keeps_the_historical_columns():
+    rows = list(csv.reader(io.StringIO(b"".join(iter_csv_bytes(iter_csv_rows(_request(2, 1)))).decode())))
+    assert rows == [
+        ["agent_id", "agent_name", "date", "shift"],
+        ["A0", "Nom0 Anna", "2026-01-01", "MATIN"],
+        ["A1", "Nom1 Anna", "2026-01-01", "SOIR"],
+    ]
+
+
+def test_gzip_stream_round_trips(monkeypatch):
+    monkeypatch.setattr(exports, "CSV_ROWS_PER_CHUNK", 50)
+    req = _request(10, 30, csv_extra_columns=["shift_start", "shift_end"])
+    plain = b"".join(iter_csv_bytes(iter_csv_rows(req)))
+    packed = b"".join(iter_csv_bytes(iter_csv_rows(req), compress=True))
+    assert zlib.decompress(packed, 31) == plain
+    assert len(packed) < len(plain) / 5
+
+
+def _export_peak(req: ExportRequest):
+    tracemalloc.start()
+    largest = 0
+    for chunk in iter_csv_bytes(iter_csv_rows(req)):
+        largest = max(largest, len(chunk))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return largest, peak
+
+
+def test_year_long_export_memory_stays_flat():
+    columns = list(exports.CSV_EXTRA_COLUMNS)
+    _, small_peak = _export_peak(_request(20, 365, csv_extra_columns=columns))
+    largest, peak = _export_peak(_request(200, 365, csv_extra_columns=columns))
+    assert largest < 200_000
+    # Ten times the rows, about the same working memory.
+    assert peak < 1.5 * small_peak
+
+
+def _check_pdf(data: bytes) -> int:
+    """Every xref offset points at its object; returns the page count."""
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    startxref = int(data.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+    lines = data[startxref:].split(b"\n")
+    assert lines[0] == b"xref"
+    size = int(lines[1].split()[1])
+    for num in range(1, size):
+        offset = int(lines[2 + num][:10])
+        assert data[offset:].startswith(f"{num} 0 obj".encode())
+    return int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", data).group(1))
+
+
+def test_pdf_grid_pages_per_month_and_agent_block():
+    req = _request(45, 40, service_unit="USLD (étage 2)", start_date="2026-01-20", end_date="2026-02-28")
+    tracker = TrackerSnapshot(year=2026, minutes={"A0": 90000}, names={}, etag='"x"')
+    chunks = list(iter_planning_pdf(req, tracker))
+    # January and February, two blocks of agents each, then two summary pages.
+    assert _check_pdf(b"".join(chunks)) == 6
+    assert len(chunks) > 6
+    # One grid template per page shape: 12 or 28 days, 40 or 5 agents.
+    assert b"".join(chunks).count(b"/Subtype /Form") == 4
+
+
+def test_pdf_200_agents_full_year_streams_page_by_page():
+    req = _request(200, 365, start_date="2026-01-01", end_date="2026-12-31")
+    started = time.perf_counter()
+    chunks = list(iter_planning_pdf(req))
+    # About a second here; generous enough for a slow CI runner.
+    assert time.perf_counter() - started < 30
+    assert _check_pdf(b"".join(chunks)) == 12 * 5 + 5
+    assert len(chunks) > 12 * 5
@@ -0,0 +1,50 @@
+from app.models import GenerateRequest
+from app.scheduler import solve_planning
+
+from tests.test_scheduler import base_request
+
+
+def _two_week_request():
+    data = base_request()
+    data["params"]["end_date"] = "2026-02-22"
+    data["params"]["mode"] = "matin_soir"
+    data["params"]["coverage_requirements"] = {"MATIN": 2, "SOIR": 2, "JOUR_12H": 0}
+    data["agents"] = [
+        {"id": f"A{i}", "first_name": "X", "last_name": f"Agent{i}", "regime": "REGIME_MIXTE", "quotity": 100, "unavailability_dates": []}
+        for i in range(1, 8)
+    ]
+    return data
+
+
+def test_draft_only_returns_heuristic_draft():
+    data = _two_week_request()
+    data["params"]["draft_only"] = True
+    data["agents"][0]["unavailability_dates"] = ["2026-02-10"]
+    result = solve_planning(GenerateRequest(**data))
+    assert result.status == "ok"
+    assert result.source == "heuristic"
+    assert result.score is None
+    assert all(not (a.agent_id == "A1" and a.date == "2026-02-10") for a in result.assignments)
+    for day in {a.date for a in result.assignments}:
+        assert sum(1 for a in result.assignments if a.date == day and a.shift == "MATIN") == 2
+        assert sum(1 for a in result.assignments if a.date == day and a.shift == "SOIR") == 2
+
+
+def test_draft_is_accepted_by_full_model():
+    data = _two_week_request()
+    data["params"]["draft_only"] = True
+    draft = solve_planning(GenerateRequest(**data)).assignments
+    data["params"]["draft_only"] = False
+    data["locked_assignments"] = [a.model_dump() for a in draft]
+    result = solve_planning(GenerateRequest(**data))
+    assert result.status == "ok"
+    assert result.source == "optimized"
+
+
+def test_draft_only_falls_back_to_solver_when_greedy_fails():
+    data = base_request()
+    data["params"]["draft_only"] = True
+    data["params"]["coverage_requirements"]["SOIR"] = 2
+    result = solve_planning(GenerateRequest(**data))
+    assert result.status == "infeasible"
+    assert result.source is None
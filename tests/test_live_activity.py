@@ -1,7 +1,27 @@
 import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-from app.live_activity import create_live_entry, delete_live_entry, list_live_entries, purge_old_entries, update_live_entry
+import pytest
+
+from app import live_activity
+from app.live_activity import (
+    apply_live_batch,
+    create_live_entry,
+    delete_live_entry,
+    list_live_entries,
+    count_live_entries,
+    live_changes,
+    live_revision,
+    live_stats,
+    page_live_entries,
+    purge_old_entries,
+    search_live_entries,
+    update_live_entry,
+)
 
 
 def test_create_and_list_live_entries(tmp_path):
@@ -58,7 +78,7 @@ def test_delete_live_entry(tmp_path):
     assert list_live_entries(path=path) == []
 
 
-def test_purge_old_entries(tmp_path):
+def test_purge_old_entries(tmp_path, monkeypatch):
     path = tmp_path / "live_activity.json"
     old = create_live_entry(
         agent_id="A4",
@@ -81,14 +101,305 @@ def test_purge_old_entries(tmp_path):
         path=path,
     )
 
-    data = json.loads(path.read_text(encoding="utf-8"))
-    for entry in data["entries"]:
-        if entry["id"] == old["id"]:
-            entry["updated_at"] = (datetime.now(timezone.utc) - timedelta(days=120)).replace(microsecond=0).isoformat().replace("+00:00", "Z")
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    old_ts = (datetime.now(timezone.utc) - timedelta(days=120)).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    monkeypatch.setattr(live_activity, "_now_iso", lambda: old_ts)
+    update_live_entry(old["id"], status="done", path=path)
+    monkeypatch.undo()
 
     removed = purge_old_entries(90, path=path)
     assert removed == 1
     rows = list_live_entries(path=path)
     assert len(rows) == 1
     assert rows[0]["id"] == keep["id"]
+
+
+def _make(path, i, **overrides):
+    fields = dict(
+        agent_id=f"A{i % 3}",
+        agent_name=f"Agent {i % 3}",
+        date=f"2026-03-{1 + i % 5:02d}",
+        shift="MATIN" if i % 2 else "SOIR",
+        task_title=f"Tache {i}",
+        details="",
+        status="planned",
+        path=path,
+    )
+    fields.update(overrides)
+    return create_live_entry(**fields)
+
+
+def test_changes_are_journaled_and_compacted(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    path.write_text(json.dumps({"entries": [{"id": "legacy", "agent_id": "A9", "agent_name": "Ancien", "date": "2026-02-01", "shift": "MATIN", "task_title": "Ancienne", "details": "", "status": "done", "created_at": "2026-02-01T08:00:00Z", "updated_at": "2026-02-01T08:00:00Z"}]}), encoding="utf-8")
+    monkeypatch.setattr(live_activity, "JOURNAL_COMPACT_OPS", 10)
+    created = [_make(path, i) for i in range(6)]
+    journal = tmp_path / "live_activity.journal.jsonl"
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 6
+    assert len(json.loads(path.read_text(encoding="utf-8"))["entries"]) == 1
+
+    update_live_entry(created[0]["id"], status="done", path=path)
+    delete_live_entry(created[1]["id"], path=path)
+    for i in range(6, 8):
+        _make(path, i)
+    # The tenth op folded the journal into the snapshot.
+    assert journal.read_text(encoding="utf-8") == ""
+    assert len(json.loads(path.read_text(encoding="utf-8"))["entries"]) == 8
+
+    # A fresh process rebuilds the same state from the files.
+    live_activity._STORES.clear()
+    rows = list_live_entries(path=path)
+    assert len(rows) == 8
+    assert [r["status"] for r in rows if r["id"] == created[0]["id"]] == ["done"]
+
+
+def test_torn_journal_line_is_dropped_before_appending(tmp_path):
+    path = tmp_path / "live_activity.json"
+    first = _make(path, 0)
+    journal = tmp_path / "live_activity.journal.jsonl"
+    with journal.open("ab") as f:
+        f.write(b'{"op":"put","entry":{"id":"torn"')
+    second = _make(path, 1)
+    lines = journal.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["entry"]["id"] for line in lines] == [first["id"], second["id"]]
+
+    live_activity._STORES.clear()
+    assert {r["id"] for r in list_live_entries(path=path)} == {first["id"], second["id"]}
+
+
+def test_list_uses_indexes_for_filters(tmp_path):
+    path = tmp_path / "live_activity.json"
+    for i in range(20):
+        _make(path, i)
+    rows = list_live_entries(start_date="2026-03-02", end_date="2026-03-03", agent_id="A1", shift="MATIN", path=path)
+    expected = [i for i in range(20) if i % 3 == 1 and i % 2 == 1 and 1 <= i % 5 <= 2]
+    assert sorted(int(r["task_title"].split()[1]) for r in rows) == expected
+    moved = update_live_entry(rows[0]["id"], status="done", path=path)
+    assert moved["status"] == "done"
+    assert len(list_live_entries(agent_id="A1", shift="MATIN", include_done=False, start_date="2026-03-02", end_date="2026-03-03", path=path)) == len(expected) - 1
+    assert list_live_entries(agent_id="nobody", path=path) == []
+
+
+def _stress_worker(path, worker, count):
+    ids = [_make(path, i, agent_id=f"W{worker}", task_title=f"W{worker}-{i}")["id"] for i in range(count)]
+    for entry_id in ids:
+        assert update_live_entry(entry_id, status="done", details=f"par W{worker}", path=path) is not None
+    return len(ids)
+
+
+def test_concurrent_processes_lose_no_writes(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    # Small threshold so compactions race with appends from other processes.
+    monkeypatch.setattr(live_activity, "JOURNAL_COMPACT_OPS", 40)
+    workers, count = 4, 60
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        done = list(pool.map(_stress_worker, [path] * workers, range(workers), [count] * workers))
+    elapsed = time.perf_counter() - started
+
+    assert done == [count] * workers
+    # 480 writes take well under a second; the bound only catches a lock
+    # that stalls or a write path that rereads the whole store each time.
+    assert elapsed < 30
+    live_activity._STORES.clear()
+    rows = list_live_entries(path=path)
+    assert len(rows) == workers * count
+    assert all(r["status"] == "done" and r["details"] == f"par {r['agent_id']}" for r in rows)
+    assert {r["task_title"] for r in rows} == {f"W{w}-{i}" for w in range(workers) for i in range(count)}
+
+
+def test_shared_readers_do_not_serialise_on_the_process_lock(tmp_path):
+    path = tmp_path / "live_activity.json"
+    _make(path, 0)
+    inside = threading.Event()
+    release = threading.Event()
+
+    def slow_reader():
+        with live_activity._locked_store(path, exclusive=False):
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=slow_reader)
+    thread.start()
+    try:
+        assert inside.wait(5)
+        # A second reader gets through while the first one is still reading.
+        assert live_activity._LOCK.acquire(timeout=1)
+        live_activity._LOCK.release()
+        assert len(list_live_entries(path=path)) == 1
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_purge_only_visits_the_expired_prefix(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    now = datetime.now(timezone.utc)
+
+    def _at(days_ago):
+        return (now - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    monkeypatch.setattr(live_activity, "_now_iso", lambda: _at(200))
+    stale = [_make(path, i) for i in range(3)]
+    # Touched again recently: its old position in the expiry order is stale.
+    monkeypatch.setattr(live_activity, "_now_iso", lambda: _at(1))
+    update_live_entry(stale[0]["id"], status="done", path=path)
+    fresh = [_make(path, i) for i in range(3, 6)]
+
+    assert purge_old_entries(90, path=path) == 2
+    assert {r["id"] for r in list_live_entries(path=path)} == {stale[0]["id"]} | {e["id"] for e in fresh}
+    store = live_activity._STORES[path]
+    assert sorted(entry_id for _, entry_id in store.expiry) == sorted([stale[0]["id"]] + [e["id"] for e in fresh])
+    assert purge_old_entries(90, path=path) == 0
+
+
+def test_change_feed_returns_deltas_and_tombstones(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    a, b, c = (_make(path, i) for i in range(3))
+    start = live_changes(path=path)
+    assert start["reset"] and start["rev"] == 3 and len(start["entries"]) == 3
+
+    update_live_entry(a["id"], status="done", path=path)
+    delete_live_entry(b["id"], path=path)
+    delta = live_changes(3, path=path)
+    assert not delta["reset"] and delta["rev"] == 5
+    assert [e["id"] for e in delta["entries"]] == [a["id"]]
+    assert delta["deleted_ids"] == [b["id"]]
+    # Without include_done, an entry that became done is dropped client-side.
+    assert sorted(live_changes(3, include_done=False, path=path)["deleted_ids"]) == sorted([a["id"], b["id"]])
+    assert live_changes(5, path=path) == {"rev": 5, "reset": False, "entries": [], "deleted_ids": []}
+    # A cursor from a newer store (the files were restored or replaced) resets.
+    ahead = live_changes(9, path=path)
+    assert ahead["reset"] and ahead["rev"] == 5 and len(ahead["entries"]) == 2
+
+    # Revisions and tombstones survive compaction and a reload.
+    monkeypatch.setattr(live_activity, "JOURNAL_COMPACT_OPS", 1)
+    monkeypatch.setattr(live_activity, "TOMBSTONE_REVS", 1)
+    update_live_entry(c["id"], details="vu", path=path)
+    live_activity._STORES.clear()
+    assert live_revision(path=path) == 6
+    assert [e["id"] for e in live_changes(5, path=path)["entries"]] == [c["id"]]
+    # The tombstone of rev 5 was dropped by the compaction: clients behind it start over.
+    too_old = live_changes(4, path=path)
+    assert too_old["reset"] and too_old["rev"] == 6 and len(too_old["entries"]) == 2
+    delete_live_entry(a["id"], path=path)
+    assert live_changes(6, path=path)["deleted_ids"] == [a["id"]]
+
+
+def test_cursor_pages_projection_and_counts(tmp_path):
+    path = tmp_path / "live_activity.json"
+    for i in range(40):
+        _make(path, i, agent_id="RARE" if i % 13 == 0 else f"A{i % 3}")
+    full = list_live_entries(path=path)
+    assert full == sorted(full, key=lambda e: (e["date"], e["shift"], e["agent_name"], e["updated_at"]))
+
+    seen, cursor = [], None
+    while True:
+        page = page_live_entries(limit=7, cursor=cursor, fields=["task_title"], path=path)
+        assert all(set(e) == {"id", "task_title"} for e in page["entries"])
+        seen.extend(e["id"] for e in page["entries"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        if len(seen) == 14:
+            # Entries added before the cursor do not shift the following pages.
+            _make(path, 99, date="2026-01-01")
+    assert seen == [e["id"] for e in full]
+
+    # Small agent set (sorted candidates) and full walk agree with a plain filter.
+    for agent in ("RARE", "A1"):
+        expected = [e["id"] for e in full if e["agent_id"] == agent and e["date"] >= "2026-03-02"]
+        got = page_live_entries(agent_id=agent, start_date="2026-03-02", limit=100, path=path)["entries"]
+        assert [e["id"] for e in got] == expected
+
+    update_live_entry(full[0]["id"], status="blocked", path=path)
+    counts = count_live_entries(start_date="2026-03-01", path=path)
+    assert counts["count"] == 40 and counts["by_status"] == {"planned": 39, "blocked": 1}
+    with pytest.raises(ValueError):
+        page_live_entries(cursor="pas-un-curseur", path=path)
+    with pytest.raises(ValueError):
+        page_live_entries(fields=["patient"], path=path)
+
+
+def test_batch_is_one_journal_write_with_per_item_results(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    busy = _make(path, 0, status="in_progress", shift="MATIN", date="2026-03-04")
+    other = _make(path, 1, status="in_progress", shift="SOIR", date="2026-03-04")
+    writes = []
+    real_append = live_activity._LiveStore.append
+    monkeypatch.setattr(live_activity._LiveStore, "append", lambda self, ops: (writes.append(len(ops)), real_append(self, ops))[1])
+
+    created = {"agent_id": "A7", "agent_name": "Agent 7", "date": "2026-03-04", "shift": "MATIN", "task_title": " Bilan ", "details": "", "status": "in_progress"}
+    out = apply_live_batch(
+        [
+            {"op": "create", "entry": created},
+            {"op": "transition", "from_status": "in_progress", "to_status": "done", "date": "2026-03-04", "shift": "MATIN", "agent_id": None},
+            {"op": "delete", "id": busy["id"]},
+            {"op": "update", "id": busy["id"], "status": "blocked"},
+        ],
+        path=path,
+    )
+    assert writes == [4]
+    results = out["results"]
+    assert [r["status"] for r in results] == ["ok", "ok", "ok", "not_found"]
+    assert results[0]["entries"][0]["task_title"] == "Bilan"
+    assert {e["id"] for e in results[1]["entries"]} == {busy["id"], results[0]["entries"][0]["id"]}
+    rows = {r["id"]: r["status"] for r in list_live_entries(path=path)}
+    assert rows == {other["id"]: "in_progress", results[0]["entries"][0]["id"]: "done"}
+    assert out["rev"] == live_revision(path=path) == 6
+
+
+def test_search_follows_changes_and_filters(tmp_path):
+    path = tmp_path / "live_activity.json"
+    dressing = _make(path, 0, task_title="Pansement", details="jambe gauche")
+    blood = _make(path, 1, task_title="Bilan sanguin", details="à jeûn avant pansement")
+    _make(path, 2, task_title="Toilette", details="")
+
+    found = search_live_entries("pansem", path=path)
+    assert found["total"] == 2
+    assert [h["entry"]["id"] for h in found["hits"]] == [dressing["id"], blood["id"]]
+    assert [h["entry"]["id"] for h in search_live_entries("JEUN", path=path)["hits"]] == [blood["id"]]
+    assert search_live_entries("pansement", shift=blood["shift"], path=path)["total"] == 1
+    assert search_live_entries("pansement", limit=1, offset=1, path=path)["hits"][0]["entry"]["id"] == blood["id"]
+
+    update_live_entry(dressing["id"], task_title="Perfusion", details="", path=path)
+    assert [h["entry"]["id"] for h in search_live_entries("pansement", path=path)["hits"]] == [blood["id"]]
+    assert search_live_entries("perfusion", include_done=False, path=path)["total"] == 1
+    delete_live_entry(blood["id"], path=path)
+    assert search_live_entries("sanguin", path=path)["total"] == 0
+
+
+def test_stats_counters_follow_every_change(tmp_path, monkeypatch):
+    path = tmp_path / "live_activity.json"
+    created = [_make(path, i) for i in range(30)]
+    update_live_entry(created[0]["id"], status="done", path=path)
+    update_live_entry(created[1]["id"], status="blocked", path=path)
+    delete_live_entry(created[2]["id"], path=path)
+    apply_live_batch([{"op": "transition", "from_status": "planned", "to_status": "in_progress", "date": "2026-03-02", "shift": None, "agent_id": None}], path=path)
+    monkeypatch.setattr(live_activity, "_now_iso", lambda: "2000-01-01T00:00:00Z")
+    update_live_entry(created[3]["id"], details="vieux", path=path)
+    purge_old_entries(90, path=path)
+
+    def brute(group_by, **filters):
+        groups = {}
+        for e in list_live_entries(path=path, **filters):
+            key = tuple(e[d] for d in group_by)
+            groups.setdefault(key, {}).setdefault(e["status"], 0)
+            groups[key][e["status"]] += 1
+        return groups
+
+    for group_by, filters in [
+        (["date"], {}),
+        (["date", "shift", "agent_id"], {}),
+        (["agent_id"], {"start_date": "2026-03-02", "end_date": "2026-03-04", "include_done": False}),
+        (["shift"], {"agent_id": "A1"}),
+    ]:
+        stats = live_stats(group_by=group_by, path=path, **filters)
+        assert {tuple(g["key"][d] for d in group_by): g["counts"] for g in stats["groups"]} == brute(group_by, **filters)
+        assert stats["total"] == sum(sum(c.values()) for c in brute(group_by, **filters).values())
+
+    before_reload = live_stats(group_by=["date", "shift"], path=path)
+    live_activity._STORES.clear()
+    assert live_stats(group_by=["date", "shift"], path=path) == before_reload
+    assert count_live_entries(path=path)["count"] == 28
+    with pytest.raises(ValueError):
+        live_stats(group_by=["patient"], path=path)
@@ -0,0 +1,71 @@
+from app.models import GenerateRequest
+from app.patterns import PatternRuleset, enumerate_week_patterns
+from app.scheduler import build_solution
+
+from tests.test_scheduler import base_request
+
+
+def _ruleset(**overrides):
+    values = {
+        "shifts": (("JOUR_12H", 420, 1140, 720), ("MATIN", 420, 840, 420), ("SOIR", 840, 1260, 420)),
+        "allowed_shifts": frozenset({"MATIN", "SOIR"}),
+        "min_rest": 720,
+        "forbidden_pairs": frozenset({("SOIR", "MATIN"), ("SOIR", "JOUR_12H")}),
+        "max_consecutive_12h": 0,
+        "forbid_matin_soir_matin": True,
+        "max_minutes_rolling_7d": 2880,
+        "weekly_rest_min_minutes": 2160,
+    }
+    values.update(overrides)
+    return PatternRuleset(**values)
+
+
+def test_week_patterns_respect_rules():
+    patterns = enumerate_week_patterns(_ruleset())
+    assert patterns
+    for pattern in patterns:
+        assert len(pattern) == 7
+        worked = [s for s in pattern if s is not None]
+        assert len(worked) * 420 <= 2880
+        for s1, s2 in zip(pattern, pattern[1:]):
+            assert (s1, s2) != ("SOIR", "MATIN")
+        for triple in zip(pattern, pattern[1:], pattern[2:]):
+            assert triple != ("MATIN", "SOIR", "MATIN")
+
+
+def test_week_patterns_are_cached():
+    first = enumerate_week_patterns(_ruleset())
+    assert enumerate_week_patterns(_ruleset()) is first
+
+
+def test_week_patterns_max_consecutive_12h():
+    patterns = enumerate_week_patterns(
+        _ruleset(allowed_shifts=frozenset({"JOUR_12H"}), max_consecutive_12h=3, max_minutes_rolling_7d=10000)
+    )
+    assert ("JOUR_12H",) * 3 + (None, None, "JOUR_12H", "JOUR_12H") in patterns
+    assert all(("JOUR_12H",) * 4 != p[i:i + 4] for p in patterns for i in range(4))
+
+
+def test_pattern_formulation_matches_day_model():
+    data = base_request()
+    data["params"]["end_date"] = "2026-02-22"
+    data["agents"].append(
+        {"id": "A4", "first_name": "Noe", "last_name": "Bernard", "regime": "REGIME_SOIR_ONLY", "quotity": 100, "unavailability_dates": []}
+    )
+    data["params"]["solver_formulation"] = "pattern"
+    data["locked_assignments"] = [{"agent_id": "A1", "date": "2026-02-16", "shift": "MATIN"}]
+    status, assignments, *_ = build_solution(GenerateRequest(**data))
+    assert status == "ok"
+    assert any(a.agent_id == "A1" and a.date == "2026-02-16" and a.shift == "MATIN" for a in assignments)
+    by_agent = {}
+    for a in assignments:
+        by_agent.setdefault(a.agent_id, []).append(a.date)
+    assert all(len(dates) <= 12 for dates in by_agent.values())
+
+
+def test_pattern_formulation_infeasible_like_day_model():
+    data = base_request()
+    data["params"]["solver_formulation"] = "pattern"
+    data["params"]["ruleset_defaults"]["max_minutes_rolling_7d"] = 420
+    status, *_ = build_solution(GenerateRequest(**data))
+    assert status == "infeasible"
@@ -0,0 +1,72 @@
+import pytest
+
+from app import scheduler
+from app.models import ScenarioRequest
+from app.scenarios import build_variant_requests, run_scenarios
+
+from tests.test_scheduler import base_request
+
+
+def _request(variants, **kwargs):
+    data = base_request()
+    data["agents"].append(
+        {"id": "A4", "first_name": "Noe", "last_name": "Bernard", "regime": "REGIME_SOIR_ONLY", "quotity": 100, "unavailability_dates": []}
+    )
+    data["params"]["end_date"] = "2026-02-15"
+    return ScenarioRequest(base=data, variants=variants, **kwargs)
+
+
+def test_variant_overrides_merge_nested_params():
+    req = _request(
+        [
+            {"name": "11h", "overrides": {"agreement_11h_enabled": True}},
+            {"name": "cycle", "overrides": {"ruleset_defaults": {"cycle_mode_enabled": True}}},
+        ]
+    )
+    (base, _), (_, agreement), (_, cycle) = build_variant_requests(req)
+    assert base.name == "base"
+    assert agreement.params.agreement_11h_enabled is True
+    assert cycle.params.ruleset_defaults.cycle_mode_enabled is True
+    assert cycle.params.ruleset_defaults.max_minutes_rolling_7d == 2880
+    assert cycle.agents is req.base.agents
+
+
+def test_invalid_override_names_variant():
+    req = _request([{"name": "broken", "overrides": {"mode": "nuit"}}])
+    with pytest.raises(ValueError, match="broken"):
+        build_variant_requests(req)
+
+
+def test_run_scenarios_comparison_table():
+    req = _request(
+        [
+            {"name": "weekend_soir_3", "overrides": {"weekend_coverage_requirements": {"SOIR": 3}}},
+            {"name": "no_msm_rule", "overrides": {"forbid_matin_soir_matin": False}},
+        ],
+        cpu_budget=2,
+    )
+    rows = run_scenarios(req, lambda year: {})
+    assert [r.name for r in rows] == ["base", "weekend_soir_3", "no_msm_rule"]
+    base, weekend, no_msm = rows
+    assert base.status == "ok"
+    assert base.assignments_count == 14
+    assert base.solve_time_seconds >= 0
+    assert weekend.status == "infeasible"
+    assert no_msm.status == "ok"
+
+
+def test_variants_share_prepared_inputs(monkeypatch):
+    built = []
+    greedy = scheduler.build_greedy_draft
+    monkeypatch.setattr(scheduler, "build_greedy_draft", lambda *args: built.append(1) or greedy(*args))
+    req = _request(
+        [
+            {"name": "pattern", "overrides": {"solver_formulation": "pattern", "solver_time_limit_seconds": 5}},
+            {"name": "no_msm_rule", "overrides": {"forbid_matin_soir_matin": False}},
+        ],
+        cpu_budget=1,
+    )
+    rows = run_scenarios(req, lambda year: {})
+    assert [r.status for r in rows] == ["ok", "ok", "ok"]
+    # Solver-only overrides reuse the base draft; a rule change rebuilds it.
+    assert len(built) == 2
@@ -155,3 +155,15 @@ def test_rolling_7d_max():
     req = GenerateRequest(**data)
     status, *_ = build_solution(req)
     assert status == "infeasible"
+
+
+def test_weekend_coverage_override():
+    data = base_request()
+    data["params"]["start_date"] = "2026-02-12"
+    data["params"]["end_date"] = "2026-02-15"
+    data["params"]["weekend_coverage_requirements"] = {"MATIN": 2}
+    req = GenerateRequest(**data)
+    status, assignments, *_ = build_solution(req)
+    assert status == "ok"
+    assert sum(1 for a in assignments if a.date == "2026-02-14" and a.shift == "MATIN") == 2
+    assert sum(1 for a in assignments if a.date == "2026-02-13" and a.shift == "MATIN") == 1
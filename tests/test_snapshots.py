@@ -0,0 +1,70 @@
+"""Regression snapshots for the solver.
+
+Each fixture in tests/snapshots stores a GenerateRequest solved in
+deterministic mode, the expected assignments and score, and the search effort
+recorded when the fixture was written. Re-record after an intended change with:
+
+    UPDATE_SNAPSHOTS=1 PYTHONPATH=. pytest -q tests/test_snapshots.py
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.models import GenerateRequest
+from app.scheduler import solve_planning
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / "snapshots"
+UPDATE = os.getenv("UPDATE_SNAPSHOTS", "").lower() in {"1", "true", "yes", "on"}
+# Effort may drift within this factor before the snapshot is flagged.
+EFFORT_TOLERANCE = 1.5
+
+
+def _solve(request):
+    result = solve_planning(GenerateRequest(**request))
+    return {
+        "status": result.status,
+        "score": result.score,
+        "assignments": sorted([a.agent_id, a.date, a.shift] for a in result.assignments),
+        "effort": {
+            "branches": result.stats.get("branches", 0),
+            "conflicts": result.stats.get("conflicts", 0),
+            "deterministic_time": result.stats.get("deterministic_time", 0.0),
+        },
+    }
+
+
+def _within(recorded, measured, slack):
+    return measured <= recorded * EFFORT_TOLERANCE + slack and recorded <= measured * EFFORT_TOLERANCE + slack
+
+
+@pytest.mark.parametrize("fixture", sorted(SNAPSHOT_DIR.glob("*.json")), ids=lambda p: p.stem)
+def test_solver_snapshot(fixture):
+    snapshot = json.loads(fixture.read_text(encoding="utf-8"))
+    request = snapshot["request"]
+    assert request["params"]["solver_mode"] == "deterministic"
+    measured = _solve(request)
+    if UPDATE:
+        snapshot["expected"] = measured
+        fixture.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        return
+
+    expected = snapshot["expected"]
+    assert measured["status"] == expected["status"]
+    assert measured["score"] == expected["score"], "solution quality changed"
+    assert measured["assignments"] == expected["assignments"], "roster changed"
+    for key, slack in (("branches", 50), ("conflicts", 50), ("deterministic_time", 0.05)):
+        assert _within(expected["effort"][key], measured["effort"][key], slack), (
+            f"solve effort changed: {key} {expected['effort'][key]} -> {measured['effort'][key]}"
+        )
+
+
+def test_deterministic_mode_is_reproducible():
+    request = json.loads(sorted(SNAPSHOT_DIR.glob("*.json"))[0].read_text(encoding="utf-8"))["request"]
+    first = _solve(request)
+    second = _solve(request)
+    assert first["assignments"] == second["assignments"]
+    assert first["score"] == second["score"]
+    assert first["effort"]["branches"] == second["effort"]["branches"]
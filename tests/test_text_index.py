@@ -0,0 +1,33 @@
+from app.text_index import TextIndex, fold_text, tokenize
+
+
+def test_fold_and_tokenize_french_text():
+    assert fold_text("Bilan sanguin à jeûn, Œdème") == "bilan sanguin a jeun, oedeme"
+    assert tokenize("Réfection de l'Pansement du lit 12") == ["refection", "pansement", "lit", "12"]
+
+
+def test_prefix_and_all_words_must_match():
+    index = TextIndex()
+    index.update("a", "Pansement", "jambe gauche")
+    index.update("b", "Bilan sanguin", "à jeun, pansement après")
+    index.update("c", "Pansements", "")
+    assert set(index.search("pansement")) == {"a", "b", "c"}
+    assert set(index.search("pans")) == {"a", "b", "c"}
+    assert set(index.search("pansement sang")) == {"b"}
+    assert index.search("pansement cardio") == {}
+    assert index.search("de la") == {}
+    # A title word outweighs a details word; an exact word outweighs a prefix match.
+    scores = index.search("pansement")
+    assert scores["a"] > scores["b"]
+    assert scores["a"] > scores["c"]
+
+
+def test_update_and_remove_keep_vocabulary_clean():
+    index = TextIndex()
+    index.update("a", "Toilette", "chambre 4")
+    index.update("a", "Toilette", "chambre 4")
+    index.update("a", "Transfert", "")
+    assert index.search("toilette") == {}
+    assert index.terms == ["transfert"]
+    index.remove("a")
+    assert index.terms == [] and index.postings == {} and index.docs == {}
@@ -0,0 +1,140 @@
+import json
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app import tracker
+from app.tracker import (
+    add_minutes,
+    add_minutes_bulk,
+    plan_key,
+    query_rollups,
+    recent_shift_counts,
+    record_plan,
+    recompute_totals,
+    snapshot_minutes,
+    snapshot_names,
+    tracker_snapshot,
+)
+
+
+def test_add_and_snapshot(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    add_minutes(2026, "A1", 420, "Dupont Anna", path=path)
+    add_minutes(2026, "A1", 720, path=path)
+    add_minutes(2025, "A2", 420, path=path)
+    assert snapshot_minutes(2026, path=path) == {"A1": 1140}
+    assert snapshot_names(2026, path=path) == {"A1": "Dupont Anna"}
+    assert snapshot_names(2025, path=path) == {"A2": "A2"}
+
+
+def test_wal_mode_enabled(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    add_minutes(2026, "A1", 420, path=path)
+    with sqlite3.connect(str(path)) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_legacy_json_migrated_once(tmp_path):
+    legacy = tmp_path / "hours_tracker.json"
+    legacy.write_text(json.dumps({"2026": {"A1": {"minutes": 840, "name": "Dupont Anna"}}}), encoding="utf-8")
+    path = tmp_path / "hours_tracker.sqlite3"
+    assert snapshot_minutes(2026, path=path) == {"A1": 840}
+    add_minutes_bulk(2026, [("A1", 420, None), ("A2", 420, "Martin Lea")], path=path)
+    assert snapshot_minutes(2026, path=path) == {"A1": 1260, "A2": 420}
+    assert snapshot_names(2026, path=path)["A1"] == "Dupont Anna"
+
+
+def test_concurrent_increments_are_not_lost(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: add_minutes(2026, "A1", 7, path=path), range(200)))
+    assert snapshot_minutes(2026, path=path) == {"A1": 1400}
+
+
+def test_recording_same_plan_twice_replaces(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    rows = [("A1", "2026-02-02", "JOUR_12H", 720, "Dupont Anna"), ("A1", "2026-02-03", "MATIN", 420, None)]
+    record_plan(plan_key("U1", "2026-02-02", "2026-02-08"), 2026, rows, path=path)
+    record_plan(plan_key("U1", "2026-02-02", "2026-02-08"), 2026, rows, path=path)
+    assert snapshot_minutes(2026, path=path) == {"A1": 1140}
+    record_plan(plan_key("U1", "2026-02-02", "2026-02-08"), 2026, rows[:1], path=path)
+    assert snapshot_minutes(2026, path=path) == {"A1": 720}
+    assert snapshot_names(2026, path=path) == {"A1": "Dupont Anna"}
+
+
+def test_recompute_totals_matches_aggregates(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    add_minutes(2026, "A1", 60, path=path)
+    record_plan("p1", 2026, [("A1", "2026-03-02", "SOIR", 420, None), ("A2", "2026-03-02", "MATIN", 420, None)], path=path)
+    record_plan("p2", 2026, [("A2", "2026-03-09", "JOUR_12H", 720, None)], path=path)
+    expected = snapshot_minutes(2026, path=path)
+    assert expected == {"A1": 480, "A2": 1140}
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE tracker_minutes SET minutes = 0")
+    assert recompute_totals(2026, path=path) == expected
+    assert snapshot_minutes(2026, path=path) == expected
+
+
+def test_snapshot_cache_invalidation(tmp_path, monkeypatch):
+    path = tmp_path / "hours_tracker.sqlite3"
+    add_minutes(2026, "A1", 420, path=path)
+    first = tracker_snapshot(2026, path=path)
+
+    def _no_db(_path):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(tracker, "_connect", _no_db)
+    assert tracker_snapshot(2026, path=path) is first
+    monkeypatch.undo()
+
+    add_minutes(2026, "A1", 60, path=path)
+    second = tracker_snapshot(2026, path=path)
+    assert second.minutes == {"A1": 480}
+    assert second.etag != first.etag
+
+    # Write from outside the module (another process, manual fix).
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE tracker_minutes SET minutes = 999 WHERE agent_id = 'A1'")
+    assert tracker_snapshot(2026, path=path).minutes == {"A1": 999}
+
+
+def test_rollups_follow_plan_replacement(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    # 2026-02-28 is a Saturday (ISO week 9, February); 2026-03-02 a Monday (week 10, March).
+    rows = [
+        ("A1", "2026-02-28", "SOIR", 420, None),
+        ("A1", "2026-03-02", "SOIR", 420, None),
+        ("A2", "2026-03-02", "MATIN", 420, None),
+    ]
+    record_plan("p1", 2026, rows, path=path)
+    months = query_rollups("month", agent_id="A1", path=path)
+    assert [(r["bucket"], r["shifts"], r["weekend_shifts"]) for r in months] == [("2026-02", 1, 1), ("2026-03", 1, 0)]
+    weeks = query_rollups("week", "2026-03-01", "2026-03-08", path=path)
+    assert {(r["bucket"], r["agent_id"], r["shift"]) for r in weeks} == {
+        ("2026-W09", "A1", "SOIR"),
+        ("2026-W10", "A1", "SOIR"),
+        ("2026-W10", "A2", "MATIN"),
+    }
+    assert recent_shift_counts("2026-03-04", weeks=2, path=path) == {"A1": 2}
+
+    record_plan("p1", 2026, rows[1:], path=path)
+    assert [r["bucket"] for r in query_rollups("month", agent_id="A1", path=path)] == ["2026-03"]
+    assert recent_shift_counts("2026-03-04", weeks=2, path=path) == {"A1": 1}
+
+
+def _tracker_worker(path, worker, count):
+    for i in range(count):
+        add_minutes(2026, f"A{i % 5}", 7, f"Agent {i % 5}", path=path)
+    return count
+
+
+def test_concurrent_processes_keep_every_increment(tmp_path):
+    path = tmp_path / "hours_tracker.sqlite3"
+    add_minutes(2026, "A0", 0, path=path)
+    workers, count = 4, 50
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        assert sum(pool.map(_tracker_worker, [path] * workers, range(workers), [count] * workers)) == workers * count
+    totals = snapshot_minutes(2026, path=path)
+    assert sum(totals.values()) == workers * count * 7
+    assert recompute_totals(2026, path=path) == totals